@@ -0,0 +1,187 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Set, Tuple
+
+
+class CacheItem(NamedTuple):
+    data: Dict[str, Any]
+    body: str
+    etag: str
+    size: int
+    expires: float
+    stale_expires: float
+
+
+class CacheStats:
+    """
+    Counts of cache lookups by outcome ('hit', 'stale', 'miss' or
+    'bypass') and the latency of the reads behind misses
+    """
+
+    def __init__(self) -> None:
+        self.lookups: Counter[str] = Counter()
+        self.reads = 0
+        self.read_seconds = 0.0
+        self.max_read_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, outcome: str) -> None:
+        with self._lock:
+            self.lookups[outcome] += 1
+
+    def read(self, seconds: float) -> None:
+        with self._lock:
+            self.reads += 1
+            self.read_seconds += seconds
+            self.max_read_seconds = max(self.max_read_seconds, seconds)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Share of lookups served without a read of their own
+        """
+        total = sum(self.lookups.values())
+        served = self.lookups['hit'] + self.lookups['stale']
+        return served / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'lookups': dict(self.lookups),
+            'hitRate': round(self.hit_rate, 4),
+            'reads': self.reads,
+            'meanReadMs': round(
+                1000 * self.read_seconds / self.reads if self.reads else 0, 1,
+            ),
+            'maxReadMs': round(1000 * self.max_read_seconds, 1),
+        }
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized API responses. Items are evicted by
+    least recent use once the total body size exceeds `max_bytes`.
+    Expired items are still served for `stale_ttl` seconds while they
+    are revalidated: the first request to find an item expired is served
+    it as is and the next one refetches it (see `revalidate`). Lambda
+    freezes threads left running after a response, so the refetch is not
+    left to a background thread. A refetch that fails serves the stale
+    item too.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        stale_ttl: float = 3600,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[str, CacheItem] = OrderedDict()
+        # keys whose expired item was served once and is due a refetch
+        self._due: Set[str] = set()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Tuple[Optional[CacheItem], bool]:
+        """
+        Returns the cached item for `key` (or None) and whether the item
+        is still fresh. Items past the stale window are dropped.
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None, False
+            now = time.time()
+            if item.stale_expires <= now:
+                self._remove(key)
+                return None, False
+            self._items.move_to_end(key)
+            return item, item.expires > now
+
+    def revalidate(self, key: str) -> bool:
+        """
+        Whether the expired item of `key` is due a refetch. The first call
+        after the item expired returns False, so that request is served
+        the stale item, and marks the key so the next call returns True.
+        """
+        with self._lock:
+            if key in self._due:
+                return True
+            self._due.add(key)
+            return False
+
+    def put(self, key: str, data: Dict[str, Any]) -> CacheItem:
+        body = json.dumps(data)
+        now = time.time()
+        item = CacheItem(
+            data=data,
+            body=body,
+            etag=make_etag(data, body),
+            size=len(body.encode('utf-8')),
+            expires=now + self.ttl,
+            stale_expires=now + self.ttl + self.stale_ttl,
+        )
+        with self._lock:
+            self._remove(key)
+            if item.size > self.max_bytes:
+                return item
+            self._items[key] = item
+            self.size += item.size
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._remove(oldest)
+        return item
+
+    def fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Dict[str, Any]],
+        stale: Optional[CacheItem] = None,
+    ) -> CacheItem:
+        """
+        Reads and caches `key`. With the expired `stale` item of the key,
+        a failed read other than a missing key returns it instead.
+        """
+        start = time.perf_counter()
+        try:
+            data = fetch()
+        except KeyError:
+            raise
+        except Exception as e:
+            if stale is None:
+                raise
+            print(f'--> cache refresh failed, serving stale: {key}: {e}')
+            return stale
+        elapsed = time.perf_counter() - start
+        self.stats.read(elapsed)
+        print(f'--> cache read: {key} {1000 * elapsed:.1f}ms')
+        return self.put(key, data)
+
+    def _remove(self, key: str) -> None:
+        self._due.discard(key)
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= item.size
+
+
+def make_etag(data: Dict[str, Any], body: str) -> str:
+    content_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()[:16]
+    return f'"{data.get("updateTimestamp", 0)}-{content_hash}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
@@ -0,0 +1,214 @@
+from typing import Any, Dict, List, Optional
+
+# bumped on any change of the layout below, decoders check it
+COLUMNAR_SCHEMA = 'cat5-columnar'
+COLUMNAR_VERSION = 2
+COLUMNAR_MEDIA_TYPE = 'application/vnd.cat5.columnar+json'
+
+TEAM_FIELDS = ('abbrev', 'name', 'manager', 'logoUrl', 'record', 'seed')
+PLAYER_FIELDS = ('name', 'pos', 'proTeam')
+ODDS_FIELDS = ('playoff', 'seed', 'champion')
+PLAYER_SIDES = ('home', 'away')
+# instances written before the streaming plan existed
+EMPTY_PLAN: Dict[str, Any] = {'win': None, 'days': []}
+
+
+def encode_columnar(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Encodes a cat5 instance dict as parallel arrays: teams, players and
+    playoff odds become columns keyed by integer ids, player values,
+    waiver moves and lineups become columns of ids and values, and
+    category win probabilities are lists in the order of `cats`, which
+    is declared once. Fields added after the first instances were
+    written are read with defaults, so older instances still encode.
+    """
+    cats = category_order(data['matchups'])
+    return {
+        'schema': COLUMNAR_SCHEMA,
+        'version': COLUMNAR_VERSION,
+        'leagueId': data['leagueId'],
+        'matchupPeriod': data['matchupPeriod'],
+        'updateTimestamp': data['updateTimestamp'],
+        'maxGP': data['maxGP'],
+        'cats': cats,
+        'teams': encode_table(data['teams'], TEAM_FIELDS),
+        'players': encode_table(data['players'], PLAYER_FIELDS),
+        'playoffOdds': encode_table(data.get('playoffOdds', {}), ODDS_FIELDS),
+        'matchups': [
+            encode_matchup(m, cats, data['updateTimestamp'])
+            for m in data['matchups']
+        ],
+    }
+
+
+def decode_columnar(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Inverse of `encode_columnar`, mirrored by the frontend decoder in
+    src/utils/columnar.js
+    """
+    if data.get('schema') != COLUMNAR_SCHEMA or \
+            data.get('version') != COLUMNAR_VERSION:
+        raise ValueError(
+            f'unsupported schema: {data.get("schema")} v{data.get("version")}'
+        )
+    cats = data['cats']
+    return {
+        'leagueId': data['leagueId'],
+        'matchupPeriod': data['matchupPeriod'],
+        'updateTimestamp': data['updateTimestamp'],
+        'maxGP': data['maxGP'],
+        'matchups': [decode_matchup(m, cats) for m in data['matchups']],
+        'teams': decode_table(data['teams'], TEAM_FIELDS),
+        'players': decode_table(data['players'], PLAYER_FIELDS),
+        'playoffOdds': decode_table(data['playoffOdds'], ODDS_FIELDS),
+    }
+
+
+def category_order(matchups: List[Dict[str, Any]]) -> List[str]:
+    for m in matchups:
+        return list(m['forecasts']['default']['catWin'])
+    return []
+
+
+def encode_table(
+    table: Dict[str, Dict[str, Any]],
+    fields: tuple,
+) -> Dict[str, list]:
+    columns: Dict[str, list] = {'ids': [int(k) for k in table]}
+    for field in fields:
+        columns[field] = [row[field] for row in table.values()]
+    return columns
+
+
+def decode_table(
+    columns: Dict[str, list],
+    fields: tuple,
+) -> Dict[str, Dict[str, Any]]:
+    return {
+        str(k): {field: columns[field][i] for field in fields}
+        for i, k in enumerate(columns['ids'])
+    }
+
+
+def encode_matchup(
+    m: Dict[str, Any],
+    cats: List[str],
+    update_timestamp: int,
+) -> Dict[str, Any]:
+    encoded = {
+        'desc': m['desc'],
+        'homeTeam': int(m['homeTeam']),
+        'awayTeam': int(m['awayTeam']),
+        'forecasts': {
+            name: {
+                'win': f['win'],
+                'catWin': [f['catWin'][cat] for cat in cats],
+            }
+            for name, f in m['forecasts'].items()
+        },
+        'homeGP': m['homeGP'],
+        'awayGP': m['awayGP'],
+        'optimizedHomeGP': m.get('optimizedHomeGP', m['homeGP']),
+        'optimizedAwayGP': m.get('optimizedAwayGP', m['awayGP']),
+        'updateTimestamp': m.get('updateTimestamp', update_timestamp),
+    }
+    for side in PLAYER_SIDES:
+        values = m[f'{side}PlayerValue']
+        moves = m.get(f'{side}WaiverMoves', [])
+        plan = m.get(f'{side}StreamingPlan', EMPTY_PLAN)
+        lineup = m.get(f'{side}OptimizedLineup', [])
+        encoded[f'{side}PlayerValue'] = {
+            'players': [int(v['player']) for v in values],
+            'values': [v['value'] for v in values],
+        }
+        encoded[f'{side}WaiverMoves'] = {
+            'add': [int(w['add']) for w in moves],
+            'drop': [int(w['drop']) for w in moves],
+            'win': [w['win'] for w in moves],
+            'gain': [w['gain'] for w in moves],
+        }
+        encoded[f'{side}StreamingPlan'] = {
+            'win': plan['win'],
+            'dates': [d['date'] for d in plan['days']],
+            'starts': [[int(p) for p in d['starts']] for d in plan['days']],
+            'add': [optional_id(d['add']) for d in plan['days']],
+            'drop': [optional_id(d['drop']) for d in plan['days']],
+        }
+        encoded[f'{side}OptimizedLineup'] = {
+            'players': [int(s['player']) for s in lineup],
+            # the empty start has no game day
+            'gameDays': [optional_id(s['gameDay'] or None) for s in lineup],
+        }
+    return encoded
+
+
+def decode_matchup(m: Dict[str, Any], cats: List[str]) -> Dict[str, Any]:
+    decoded = {
+        'desc': m['desc'],
+        'homeTeam': str(m['homeTeam']),
+        'awayTeam': str(m['awayTeam']),
+        'forecasts': {
+            name: {'win': f['win'], 'catWin': dict(zip(cats, f['catWin']))}
+            for name, f in m['forecasts'].items()
+        },
+    }
+    for side in PLAYER_SIDES:
+        values = m[f'{side}PlayerValue']
+        decoded[f'{side}PlayerValue'] = [
+            {'player': str(p), 'value': v}
+            for p, v in zip(values['players'], values['values'])
+        ]
+    for side in PLAYER_SIDES:
+        moves = m[f'{side}WaiverMoves']
+        decoded[f'{side}WaiverMoves'] = [
+            {'add': str(a), 'drop': str(d), 'win': w, 'gain': g}
+            for a, d, w, g in zip(
+                moves['add'], moves['drop'], moves['win'], moves['gain'],
+            )
+        ]
+    for side in PLAYER_SIDES:
+        plan = m[f'{side}StreamingPlan']
+        decoded[f'{side}StreamingPlan'] = {
+            'win': plan['win'],
+            'days': [
+                {
+                    'date': date,
+                    'starts': [str(p) for p in starts],
+                    'add': optional_str(add),
+                    'drop': optional_str(drop),
+                }
+                for date, starts, add, drop in zip(
+                    plan['dates'], plan['starts'], plan['add'], plan['drop'],
+                )
+            ],
+        }
+    for side in PLAYER_SIDES:
+        lineup = m[f'{side}OptimizedLineup']
+        decoded[f'{side}OptimizedLineup'] = [
+            {'player': str(p), 'gameDay': optional_str(g) or ''}
+            for p, g in zip(lineup['players'], lineup['gameDays'])
+        ]
+    decoded['homeGP'] = m['homeGP']
+    decoded['awayGP'] = m['awayGP']
+    decoded['optimizedHomeGP'] = m['optimizedHomeGP']
+    decoded['optimizedAwayGP'] = m['optimizedAwayGP']
+    decoded['updateTimestamp'] = m['updateTimestamp']
+    return decoded
+
+
+def optional_id(value: Optional[str]) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def optional_str(value: Optional[int]) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def accepts_columnar(format_param: str, accept: Optional[str]) -> bool:
+    """
+    Whether a request asked for the columnar format with `?format=columnar`
+    or its media type in the Accept header
+    """
+    if format_param:
+        return format_param == 'columnar'
+    return COLUMNAR_MEDIA_TYPE in (accept or '')
@@ -1,50 +1,88 @@
-import base64
-import gzip
-import json
 import os
-from typing import Any, Dict
+from typing import Any, Dict, List
 
-import boto3
+from storage import TABLE_NAME, decode_json, get_storage
+from storage.history import checkpoint_run
+from storage.keys import (history_key, history_run_key, matchup_key,
+                          summary_key)
 
-TABLE_NAME = os.environ.get("TABLE_NAME", "Cat5Table")
-AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
 
+class NotFoundError(KeyError):
+    pass
 
-class DBReader:
-    dynamo = boto3.resource("dynamodb", region_name=AWS_REGION)
 
+class DBReader:
     def __init__(self, table_name=TABLE_NAME):
-        self.table = self.dynamo.Table(table_name)
-        self.read_mock = os.environ.get('DB_READ', '').lower() != 'prod'
+        self.mode = os.environ.get('DB_READ', '').lower() or 'mock'
+        self.storage = get_storage(self.mode, table_name)
+        print(f'--> db initialized: READ={self.mode.upper()}')
 
-        self.mock_db_dir = os.path.join('.mock-db', table_name)
-        print(
-            f'--> db initialized: '
-            f'READ={"PROD" if not self.read_mock else "MOCK"}'
+    def read(self, key: str) -> Dict[str, Any]:
+        """
+        Reads the full instance under `key`, reassembling matchup shards
+        when the item is a sharded index. While an update is in progress
+        (`complete` is false) shards not written yet are left out.
+        """
+        data = self._read_item(key)
+        if 'matchupCount' not in data:
+            return data
+
+        index = dict(data)
+        n = index.pop('matchupCount')
+        keys = [matchup_key(key, i) for i in range(n)]
+        shards = self._read_items(
+            keys, allow_missing=not index.get('complete', True),
         )
+        index['matchups'] = [shards[k] for k in keys if k in shards]
+        return index
 
-    def read(self, key: str) -> Dict[str, Any]:
-        if self.read_mock:
-            return self._mock_read(key)
-        else:
-            return self._prod_read(key)
-
-    def _mock_read(self, key: str) -> Dict[str, Any]:
-        loc = os.path.join(self.mock_db_dir, f'{key}.json')
-        with open(loc, 'r') as f:
-            data = json.load(f)
-        print(f'--> mock db read: {loc}')
-        return data
-
-    def _prod_read(self, key: str) -> Dict[str, Any]:
-        resp = self.table.get_item(Key={'key': key})
-        if 'Item' not in resp:
-            raise KeyError(f'key not found in DB: {key}')
-        if 'data' not in resp['Item']:
-            raise KeyError(f'data field not found in DB for key: {key}')
-        base64_data = resp['Item']['data']
-        compressed_data = base64.b64decode(base64_data)
-        json_data = gzip.decompress(compressed_data).decode('utf-8')
-        data_dict = json.loads(json_data)
-        print(f'--> prod db read: {key}')
-        return data_dict
+    def read_index(self, key: str) -> Dict[str, Any]:
+        return self._read_item(key)
+
+    def read_matchup(self, key: str, i: int) -> Dict[str, Any]:
+        return self._read_item(matchup_key(key, i))
+
+    def read_summaries(self, tags: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Reads the summary items of `tags` in one batch, leaving out tags
+        without a summary
+        """
+        keys = {summary_key(tag): tag for tag in tags}
+        items = self._read_items(list(keys), allow_missing=True)
+        return {keys[k]: v for k, v in items.items()}
+
+    def read_history(
+        self,
+        key: str,
+        period: int,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Reads the runs of a matchup period history in run order, from the
+        checkpoint the last `limit` runs replay from
+        """
+        head = self._read_item(history_key(key, period))
+        n = head['runCount']
+        first = checkpoint_run(max(n - limit, 0))
+        keys = [history_run_key(key, period, r) for r in range(first, n)]
+        runs = self._read_items(keys)
+        return [runs[k] for k in keys]
+
+    def _read_item(self, key: str) -> Dict[str, Any]:
+        record = self.storage.get(key)
+        if record is None:
+            raise NotFoundError(f'key not found in DB: {key}')
+        print(f'--> db read: {key}')
+        return decode_json(record.data)
+
+    def _read_items(
+        self,
+        keys: List[str],
+        allow_missing: bool = False,
+    ) -> Dict[str, Dict[str, Any]]:
+        records = self.storage.batch_get(keys)
+        missing = [key for key in keys if key not in records]
+        if missing and not allow_missing:
+            raise NotFoundError(f'keys not found in DB: {missing}')
+        print(f'--> db batch read: {len(keys)} items')
+        return {k: decode_json(r.data) for k, r in records.items()}
@@ -1,23 +1,31 @@
+import json
+import os
 import time
-from typing import Any, Dict, NamedTuple
+from functools import partial
+from typing import Any, Callable, Dict, List
 
 from aws_lambda_powertools.event_handler import (APIGatewayRestResolver,
-                                                 CORSConfig)
+                                                 CORSConfig, Response)
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
-from .db import DBReader
-
-
-class CacheItem(NamedTuple):
-    data: Dict[str, Any]
-    ttl: float
-
+from .cache import CacheItem, ResponseCache, etag_matches
+from .columnar import COLUMNAR_MEDIA_TYPE, accepts_columnar, encode_columnar
+from .db import DBReader, NotFoundError
+from .history import matchup_series
 
 CACHE_TTL = 300  # 5 minutes
-cache: Dict[str, CacheItem] = {}
+CACHE_STALE_TTL = 3600  # serve stale while revalidating for up to 1 hour
+CACHE_MAX_BYTES = 32 * 1024 * 1024  # 32 MB
+MAX_SUMMARY_TAGS = 100
+# most recent runs a matchup history response covers
+MAX_HISTORY_RUNS = 100
+# config with the tags to read at init, shaped like src/config.json
+PREFETCH_CONFIG = os.environ.get('PREFETCH_CONFIG', '')
+cache = ResponseCache(CACHE_TTL, CACHE_STALE_TTL, CACHE_MAX_BYTES)
 db = DBReader()
 
-cors_config = CORSConfig(allow_origin='*')
+DATA_FORMATS = ('', 'json', 'columnar')
+cors_config = CORSConfig(allow_origin='*', expose_headers=['ETag'])
 app = APIGatewayRestResolver(cors=cors_config)
 
 
@@ -25,22 +33,164 @@ def lambda_handler(event: dict, context: LambdaContext) -> dict:
     return app.resolve(event, context)
 
 
+def prefetch_tags(path: str) -> List[str]:
+    """
+    The league tags of a config file like src/config.json
+    """
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f'--> prefetch config not read: {path}: {e}')
+        return []
+    return list(config.get('leagues', {}))
+
+
+def prefetch(tags: List[str]) -> None:
+    """
+    Reads the instances of `tags` into the cache at init, before the
+    first request. The reads are not left to background threads, which
+    Lambda freezes between invocations.
+    """
+    for tag in tags:
+        try:
+            cache.fetch(tag, partial(db.read, tag))
+        except Exception as e:
+            print(f'--> cache prefetch failed: {tag}: {e}')
+
+
+@app.get('/cat5/summaries')
+def get_summaries():
+    param = app.current_event.get_query_string_value('tags', '')
+    tags = sorted({tag for tag in param.split(',') if tag})
+    if not tags:
+        return {'error': 'no tags requested'}, 400
+    if len(tags) > MAX_SUMMARY_TAGS:
+        return {'error': f'more than {MAX_SUMMARY_TAGS} tags requested'}, 400
+
+    def fetch() -> Dict[str, Any]:
+        summaries = db.read_summaries(tags)
+        return {
+            'summaries': summaries,
+            'missing': [tag for tag in tags if tag not in summaries],
+        }
+
+    return cached_read(f'summaries/{",".join(tags)}', fetch)
+
+
 @app.get('/cat5/data/<tag>')
 def get_data(tag: str):
+    api_event = app.current_event
+    format_param = api_event.get_query_string_value('format', '')
+    if format_param not in DATA_FORMATS:
+        return {'error': f'invalid format: {format_param}'}, 400
+    if accepts_columnar(format_param, api_event.headers.get('Accept')):
+        return cached_read(
+            f'{tag}/columnar',
+            lambda: encode_columnar(db.read(tag)),
+            COLUMNAR_MEDIA_TYPE,
+        )
+    return cached_read(tag, lambda: db.read(tag))
+
+
+@app.get('/cat5/data/<tag>/index')
+def get_index(tag: str):
+    return cached_read(f'{tag}/index', lambda: db.read_index(tag))
+
+
+@app.get('/cat5/data/<tag>/matchups/<i>')
+def get_matchup(tag: str, i: str):
+    if not i.isdigit():
+        return {'error': f'invalid matchup index: {i}'}, 400
+    return cached_read(
+        f'{tag}/matchups/{i}', lambda: db.read_matchup(tag, int(i)),
+    )
+
+
+@app.get('/cat5/data/<tag>/matchups/<i>/history')
+def get_matchup_history(tag: str, i: str):
+    if not i.isdigit():
+        return {'error': f'invalid matchup index: {i}'}, 400
+    period = app.current_event.get_query_string_value('period', '')
+    if period and not period.isdigit():
+        return {'error': f'invalid matchup period: {period}'}, 400
+    limit = app.current_event.get_query_string_value('limit', '')
+    if limit and not (limit.isdigit() and int(limit) > 0):
+        return {'error': f'invalid limit: {limit}'}, 400
+    n_runs = min(int(limit), MAX_HISTORY_RUNS) if limit else MAX_HISTORY_RUNS
+
+    def fetch() -> Dict[str, Any]:
+        matchup_period = (
+            int(period) if period
+            else db.read_index(tag)['matchupPeriod']
+        )
+        runs = db.read_history(tag, matchup_period, n_runs)
+        return {
+            'matchupPeriod': matchup_period,
+            'series': matchup_series(runs, int(i))[-n_runs:],
+        }
+
+    return cached_read(
+        f'{tag}/matchups/{i}/history/{period}/{n_runs}', fetch,
+    )
+
+
+def cached_read(
+    key: str,
+    fetch: Callable[[], Dict[str, Any]],
+    content_type: str = 'application/json',
+):
     api_event = app.current_event
     cache_param = api_event.get_query_string_value('cache', '')
 
-    if tag in cache and cache_param != 'none':
-        item = cache[tag]
-        if item.ttl > time.time():
-            return item.data, 200
-        else:
-            del cache[tag]
+    start = time.perf_counter()
+    item = stale = None
+    outcome = 'bypass'
+    if cache_param != 'none':
+        item, fresh = cache.get(key)
+        outcome = 'hit' if fresh else 'stale'
+        if item is not None and not fresh and cache.revalidate(key):
+            stale, item = item, None
+
+    if item is None:
+        if outcome != 'bypass':
+            outcome = 'miss'
+        try:
+            item = cache.fetch(key, fetch, stale)
+        except NotFoundError:
+            return {'error': f'data not found: {key}'}, 404
+        if item is stale:
+            outcome = 'stale'
+
+    cache.stats.lookup(outcome)
+    elapsed = 1000 * (time.perf_counter() - start)
+    print(
+        f'--> cache {outcome}: {key} {elapsed:.1f}ms, '
+        f'hit rate {cache.stats.hit_rate:.2f}'
+    )
+    return cached_response(item, content_type)
+
+
+def cached_response(
+    item: CacheItem,
+    content_type: str = 'application/json',
+) -> Response:
+    if_none_match = app.current_event.headers.get('If-None-Match')
+    # the data route serves the columnar format by Accept header
+    headers = {
+        'ETag': item.etag,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept',
+    }
+    if etag_matches(if_none_match, item.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        status_code=200,
+        content_type=content_type,
+        body=item.body,
+        headers=headers,
+    )
 
-    try:
-        data = db.read(tag)
-    except (KeyError, FileNotFoundError):
-        return {'error': f'tag not found: {tag}'}, 404
 
-    cache[tag] = CacheItem(data, time.time() + CACHE_TTL)
-    return data, 200
+if PREFETCH_CONFIG:
+    prefetch(prefetch_tags(PREFETCH_CONFIG))
@@ -0,0 +1,31 @@
+from typing import Any, Dict, List
+
+from storage.history import apply_delta
+
+
+def matchup_series(
+    runs: List[Dict[str, Any]],
+    i: int,
+) -> List[Dict[str, Any]]:
+    """
+    Replays the runs in order, starting with a checkpoint, and returns
+    the forecasts of matchup `i` after each run. Only the matchup's
+    forecasts are reconstructed.
+    """
+    series: List[Dict[str, Any]] = []
+    forecasts: Dict[str, Any] = {}
+    for run in runs:
+        if 'state' in run:
+            matchup = run['state'].get(str(i)) or {}
+            forecasts = matchup.get('forecasts') or {}
+        else:
+            matchup_delta = run['delta'].get(str(i)) or {}
+            forecasts_delta = matchup_delta.get('forecasts')
+            if forecasts_delta:
+                forecasts = apply_delta(forecasts, forecasts_delta)
+        if forecasts:
+            series.append({
+                'updateTimestamp': run['updateTimestamp'],
+                'forecasts': forecasts,
+            })
+    return series
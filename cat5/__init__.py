@@ -1,13 +1,23 @@
 from .matchup import Lineup, Matchup
 from .model import Model
 from .period import MatchupPeriod
+from .planner import DailyPlanner
+from .playoffs import PlayoffOdds
+from .schedule import ScheduleIndex
+from .simulate import Simulator
 from .start import EmptyStart, PlayerStart
+from .waiver import WaiverEvaluator
 
 __all__ = [
     'Matchup',
     'Lineup',
     'MatchupPeriod',
+    'DailyPlanner',
+    'PlayoffOdds',
+    'ScheduleIndex',
+    'Simulator',
     'Model',
     'PlayerStart',
     'EmptyStart',
+    'WaiverEvaluator',
 ]
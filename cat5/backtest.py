@@ -0,0 +1,327 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from espn_api.basketball import League
+from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
+
+from .matchup import Matchup
+from .model import scored_cats
+from .period import MatchupPeriod
+
+BACKTEST_CACHE_DIR = '.backtest-cache'
+CACHE_VERSION = 2
+N_BINS = 10
+
+
+class Snapshot(NamedTuple):
+    """
+    A league and its box scores pickled on `taken`, as in tests/pickles:
+    `league_<YYYYMMDD>.pkl` and `box_scores_<YYYYMMDD>.pkl`
+    """
+    taken: datetime
+    league_path: str
+    box_scores_path: str
+
+
+class Evaluation(NamedTuple):
+    period: int
+    taken: str
+    home_team: int
+    away_team: int
+    cat_p: List[float]
+    win_p: float
+
+
+class ReliabilityBin(NamedTuple):
+    lo: float
+    hi: float
+    n: int
+    mean_p: float
+    freq: float
+
+
+class Metrics(NamedTuple):
+    n: int
+    brier: float
+    log_loss: float
+    reliability: List[ReliabilityBin]
+
+
+class Report(NamedTuple):
+    n_evaluations: int
+    n_snapshots: int
+    metrics: Dict[str, Metrics]
+
+
+class Backtest:
+    """
+    Replays league snapshots through `Model`, or `Matchup.forecast` when
+    players are uncertain to play, and scores the default (probable
+    lineup) forecasts against final outcomes.
+
+    Each snapshot is evaluated with `from_date` set to the day it was
+    taken, since its box scores hold the stats up to then, so a season of
+    daily snapshots gives an evaluation for every (matchup, day). Final
+    results come from `final_box_scores_<period>.pkl` files in the
+    snapshot directory (see `save_final_box_scores`); matchups without a
+    final result are skipped.
+
+    Snapshots are evaluated in parallel processes and the evaluations of
+    each snapshot are cached on disk by the hash of its pickles.
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: str,
+        cache_dir: Optional[str] = BACKTEST_CACHE_DIR,
+        workers: Optional[int] = None,
+    ):
+        self.snapshot_dir = snapshot_dir
+        self.cache_dir = cache_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.snapshots = find_snapshots(snapshot_dir)
+        self.finals = load_final_box_scores(snapshot_dir)
+
+    def run(self) -> Report:
+        evaluations = self.evaluate()
+        outcomes = {
+            key: box_outcome(box)
+            for key, box in self.finals.items()
+            if box.winner != 'UNDECIDED'
+        }
+
+        preds: Dict[str, List[float]] = {c: [] for c in scored_cats + ['win']}
+        actual: Dict[str, List[float]] = {c: [] for c in preds}
+        n = 0
+        for e in evaluations:
+            key = (e.period, e.home_team, e.away_team)
+            if key not in outcomes:
+                continue
+            cat_outcomes, win_outcome = outcomes[key]
+            for cat, p, o in zip(scored_cats, e.cat_p, cat_outcomes):
+                preds[cat].append(p)
+                actual[cat].append(o)
+            preds['win'].append(e.win_p)
+            actual['win'].append(win_outcome)
+            n += 1
+
+        return Report(
+            n_evaluations=n,
+            n_snapshots=len(self.snapshots),
+            metrics={
+                c: score(np.array(preds[c]), np.array(actual[c]))
+                for c in preds
+            },
+        )
+
+    def evaluate(self) -> List[Evaluation]:
+        """
+        Evaluations of every snapshot, from the cache when possible
+        """
+        results: Dict[int, List[Evaluation]] = {}
+        pending: List[Tuple[int, Snapshot, Optional[str]]] = []
+        for i, snapshot in enumerate(self.snapshots):
+            path = self.cache_path(snapshot)
+            if path and os.path.exists(path):
+                with open(path) as f:
+                    results[i] = [Evaluation(*e) for e in json.load(f)]
+            else:
+                pending.append((i, snapshot, path))
+
+        if self.workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(self.workers) as pool:
+                evaluated = list(pool.map(
+                    evaluate_snapshot, [s for _, s, _ in pending],
+                ))
+        else:
+            evaluated = [evaluate_snapshot(s) for _, s, _ in pending]
+
+        for (i, _, path), evaluations in zip(pending, evaluated):
+            results[i] = evaluations
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w') as f:
+                    json.dump(evaluations, f)
+
+        return [e for i in sorted(results) for e in results[i]]
+
+    def cache_path(self, snapshot: Snapshot) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha256(
+            f'v{CACHE_VERSION}:{snapshot.taken.isoformat()}'.encode('utf-8')
+        )
+        for path in (snapshot.league_path, snapshot.box_scores_path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return os.path.join(self.cache_dir, f'{digest.hexdigest()[:24]}.json')
+
+
+def find_snapshots(snapshot_dir: str) -> List[Snapshot]:
+    snapshots = []
+    for name in os.listdir(snapshot_dir):
+        match = re.fullmatch(r'league_(\d{8})\.pkl', name)
+        if not match:
+            continue
+        box_scores_path = os.path.join(
+            snapshot_dir, f'box_scores_{match[1]}.pkl',
+        )
+        if os.path.exists(box_scores_path):
+            snapshots.append(Snapshot(
+                datetime.strptime(match[1], '%Y%m%d'),
+                os.path.join(snapshot_dir, name),
+                box_scores_path,
+            ))
+    return sorted(snapshots)
+
+
+def load_final_box_scores(
+    snapshot_dir: str,
+) -> Dict[Tuple[int, int, int], BoxScore]:
+    """
+    Final box scores keyed by (period, home team id, away team id)
+    """
+    finals = {}
+    for name in os.listdir(snapshot_dir):
+        match = re.fullmatch(r'final_box_scores_(\d+)\.pkl', name)
+        if not match:
+            continue
+        with open(os.path.join(snapshot_dir, name), 'rb') as f:
+            box_scores: List[BoxScore] = pickle.load(f)
+        for box in box_scores:
+            if box.away_team:
+                key = (int(match[1]), box.home_team.team_id,
+                       box.away_team.team_id)
+                finals[key] = box
+    return finals
+
+
+def save_final_box_scores(
+    league: League,
+    periods: List[int],
+    snapshot_dir: str,
+) -> None:
+    """
+    Fetches and pickles the box scores of finished matchup periods
+    """
+    for period in periods:
+        box_scores = league.box_scores(matchup_period=period)
+        path = os.path.join(snapshot_dir, f'final_box_scores_{period}.pkl')
+        with open(path, 'wb') as f:
+            pickle.dump(box_scores, f)
+
+
+def evaluate_snapshot(snapshot: Snapshot) -> List[Evaluation]:
+    """
+    Default forecasts of every matchup in a snapshot, mixed over the
+    availability scenarios when a matchup has uncertain players
+    """
+    with open(snapshot.league_path, 'rb') as f:
+        league: League = pickle.load(f)
+    with open(snapshot.box_scores_path, 'rb') as f:
+        box_scores: List[BoxScore] = pickle.load(f)
+
+    matchup_period = MatchupPeriod(league)
+    evaluations = []
+    for box in box_scores:
+        if not box.away_team:
+            continue
+        matchup = Matchup(box, matchup_period, snapshot.taken)
+        matchup.home_lineup.set_probable()
+        matchup.away_lineup.set_probable()
+        if matchup.is_uncertain:
+            win_p, cat_win = matchup.forecast()
+        else:
+            model = matchup.get_model()
+            win_p, cat_win = model.predict_win(), model.predict_cats()
+        evaluations.append(Evaluation(
+            period=matchup_period.period,
+            taken=snapshot.taken.date().isoformat(),
+            home_team=box.home_team.team_id,
+            away_team=box.away_team.team_id,
+            cat_p=[cat_win[cat] for cat in scored_cats],
+            win_p=win_p,
+        ))
+    return evaluations
+
+
+def box_outcome(box: BoxScore) -> Tuple[List[float], float]:
+    """
+    Home category results (1 win, 0.5 tie, 0 loss) in `scored_cats`
+    order and whether home won 5+ categories
+    """
+    results = {'WIN': 1.0, 'TIE': 0.5, 'LOSS': 0.0}
+    cats = [results.get(box.home_stats[cat]['result'], 0.5)
+            for cat in scored_cats]
+    return cats, float(box.home_wins >= 5)
+
+
+def score(p: np.ndarray, o: np.ndarray, n_bins: int = N_BINS) -> Metrics:
+    """
+    Brier score, log loss and an equal width reliability curve of
+    probabilities `p` against outcomes `o`
+    """
+    if len(p) == 0:
+        return Metrics(0, float('nan'), float('nan'), [])
+
+    clipped = np.clip(p, 1e-6, 1 - 1e-6)
+    log_loss = -np.mean(o * np.log(clipped) + (1 - o) * np.log(1 - clipped))
+    bins = np.minimum((p * n_bins).astype(int), n_bins - 1)
+    reliability = [
+        ReliabilityBin(
+            lo=b / n_bins,
+            hi=(b + 1) / n_bins,
+            n=int((bins == b).sum()),
+            mean_p=float(p[bins == b].mean()),
+            freq=float(o[bins == b].mean()),
+        )
+        for b in range(n_bins) if (bins == b).any()
+    ]
+    return Metrics(
+        n=len(p),
+        brier=float(np.mean((p - o) ** 2)),
+        log_loss=float(log_loss),
+        reliability=reliability,
+    )
+
+
+def format_report(report: Report) -> str:
+    lines = [
+        f'{report.n_evaluations} evaluations '
+        f'from {report.n_snapshots} snapshots',
+        '',
+        f'{"":>6} {"n":>6} {"brier":>8} {"logloss":>8}',
+    ]
+    for cat, m in report.metrics.items():
+        lines.append(f'{cat:>6} {m.n:>6} {m.brier:>8.4f} {m.log_loss:>8.4f}')
+
+    win = report.metrics['win']
+    lines += [
+        '',
+        'win reliability',
+        f'{"bin":>9} {"n":>6} {"p":>6} {"freq":>6}',
+    ]
+    for b in win.reliability:
+        lines.append(
+            f'{b.lo:.1f}-{b.hi:.1f} {b.n:>6} {b.mean_p:>6.3f} {b.freq:>6.3f}'
+        )
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='cat5 model backtest')
+    parser.add_argument('snapshot_dir')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache-dir', default=BACKTEST_CACHE_DIR)
+    args = parser.parse_args()
+
+    backtest = Backtest(args.snapshot_dir, args.cache_dir, args.workers)
+    print(format_report(backtest.run()))
@@ -1,30 +1,13 @@
 starts_per_gameday = 4
-
-matchup_period_start_dates = {
-    2025: {
-        1: '2024-10-21',
-        2: '2024-10-28',
-        3: '2024-11-04',
-        4: '2024-11-11',
-        5: '2024-11-18',
-        6: '2024-11-25',
-        7: '2024-12-02',
-        8: '2024-12-09',
-        9: '2024-12-16',
-        10: '2024-12-23',
-        11: '2024-12-30',
-        12: '2025-01-06',
-        13: '2025-01-13',
-        14: '2025-01-20',
-        15: '2025-01-27',
-        16: '2025-02-03',
-        17: '2025-02-10',
-        18: '2025-02-24',
-        19: '2025-03-03',
-        20: '2025-03-10',
-        21: '2025-03-17',
-        22: '2025-03-24',
-        23: '2025-03-31',
-        24: '2025-04-07',  # end
-    }
+# probability that a player with an uncertain injury status plays, by
+# ESPN injury status. Players of other statuses are certain to play,
+# injured and suspended players are left out of lineups.
+injury_availability = {
+    'PROBABLE': 0.9,
+    'DAY_TO_DAY': 0.75,
+    'QUESTIONABLE': 0.5,
+    'DOUBTFUL': 0.25,
 }
+# availability scenarios a forecast is mixed over, every scenario is
+# enumerated when there are no more than this
+n_scenarios = 64
@@ -1,14 +1,30 @@
-from collections import defaultdict
 from datetime import datetime
-from typing import Any, List, NamedTuple
+from typing import (Any, Dict, Iterable, List, NamedTuple, Optional,
+                    Sequence, Tuple)
 
 import numpy as np
 from espn_api.basketball import Player, Team
 from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
 
-from .model import Model
+from .config import injury_availability, n_scenarios, starts_per_gameday
+from .model import (Model, box_stats_vector, predict_cats_batch,
+                    predict_win_batch, scored_cats, start_stats,
+                    stat_columns)
 from .period import MatchupPeriod
-from .start import EmptyStart, PlayerStart
+from .start import EmptyStart, PlayerStart, ProjectionStore
+
+# (player id, game day id) of a start, stable across runs
+StartId = Tuple[int, str]
+EMPTY_START_ID: StartId = (0, '')
+# sampling weight of warm start starts, above the usual 10-95 range so
+# samples stay near the warm start
+WARM_WEIGHT = 400.0
+# best candidates by expected totals that are rescored over the
+# availability scenarios when a lineup has uncertain players
+RESCORED_CANDIDATES = 16
+# rostered players owned in more leagues than this are never dropped for
+# a free agent
+MAX_DROP_OWNED = 80.0
 
 
 class Matchup:
@@ -21,13 +37,25 @@ class Matchup:
         box: BoxScore,
         matchup_period: MatchupPeriod,
         from_date: datetime = datetime.now(),
+        availability: Optional[Dict[str, float]] = None,
+        n_scenarios: int = n_scenarios,
+        projections: Optional[ProjectionStore] = None,
     ):
         self.box = box
         self.matchup_period = matchup_period
         self.from_date = from_date
+        self.availability = (
+            injury_availability if availability is None else availability
+        )
+        # shared by the starts of both lineups, see `PlayerStart`
+        self.projections = projections
+        self._expected: Dict[StartId, np.ndarray] = {}
 
         self.home_lineup = Lineup(box.home_team, self)
         self.away_lineup = Lineup(box.away_team, self)
+        self.home_curr = box_stats_vector(box.home_stats)
+        self.away_curr = box_stats_vector(box.away_stats)
+        self.set_scenarios(n_scenarios)
 
     def __repr__(self):
         return f'Cat5Matchup(H:{self.box.home_team}, A:{self.box.away_team})'
@@ -35,62 +63,327 @@ class Matchup:
     def get_model(self) -> Model:
         return Model(self.box, self.home_lineup.lineup, self.away_lineup.lineup)
 
-    def optimize_home_lineup(self, n=1000) -> List[PlayerValue]:
-        return self._optimize_lineup(use_home=True, n=n)
+    def win_p(self, home: np.ndarray, away: np.ndarray) -> np.ndarray:
+        """
+        Batched home win probability for `stat_columns` projection totals
+        """
+        return predict_win_batch(
+            predict_cats_batch(self.home_curr, self.away_curr, home, away)
+        )
+
+    def team_win_p(
+        self,
+        use_home: bool,
+        totals: np.ndarray,
+        opp_totals: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Batched win probability of the home or away team for its
+        `stat_columns` totals against the opponent's
+        """
+        if use_home:
+            return self.win_p(totals, opp_totals)
+        return 1 - self.win_p(opp_totals, totals)
+
+    def lineups(self, use_home: bool) -> Tuple['Lineup', 'Lineup']:
+        """
+        The home or away team's lineup and the opponent's
+        """
+        if use_home:
+            return self.home_lineup, self.away_lineup
+        return self.away_lineup, self.home_lineup
 
-    def optimize_away_lineup(self, n=1000) -> List[PlayerValue]:
-        return self._optimize_lineup(use_home=False, n=n)
+    def expected_stats(self, start: PlayerStart) -> np.ndarray:
+        """
+        The `stat_columns` vector of a start times its player's
+        availability, as the start counts in a `Lineup`'s `start_rows`
+        """
+        key = (start.player.playerId, start.game_day_id)
+        if key not in self._expected:
+            availability = self.availability.get(
+                start.player.injuryStatus, 1.0,
+            )
+            self._expected[key] = start_stats(start) * availability
+        return self._expected[key]
+
+    def expected_total(self, starts: Iterable[PlayerStart]) -> np.ndarray:
+        """
+        The summed `expected_stats` of starts, as a `Lineup`'s `totals`
+        """
+        total = np.zeros(len(stat_columns))
+        for start in starts:
+            if not isinstance(start, EmptyStart):
+                total += self.expected_stats(start)
+        return total
+
+    def free_agent_starts(
+        self,
+        players: Iterable[Player],
+    ) -> Dict[int, List[PlayerStart]]:
+        """
+        The remaining starts of the matchup period of each free agent who
+        has any, keyed by player id. Injured and suspended players are
+        left out, as in a `Lineup`.
+        """
+        period = self.matchup_period
+        from_date = max(period.start_date, self.from_date)
+        starts: Dict[int, List[PlayerStart]] = {}
+        for player in players:
+            if player.injured or player.injuryStatus == 'SUSPENSION':
+                continue
+            player_starts = [
+                PlayerStart(player, gid, self.projections)
+                for gid, game in player.schedule.items()
+                if gid in period.game_day_ids and game['date'] >= from_date
+            ]
+            if player_starts:
+                starts[player.playerId] = player_starts
+        return starts
+
+    @property
+    def is_uncertain(self) -> bool:
+        """
+        Whether either team has players who may not play
+        """
+        return bool(
+            len(self.home_lineup.uncertain) or len(self.away_lineup.uncertain)
+        )
 
-    def _optimize_lineup(self, use_home: bool, n: int) -> List[PlayerValue]:
+    def set_scenarios(self, n: int) -> None:
+        """
+        Draws the availability scenarios of the uncertain players of both
+        teams: (scenario, uncertain player) masks of who plays and the
+        scenario weights. All combinations are enumerated when there are
+        at most `n`, otherwise `n` equally weighted scenarios are sampled.
+        """
+        p = np.concatenate([
+            self.home_lineup.availability[self.home_lineup.uncertain],
+            self.away_lineup.availability[self.away_lineup.uncertain],
+        ])
+        k = len(p)
+        n = max(n, 1)
+        if 2 ** k <= n:
+            plays = (np.arange(2 ** k)[:, None] >> np.arange(k)) & 1 > 0
+            weights = np.where(plays, p, 1 - p).prod(axis=1)
+        else:
+            plays = np.random.random((n, k)) < p
+            weights = np.full(n, 1 / n)
+        n_home = len(self.home_lineup.uncertain)
+        self.home_plays = plays[:, :n_home].astype(float)
+        self.away_plays = plays[:, n_home:].astype(float)
+        self.scenario_weights = weights
+
+    def mixture(
+        self,
+        home_lineups: List[np.ndarray],
+        away_lineups: List[np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Home win and `scored_cats` win probabilities of index lineups
+        (broadcast against each other) averaged over the availability
+        scenarios, with every scenario evaluated in one batch
+        """
+        home = self.home_lineup.scenario_totals(home_lineups, self.home_plays)
+        away = self.away_lineup.scenario_totals(away_lineups, self.away_plays)
+        cat_probs = predict_cats_batch(
+            self.home_curr, self.away_curr, home, away,
+        )
+        win_p = predict_win_batch(cat_probs)
+        weights = self.scenario_weights
+        return win_p @ weights, np.einsum('nsc,s->nc', cat_probs, weights)
+
+    def forecast(self) -> Tuple[float, Dict[str, float]]:
+        """
+        Home win and category win probabilities of the current lineups,
+        mixed over the availability scenarios
+        """
+        win_p, cat_probs = self.mixture(
+            [self.home_lineup.selected], [self.away_lineup.selected],
+        )
+        return (
+            float(win_p[0]),
+            {cat: float(p) for cat, p in zip(scored_cats, cat_probs[0])},
+        )
+
+    def optimize_home_lineup(
+        self,
+        n=1000,
+        warm: Optional[Sequence[StartId]] = None,
+    ) -> List[PlayerValue]:
+        return self._optimize_lineup(use_home=True, n=n, warm=warm)
+
+    def optimize_away_lineup(
+        self,
+        n=1000,
+        warm: Optional[Sequence[StartId]] = None,
+    ) -> List[PlayerValue]:
+        return self._optimize_lineup(use_home=False, n=n, warm=warm)
+
+    def optimize_both_lineups(self, n=1000, max_rounds=10) -> float:
+        """
+        Alternates best responses between the home and away lineups until
+        neither side changes, starting from the probable lineups, and
+        leaves both lineups set to the result. Returns the home win
+        probability.
+
+        Each side's candidates are sampled once, like `_optimize_lineup`,
+        and kept as `stat_columns` totals, so each best response is a
+        single batched evaluation of all candidates against the other
+        side's current lineup.
+        """
+        self.home_lineup.set_probable()
+        self.away_lineup.set_probable()
+        home_lineups = self.home_lineup.sample(n)
+        away_lineups = self.away_lineup.sample(n)
+        home_totals = self.home_lineup.totals(home_lineups)
+        away_totals = self.away_lineup.totals(away_lineups)
+
+        h, a = 0, 0
+        for _ in range(max_rounds):
+            new_h = int(np.argmax(self.win_p(home_totals, away_totals[a])))
+            new_a = int(np.argmin(self.win_p(home_totals[new_h], away_totals)))
+            if (new_h, new_a) == (h, a):
+                break
+            h, a = new_h, new_a
+
+        self.home_lineup.selected = home_lineups[h]
+        self.away_lineup.selected = away_lineups[a]
+        return float(self.win_p(home_totals[h], away_totals[a]))
+
+    def _optimize_lineup(
+        self,
+        use_home: bool,
+        n: int,
+        warm: Optional[Sequence[StartId]] = None,
+    ) -> List[PlayerValue]:
+        """
+        Samples `n` random lineups against the opponent's current lineup,
+        scores them in one batch and keeps the best one. A player's value
+        is the average win probability of the samples they start in,
+        scaled between the worst sample and the kept lineup.
+
+        `warm` is a previous best lineup. Its starts that are still
+        eligible replace the current lineup and samples are drawn around
+        it, so fewer are needed to improve on it. Samples near it favor
+        its players, so `n` unbiased samples are drawn as well and only
+        those are used for the player values.
+
+        Samples are scored on expected totals. With uncertain players the
+        best `RESCORED_CANDIDATES` and the current lineup are rescored
+        over the availability scenarios and the best of those is kept, its
+        mixed win probability being the top of the value scale.
+        """
         lineup = self.home_lineup if use_home else self.away_lineup
+        opp_lineup = self.away_lineup if use_home else self.home_lineup
 
-        best_lineup: List[PlayerStart] = lineup.lineup
-        best_win_p = self.get_model().predict_win()
-        best_win_p = best_win_p if use_home else 1 - best_win_p
-        worst_win_p = 1 - best_win_p
-        player_id_map: defaultdict[int, Player] = defaultdict(Player)
-        player_win_p: defaultdict[int, float] = defaultdict(float)
-        player_count: defaultdict[int, int] = defaultdict(int)
+        near = None
+        if warm:
+            lineup.set_warm(warm)
+            near = lineup.selected
 
-        for _ in range(n):
-            lineup.set_randomly(min_w=10, max_w=95)
-            win_p = self.get_model().predict_win()
-            win_p = win_p if use_home else 1 - win_p
-            for player_start in lineup.lineup:
-                pid = player_start.player.playerId
-                player_id_map[pid] = player_start.player
-                player_win_p[pid] += win_p
-                player_count[pid] += 1
-            if win_p > best_win_p:
-                best_win_p = win_p
-                best_lineup = lineup.lineup
-            if win_p < worst_win_p:
-                worst_win_p = win_p
-
-        player_values = {
-            pid: player_win_p[pid] / player_count[pid]
-            for pid in player_id_map
-        }
-        lineup.lineup = sorted(
-            best_lineup,
-            key=lambda p: player_values[p.player.playerId],
-            reverse=True,
+        # the current lineup followed by the samples, the last `n` of
+        # which are unbiased
+        lineups = lineup.sample(n, near)
+        if near is not None:
+            lineups += lineup.sample(n)[1:]
+        valued = len(lineups) - n
+        totals = lineup.totals(lineups)
+        opp_total = opp_lineup.totals([opp_lineup.selected])[0]
+        if use_home:
+            win_p = self.win_p(totals, opp_total)
+        else:
+            win_p = 1 - self.win_p(opp_total, totals)
+
+        best = int(np.argmax(win_p))
+        best_win_p = float(win_p[best])
+        if self.is_uncertain:
+            best, best_win_p = self._rescore(use_home, lineups, win_p)
+        worst_win_p = float(min(1 - win_p[0], win_p[1:].min(initial=1.0)))
+
+        # win probability summed over every start of a player in an
+        # unbiased sample
+        samples = lineups[valued:] or [np.array([], dtype=int)]
+        sample_players = np.concatenate(
+            [lineup.start_player[s] for s in samples]
         )
+        sample_wins = np.repeat(
+            win_p[valued:], [len(s) for s in lineups[valued:]],
+        )
+        n_players = len(lineup.players)
+        player_win_p = np.bincount(
+            sample_players, weights=sample_wins, minlength=n_players,
+        )
+        player_count = np.bincount(sample_players, minlength=n_players)
+        # players in order of first appearance
+        _, first = np.unique(sample_players, return_index=True)
+        seen = sample_players[np.sort(first)]
+        player_values = np.zeros(n_players)
+        player_values[seen] = player_win_p[seen] / player_count[seen]
+
+        order = np.argsort(
+            -player_values[lineup.start_player[lineups[best]]],
+            kind='stable',
+        )
+        lineup.selected = lineups[best][order]
         return sorted(
             [
                 self.PlayerValue(
-                    player_id_map[pid],
-                    float((pv - worst_win_p) / (best_win_p - worst_win_p))
+                    lineup.players[p],
+                    float((player_values[p] - worst_win_p) /
+                          (best_win_p - worst_win_p))
                     if best_win_p > worst_win_p else 1.0,
                 )
-                for pid, pv in player_values.items()
+                for p in seen
             ],
             key=lambda x: (x.value, x.player.percent_owned),
             reverse=True,
         )
 
+    def _rescore(
+        self,
+        use_home: bool,
+        lineups: List[np.ndarray],
+        win_p: np.ndarray,
+    ) -> Tuple[int, float]:
+        """
+        The best of the current lineup and the top samples by `win_p`
+        when mixed over the availability scenarios, with its mixed win
+        probability
+        """
+        top = np.argsort(-win_p, kind='stable')[:RESCORED_CANDIDATES]
+        candidates = np.unique(np.r_[0, top])
+        candidate_lineups = [lineups[i] for i in candidates]
+        if use_home:
+            mixed, _ = self.mixture(
+                candidate_lineups, [self.away_lineup.selected],
+            )
+        else:
+            home_p, _ = self.mixture(
+                [self.home_lineup.selected], candidate_lineups,
+            )
+            mixed = 1 - home_p
+        i = int(np.argmax(mixed))
+        return int(candidates[i]), float(mixed[i])
+
 
 class Lineup:
+    """
+    A team's eligible starts for the rest of the matchup period, kept in
+    parallel arrays indexed by start: the player (`start_player`, into
+    `players`), the game day (`start_day`, into `game_day_ids`), the
+    default and probable weights, and the `stat_columns` projection row
+    (`start_rows`). The last start is the empty start.
+
+    Players whose injury status makes them uncertain to play
+    (`uncertain`, indices into `players`) count in `start_rows` at their
+    `availability` times their projections, so `totals` are expected
+    totals. `scenario_totals` gives the totals of availability scenarios.
+
+    A lineup is an array of start indices (`selected`). `PlayerStart`
+    objects are only made for output, through `lineup` and
+    `eligible_starts`, and are reused so their identity is stable.
+    """
+
     class EligibleStart(NamedTuple):
         player_start: PlayerStart
         std_weight: float
@@ -98,7 +391,7 @@ class Lineup:
 
     def __init__(self, team: Team, matchup: Matchup):
         self.team = team
-        self.lineup: List[PlayerStart] = []
+        self.projections = matchup.projections
         box_home_team: Team = matchup.box.home_team
         box_away_team: Team = matchup.box.away_team
         if team.team_id == box_home_team.team_id:
@@ -115,83 +408,274 @@ class Lineup:
             for player in box_lineup
         }
 
-        start_list = [
-            PlayerStart(player, gid)
-            for player in team.roster
-            for gid, game in player.schedule.items()
-            if gid in matchup.matchup_period.game_day_ids
-            and game['date'] >= matchup.from_date
-            and not player.injured
-            and player.injuryStatus != 'SUSPENSION'
-        ]
-
-        self.eligible_starts: List[Lineup.EligibleStart] = [
-            self.EligibleStart(
-                start,
-                start.player.percent_owned,
-                probable_start_score(
-                    start.player.percent_owned,
-                    player_gp.get(start.player.playerId, 0),
-                ),
+        roster = {player.playerId: player for player in team.roster}
+        period = matchup.matchup_period
+        scheduled = [
+            s for s in period.schedule.starts_between(
+                max(period.start_date, matchup.from_date), period.end_date,
             )
-            for start in start_list
+            if s.player_id in roster
+            and not roster[s.player_id].injured
+            and roster[s.player_id].injuryStatus != 'SUSPENSION'
         ]
-        self.eligible_starts += [
-            self.EligibleStart(EmptyStart(), 0.0, 0.0)
+
+        self.players: List[Player] = []
+        self.game_day_ids: List[str] = []
+        player_index: Dict[int, int] = {}
+        day_index: Dict[str, int] = {}
+        player_rows: List[np.ndarray] = []
+        for s in scheduled:
+            if s.player_id not in player_index:
+                player = roster[s.player_id]
+                player_index[s.player_id] = len(self.players)
+                self.players.append(player)
+                # projections depend on the player only
+                player_rows.append(
+                    start_stats(PlayerStart(
+                        player, s.game_day_id, matchup.projections,
+                    ))
+                )
+            if s.game_day_id not in day_index:
+                day_index[s.game_day_id] = len(self.game_day_ids)
+                self.game_day_ids.append(s.game_day_id)
+
+        empty = EmptyStart()
+        self.players.append(empty.player)
+        player_rows.append(np.zeros(len(stat_columns)))
+        self.empty_index = len(scheduled)
+        self.player_rows = np.stack(player_rows)
+        self.availability = np.array(
+            [matchup.availability.get(p.injuryStatus, 1.0)
+             for p in self.players[:-1]] + [1.0]
+        )
+        self.uncertain = np.flatnonzero(self.availability < 1.0)
+
+        self.start_player = np.array(
+            [player_index[s.player_id] for s in scheduled] +
+            [len(self.players) - 1],
+            dtype=int,
+        )
+        self.start_day = np.array(
+            [day_index[s.game_day_id] for s in scheduled] + [-1],
+            dtype=int,
+        )
+        owned = np.array([p.percent_owned for p in self.players])
+        gp = np.array([player_gp.get(p.playerId, 0) for p in self.players])
+        self.std_weight = owned[self.start_player]
+        self.probable_weight = probable_start_score(owned, gp)[
+            self.start_player
         ]
+        self.probable_weight[self.empty_index] = 0.0
+        self.start_rows = (
+            self.player_rows * self.availability[:, None]
+        )[self.start_player]
+
+        self._starts: List[Optional[PlayerStart]] = [None] * len(scheduled)
+        self._starts.append(empty)
+        self._start_index = {
+            (s.player_id, s.game_day_id): i for i, s in enumerate(scheduled)
+        }
+        self._start_index[EMPTY_START_ID] = self.empty_index
 
         self.remaining_gp = int(
             matchup.matchup_period.max_gp -
             box_stats['GP']['value']
         )
+        self.selected = np.array([], dtype=int)
         self.set_default()
 
     def __repr__(self):
         return f'Lineup({[str(s) for s in self.lineup]})'
 
-    def set_default(self) -> None:
-        sorted_starts = [
-            es.player_start
-            for es in sorted(
-                self.eligible_starts,
-                key=lambda x: x.std_weight,
-                reverse=True,
+    @property
+    def lineup(self) -> List[PlayerStart]:
+        return [self.start(i) for i in self.selected]
+
+    @lineup.setter
+    def lineup(self, starts: Iterable[PlayerStart]) -> None:
+        self.selected = np.array(
+            [self.start_index(s) for s in starts], dtype=int,
+        )
+
+    @property
+    def eligible_starts(self) -> List['Lineup.EligibleStart']:
+        return [
+            self.EligibleStart(
+                self.start(i),
+                float(self.std_weight[i]),
+                float(self.probable_weight[i]),
             )
+            for i in range(len(self.start_player))
         ]
-        self.lineup = sorted_starts[:self.remaining_gp]
 
-    def set_probable(self) -> None:
-        sorted_starts = [
-            es.player_start
-            for es in sorted(
-                self.eligible_starts,
-                key=lambda x: x.probable_weight,
-                reverse=True,
+    def start(self, i: int) -> PlayerStart:
+        start = self._starts[i]
+        if start is None:
+            start = PlayerStart(
+                self.players[self.start_player[i]],
+                self.game_day_ids[self.start_day[i]],
+                self.projections,
             )
-        ]
-        self.lineup = sorted_starts[:self.remaining_gp]
+            self._starts[i] = start
+        return start
 
-    def set_randomly(self, probable=False, min_w=0.0, max_w=100.0) -> None:
-        if len(self.eligible_starts) <= self.remaining_gp:
-            self.lineup = [es.player_start for es in self.eligible_starts]
-            return
+    def start_index(self, start: PlayerStart) -> int:
+        if isinstance(start, EmptyStart):
+            return self.empty_index
+        return self._start_index[(start.player.playerId, start.game_day_id)]
 
-        bounded_weights = [
-            max(min_w, min(max_w, es.probable_weight if probable else es.std_weight))
-            for es in self.eligible_starts
+    def set_default(self) -> None:
+        self.selected = self.fill(np.argsort(-self.std_weight, kind='stable'))
+
+    def set_probable(self) -> None:
+        self.selected = self.probable()
+
+    def probable(self) -> np.ndarray:
+        """
+        The probable index lineup, without selecting it
+        """
+        return self.fill(np.argsort(-self.probable_weight, kind='stable'))
+
+    def set_randomly(
+        self,
+        probable=False,
+        min_w=0.0,
+        max_w=100.0,
+        near: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Fills slots in a random weighted order. Starts in `near` are
+        weighted `WARM_WEIGHT` to draw lineups close to them.
+        """
+        weights = self.probable_weight if probable else self.std_weight
+        weights = np.clip(weights, min_w, max_w)
+        if near is not None:
+            weights[near] = WARM_WEIGHT
+        self.selected = self.fill(random_order_index(weights))
+
+    def set_warm(self, starts: Iterable[StartId]) -> int:
+        """
+        Selects the given starts that are still eligible, in order, and
+        fills the remaining slots by probable weight. Returns how many of
+        the given starts were kept.
+        """
+        kept = [
+            self._start_index[s] for s in starts if s in self._start_index
+        ]
+        kept_set = set(kept)
+        rest = [
+            i for i in np.argsort(-self.probable_weight, kind='stable')
+            if i not in kept_set
         ]
-        self.lineup = random_draw(
-            [es.player_start for es in self.eligible_starts],
-            self.remaining_gp,
-            bounded_weights,
+        self.selected = self.fill(np.array(kept + rest, dtype=int))
+        return len(kept)
+
+    def start_ids(self) -> List[StartId]:
+        """
+        The selected starts, for `set_warm`
+        """
+        return [
+            EMPTY_START_ID if i == self.empty_index else
+            (int(self.players[self.start_player[i]].playerId),
+             self.game_day_ids[self.start_day[i]])
+            for i in self.selected
+        ]
+
+    def sample(
+        self,
+        n: int,
+        near: Optional[np.ndarray] = None,
+    ) -> List[np.ndarray]:
+        """
+        The current lineup followed by `n` random lineups, leaving the
+        last one set
+        """
+        lineups = [self.selected]
+        for _ in range(n):
+            self.set_randomly(min_w=10, max_w=95, near=near)
+            lineups.append(self.selected)
+        return lineups
+
+    def totals(self, lineups: List[np.ndarray]) -> np.ndarray:
+        """
+        (lineup, `stat_columns`) projection totals of index lineups
+        """
+        return np.stack([self.start_rows[s].sum(axis=0) for s in lineups])
+
+    def scenario_totals(
+        self,
+        lineups: List[np.ndarray],
+        plays: np.ndarray,
+    ) -> np.ndarray:
+        """
+        (lineup, scenario, `stat_columns`) projection totals of index
+        lineups in availability scenarios, given as a (scenario,
+        `uncertain` player) mask of who plays. Starts of a player share
+        one projection row, so a scenario moves the expected totals by
+        the player's starts times their row for each uncertain player.
+        """
+        totals = self.totals(lineups)
+        counts = np.stack([
+            np.bincount(self.start_player[s], minlength=len(self.players))
+            for s in lineups
+        ])[:, self.uncertain]
+        deviation = plays - self.availability[self.uncertain]
+        return totals[:, None, :] + np.einsum(
+            'nk,sk,kc->nsc',
+            counts, deviation, self.player_rows[self.uncertain],
         )
 
+    def fill(self, order: np.ndarray) -> np.ndarray:
+        """
+        The starts of `order` that fit the lineup (see `fill_days`)
+        """
+        return order[fill_days(self.start_day[order], self.remaining_gp)]
+
 
-def probable_start_score(percent_owned: float, gp: int) -> float:
+def probable_start_score(percent_owned: Any, gp: Any) -> Any:
     return (percent_owned + 100*gp) / (1 + gp)
 
 
-def random_draw(arr: List[Any], n: int, w_arr: List[float]) -> List[Any]:
-    total = sum(w_arr)
-    p_arr = [w / total for w in w_arr]
-    return list(np.random.choice(a=arr, size=n, replace=False, p=p_arr))
+def fill_days(days: np.ndarray, remaining_gp: int) -> np.ndarray:
+    """
+    Positions of the starts taken when filling a lineup with starts in
+    order, given by their game days: starts on days that already have
+    `starts_per_gameday` starts are skipped until `remaining_gp` are
+    taken. This is the per-day top-k of the ordering. Negative days are
+    empty starts and always fit.
+    """
+    # rank of each start among the earlier starts of its day
+    by_day = np.argsort(days, kind='stable')
+    sorted_days = days[by_day]
+    new_day = np.r_[True, sorted_days[1:] != sorted_days[:-1]]
+    first = np.flatnonzero(new_day)
+    sizes = np.diff(np.r_[first, len(days)])
+    rank = np.empty(len(days), dtype=int)
+    rank[by_day] = np.arange(len(days)) - np.repeat(first, sizes)
+
+    keep = (rank < starts_per_gameday) | (days < 0)
+    return np.flatnonzero(keep)[:max(remaining_gp, 0)]
+
+
+def is_droppable(player: Player) -> bool:
+    """
+    Whether a rostered player can be dropped for a free agent: healthy
+    and not owned in more than `MAX_DROP_OWNED` percent of leagues, so
+    injured, day-to-day and core players are kept
+    """
+    return (
+        not player.injured
+        and player.injuryStatus == 'ACTIVE'
+        and player.percent_owned <= MAX_DROP_OWNED
+    )
+
+
+def random_order_index(w_arr: np.ndarray) -> np.ndarray:
+    """
+    Random ordering of indices equivalent to repeated weighted draws
+    without replacement (Gumbel top-k)
+    """
+    with np.errstate(divide='ignore'):
+        keys = np.log(np.asarray(w_arr, dtype=float))
+    keys += np.random.gumbel(size=len(keys))
+    return np.argsort(-keys, kind='stable')
@@ -1,5 +1,5 @@
 from functools import cache
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, TypeAlias
 
 import numpy as np
 from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
@@ -17,6 +17,8 @@ ratio_to_count_cats = {
     'FT%': ('FTA', 'FTM'),
 }
 
+FloatOrArray: TypeAlias = float | np.ndarray
+
 
 class Model:
     def __init__(
@@ -77,9 +79,9 @@ class Model:
         mu_away = sum(away_starts)
 
         if mu_home > 10 and mu_away > 10:
-            return 1 - skellam_cdf_approx(-diff, mu_home, mu_away)
+            return 1 - float(skellam_cdf_approx(-diff, mu_home, mu_away))
         else:
-            return 1 - skellam_cdf_continuous(-diff, mu_home, mu_away)
+            return 1 - float(skellam_cdf_continuous(-diff, mu_home, mu_away))
 
     def _predict_ratio_cat(self, cat: str) -> float:
         """
@@ -132,16 +134,123 @@ def get_proj_list(starts: Iterable[PlayerStart], cat: str) -> List[float]:
     return [start.projection(cat) for start in starts]
 
 
-def skellam_cdf_continuous(k: float, mu1: float, mu2: float) -> float:
+def skellam_cdf_continuous(
+    k: FloatOrArray,
+    mu1: FloatOrArray,
+    mu2: FloatOrArray,
+) -> FloatOrArray:
     """
     Breaks ties (i.e. x = k) with 50-50 probability
     """
-    mu1 = max(mu1, 1e-6)
-    mu2 = max(mu2, 1e-6)
+    mu1 = np.maximum(mu1, 1e-6)
+    mu2 = np.maximum(mu2, 1e-6)
     cdf_val = skellam.cdf(k, mu1, mu2)
     pmf_val = skellam.pmf(k, mu1, mu2)
     return cdf_val - 0.5 * pmf_val
 
 
-def skellam_cdf_approx(k: float, mu1: float, mu2: float) -> float:
-    return norm.cdf(k, mu1 - mu2, max(np.sqrt(mu1 + mu2), 1e-9))
+def skellam_cdf_approx(
+    k: FloatOrArray,
+    mu1: FloatOrArray,
+    mu2: FloatOrArray,
+) -> FloatOrArray:
+    return norm.cdf(k, mu1 - mu2, np.maximum(np.sqrt(mu1 + mu2), 1e-9))
+
+
+# Batched evaluation on projection totals. A set of starts is summarized
+# by `stat_columns`: the count category projections plus, for each ratio
+# category, the projected attempts, makes and binomial variance. Totals
+# are additive over starts, so any batch of lineups can be scored from a
+# (..., len(stat_columns)) array.
+stat_columns = count_cats + [
+    f'{cat}:{stat}' for cat in ratio_cats for stat in ('att', 'make', 'var')
+]
+
+
+def start_stats(start: PlayerStart) -> np.ndarray:
+    """
+    The `stat_columns` vector of a single start
+    """
+    values = [start.projection(cat) for cat in count_cats]
+    for cat in ratio_cats:
+        att_cat, _ = ratio_to_count_cats[cat]
+        att = start.projection(att_cat)
+        ratio = start.projection(cat)
+        values += [att, att * ratio, att * ratio * (1 - ratio)]
+    return np.array(values, dtype=float)
+
+
+def box_stats_vector(stats: Dict[str, Dict[str, float]]) -> np.ndarray:
+    """
+    The `stat_columns` vector of a team's current box score stats
+    """
+    values = [stats[cat]['value'] for cat in count_cats]
+    for cat in ratio_cats:
+        att_cat, make_cat = ratio_to_count_cats[cat]
+        values += [stats[att_cat]['value'], stats[make_cat]['value'], 0.0]
+    return np.array(values, dtype=float)
+
+
+def predict_cats_batch(
+    home_curr: np.ndarray,
+    away_curr: np.ndarray,
+    home_proj: np.ndarray,
+    away_proj: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorized `Model.predict_cat` for every scored category. Takes
+    current and projected `stat_columns` totals that broadcast together
+    and returns home category win probabilities with a trailing axis
+    ordered as `scored_cats`.
+    """
+    col = {c: i for i, c in enumerate(stat_columns)}
+    home_curr, away_curr, home_proj, away_proj = np.broadcast_arrays(
+        home_curr, away_curr, home_proj, away_proj,
+    )
+    probs: Dict[str, np.ndarray] = {}
+
+    for cat in count_cats:
+        i = col[cat]
+        diff = home_curr[..., i] - away_curr[..., i]
+        mu_home = home_proj[..., i]
+        mu_away = away_proj[..., i]
+        p = np.where(
+            (mu_home > 10) & (mu_away > 10),
+            1 - skellam_cdf_approx(-diff, mu_home, mu_away),
+            1 - skellam_cdf_continuous(-diff, mu_home, mu_away),
+        )
+        probs[cat] = 1 - p if cat in negative_cats else p
+
+    for cat in ratio_cats:
+        att, make, var = (col[f'{cat}:{s}'] for s in ('att', 'make', 'var'))
+        home_att_total = home_curr[..., att] + home_proj[..., att]
+        away_att_total = away_curr[..., att] + away_proj[..., att]
+        diff = (
+            home_curr[..., make] / home_att_total -
+            away_curr[..., make] / away_att_total
+        )
+        mu = (
+            home_proj[..., make] / home_att_total -
+            away_proj[..., make] / away_att_total
+        )
+        sd = np.sqrt(
+            home_proj[..., var] / home_att_total ** 2 +
+            away_proj[..., var] / away_att_total ** 2
+        )
+        probs[cat] = 1 - norm.cdf(-diff, mu, np.maximum(sd, 1e-9))
+
+    return np.stack([probs[cat] for cat in scored_cats], axis=-1)
+
+
+def predict_win_batch(cat_probs: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `Model.predict_win`: probability of winning 5+ categories
+    given independent category win probabilities on the trailing axis
+    """
+    dist = np.zeros(cat_probs.shape[:-1] + (cat_probs.shape[-1] + 1,))
+    dist[..., 0] = 1.0
+    for k in range(cat_probs.shape[-1]):
+        p = cat_probs[..., k:k + 1]
+        dist[..., 1:] = dist[..., 1:] * (1 - p) + dist[..., :-1] * p
+        dist[..., 0] *= 1 - p[..., 0]
+    return dist[..., 5:].sum(axis=-1)
@@ -1,30 +1,23 @@
-from datetime import datetime
-from typing import Set
+from typing import Optional, Set
 
 from espn_api.basketball import League
 
-from .config import matchup_period_start_dates, starts_per_gameday
+from .config import starts_per_gameday
+from .schedule import ScheduleIndex
 
 
 class MatchupPeriod:
-    def __init__(self, league: League):
+    def __init__(
+        self,
+        league: League,
+        schedule: Optional[ScheduleIndex] = None,
+    ):
         self.period: int = league.currentMatchupPeriod
-        self.start_date, self.end_date = [
-            datetime.strptime(date, '%Y-%m-%d')
-            for date in (
-                matchup_period_start_dates[league.year][self.period],
-                matchup_period_start_dates[league.year][self.period + 1]
-            )
-        ]
-        self.game_day_ids: Set[int] = set()
-
-        for team in league.teams:
-            for player in team.roster:
-                for gid, game in player.schedule.items():
-                    game_date = game['date']
-                    if game_date >= self.start_date and game_date < self.end_date:
-                        self.game_day_ids.add(gid)
-
+        self.schedule = schedule or ScheduleIndex(league)
+        self.start_date, self.end_date = self.schedule.period_dates[self.period]
+        self.game_day_ids: Set[str] = self.schedule.game_day_ids_between(
+            self.start_date, self.end_date,
+        )
         self.max_gp = len(self.game_day_ids) * starts_per_gameday
 
     def __repr__(self):
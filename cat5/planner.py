@@ -0,0 +1,298 @@
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from espn_api.basketball import Player
+
+from .config import starts_per_gameday
+from .matchup import Matchup, fill_days, is_droppable
+from .start import EmptyStart, PlayerStart
+
+
+class DayPlan(NamedTuple):
+    game_date: date
+    game_day_id: str
+    starts: List[PlayerStart]
+    add: Optional[Player]
+    drop: Optional[Player]
+
+
+class StreamingPlan(NamedTuple):
+    days: List[DayPlan]
+    win: float
+
+
+class DailyPlanner:
+    """
+    Plans one team's starts for the rest of the matchup period, game day
+    by game day, against the opponent's probable lineup.
+
+    The win probability only depends on the `stat_columns` totals, so it
+    is linearized around the current plan: each start is scored by the
+    gradient of the win probability dotted with its stats, and a dynamic
+    program over the remaining game days picks how many starts to use on
+    each day (the best ones of that day) within the per-day cap and the
+    remaining games played. The plan is rolled out, the gradient is taken
+    again at its totals, and this repeats for `n_rounds` or until the plan
+    stops changing. Starts of players uncertain to play count at their
+    availability, as in the lineup optimizer's expected totals.
+
+    With a free agent pool, streaming moves are searched greedily: adding
+    a free agent on one of their game days and dropping the droppable
+    rostered player (see `is_droppable`) whose planned starts from that
+    day on are worth the least. The best candidates by the linearized
+    objective are scored exactly in one batch and a move is kept when it
+    raises the win probability.
+    """
+
+    def __init__(
+        self,
+        matchup: Matchup,
+        use_home: bool,
+        free_agents: Iterable[Player] = (),
+        max_adds: int = 1,
+        n_rounds: int = 3,
+        n_candidates: int = 10,
+    ):
+        self.matchup = matchup
+        self.use_home = use_home
+        self.max_adds = max_adds
+        self.n_rounds = n_rounds
+        self.n_candidates = n_candidates
+
+        self.lineup, opp_lineup = matchup.lineups(use_home)
+        self.opp_total = opp_lineup.totals([opp_lineup.probable()])[0]
+
+        self.roster_starts: List[PlayerStart] = [
+            es.player_start for es in self.lineup.eligible_starts
+            if not isinstance(es.player_start, EmptyStart)
+        ]
+        self.free_agent_starts = matchup.free_agent_starts(free_agents)
+        self.free_agents: Dict[int, Player] = {
+            pid: starts[0].player
+            for pid, starts in self.free_agent_starts.items()
+        }
+
+        game_days = {s.game_day_id: s.game_date for s in self.roster_starts}
+        for starts in self.free_agent_starts.values():
+            game_days.update({s.game_day_id: s.game_date for s in starts})
+        self.game_days: List[Tuple[str, date]] = sorted(
+            game_days.items(), key=lambda x: x[1],
+        )
+        self.day_index = {gid: d for d, (gid, _) in enumerate(self.game_days)}
+
+    def plan(self) -> StreamingPlan:
+        """
+        Returns the recommended starts and streaming moves for each
+        remaining game day with the resulting win probability
+        """
+        moves: List[Tuple[int, Player, Player]] = []
+        roster = {p.playerId: p for p in self.lineup.team.roster}
+        candidates = list(self.roster_starts)
+        days, win = self.optimize(candidates)
+
+        for _ in range(self.max_adds):
+            move = self.best_move(roster, candidates, days, win)
+            if move is None:
+                break
+            day, add, drop, candidates = move
+            moves.append((day, add, drop))
+            roster.pop(drop.playerId)
+            roster[add.playerId] = add
+            days, win = self.optimize(candidates)
+
+        day_moves = {day: (add, drop) for day, add, drop in moves}
+        return StreamingPlan(
+            days=[
+                DayPlan(
+                    game_date=game_date,
+                    game_day_id=gid,
+                    starts=days[d],
+                    add=day_moves.get(d, (None, None))[0],
+                    drop=day_moves.get(d, (None, None))[1],
+                )
+                for d, (gid, game_date) in enumerate(self.game_days)
+            ],
+            win=win,
+        )
+
+    def optimize(
+        self,
+        candidates: List[PlayerStart],
+    ) -> Tuple[List[List[PlayerStart]], float]:
+        """
+        Best per-day starts out of `candidates` by linearized rollout,
+        with the exact win probability of the plan
+        """
+        probable = {id(self.lineup.start(i)) for i in self.lineup.probable()}
+        ordered = sorted(candidates, key=lambda s: id(s) not in probable)
+        ordered_days = np.array(
+            [self.day_index[s.game_day_id] for s in ordered], dtype=int,
+        )
+        seed = [
+            ordered[k]
+            for k in fill_days(ordered_days, self.lineup.remaining_gp)
+        ]
+        best_days = self.split_days(seed)
+        best_win = float(self.win(self.matchup.expected_total(seed)))
+
+        days = best_days
+        for _ in range(self.n_rounds):
+            grad = self.gradient(self.days_total(days))
+            scores = self.scores(grad, candidates)
+            new_days, _ = self.allocate(candidates, scores)
+            if new_days == days:
+                break
+            days = new_days
+            win = float(self.win(self.days_total(days)))
+            if win > best_win:
+                best_days, best_win = days, win
+        return best_days, best_win
+
+    def best_move(
+        self,
+        roster: Dict[int, Player],
+        candidates: List[PlayerStart],
+        days: List[List[PlayerStart]],
+        win: float,
+    ) -> Optional[Tuple[int, Player, Player, List[PlayerStart]]]:
+        """
+        The add/drop on a game day that most improves the plan, or None
+        when no move helps
+        """
+        grad = self.gradient(self.days_total(days))
+        scores = self.scores(grad, candidates)
+        for starts in self.free_agent_starts.values():
+            scores.update(self.scores(grad, starts))
+
+        droppable = {p for p, player in roster.items() if is_droppable(player)}
+        options = []
+        for pid, fa_starts in self.free_agent_starts.items():
+            if pid in roster:
+                continue
+            add_days = {self.day_index[s.game_day_id] for s in fa_starts}
+            for day in sorted(add_days):
+                # planned value of each droppable player from this day on
+                kept_value = {p: 0.0 for p in droppable}
+                for starts in days[day:]:
+                    for s in starts:
+                        if s.player.playerId in kept_value:
+                            kept_value[s.player.playerId] += scores[id(s)]
+                if not kept_value:
+                    continue
+                drop_id = min(kept_value, key=lambda k: kept_value[k])
+
+                variant = [
+                    s for s in candidates
+                    if s.player.playerId != drop_id
+                    or self.day_index[s.game_day_id] < day
+                ] + [
+                    s for s in fa_starts
+                    if self.day_index[s.game_day_id] >= day
+                ]
+                variant_days, value = self.allocate(variant, scores)
+                options.append(
+                    (value, day, pid, drop_id, variant, variant_days)
+                )
+
+        if not options:
+            return None
+        options.sort(key=lambda x: x[0], reverse=True)
+        options = options[:self.n_candidates]
+        wins = self.win(np.stack([
+            self.days_total(o[5]) for o in options
+        ]))
+        i = int(np.argmax(wins))
+        if wins[i] <= win:
+            return None
+
+        _, day, pid, drop_id, variant, _ = options[i]
+        return day, self.free_agents[pid], roster[drop_id], variant
+
+    def allocate(
+        self,
+        candidates: List[PlayerStart],
+        scores: Dict[int, float],
+    ) -> Tuple[List[List[PlayerStart]], float]:
+        """
+        Dynamic program over game days maximizing the summed start scores
+        with at most `starts_per_gameday` starts a day and
+        `remaining_gp` starts in total. Returns the starts of each day and
+        the summed score.
+        """
+        by_day: List[List[PlayerStart]] = [[] for _ in self.game_days]
+        for s in candidates:
+            by_day[self.day_index[s.game_day_id]].append(s)
+        for starts in by_day:
+            starts.sort(key=lambda s: scores[id(s)], reverse=True)
+
+        capacity = max(self.lineup.remaining_gp, 0)
+        # best[c] is the best score using c starts so far
+        best = np.full(capacity + 1, -np.inf)
+        best[0] = 0.0
+        choices: List[np.ndarray] = []
+        for starts in by_day:
+            prefix = np.cumsum([0.0] + [scores[id(s)] for s in starts])
+            max_k = min(starts_per_gameday, len(starts))
+            new_best = np.full(capacity + 1, -np.inf)
+            choice = np.zeros(capacity + 1, dtype=int)
+            for k in range(max_k + 1):
+                value = np.full(capacity + 1, -np.inf)
+                value[k:] = best[:capacity + 1 - k] + prefix[k]
+                # ties go to more starts
+                better = value >= new_best
+                new_best[better] = value[better]
+                choice[better] = k
+            best = new_best
+            choices.append(choice)
+
+        c = capacity - int(np.argmax(best[::-1]))
+        total = float(best[c])
+        counts = []
+        for choice in reversed(choices):
+            k = int(choice[c])
+            counts.append(k)
+            c -= k
+        counts.reverse()
+        return [starts[:k] for starts, k in zip(by_day, counts)], total
+
+    def split_days(self, starts: List[PlayerStart]) -> List[List[PlayerStart]]:
+        days: List[List[PlayerStart]] = [[] for _ in self.game_days]
+        for s in starts:
+            if not isinstance(s, EmptyStart):
+                days[self.day_index[s.game_day_id]].append(s)
+        return days
+
+    def days_total(self, days: List[List[PlayerStart]]) -> np.ndarray:
+        return self.matchup.expected_total(
+            s for starts in days for s in starts
+        )
+
+    def scores(
+        self,
+        grad: np.ndarray,
+        starts: List[PlayerStart],
+    ) -> Dict[int, float]:
+        """
+        Linearized value of each start keyed by start id
+        """
+        return {
+            id(s): float(grad @ self.matchup.expected_stats(s)) for s in starts
+        }
+
+    def gradient(self, total: np.ndarray) -> np.ndarray:
+        """
+        Forward difference gradient of the win probability with respect
+        to the team's `stat_columns` totals
+        """
+        step = np.maximum(np.abs(total) * 1e-3, 1e-3)
+        rows = np.vstack([total, total + np.diag(step)])
+        wins = self.win(rows)
+        return (wins[1:] - wins[0]) / step
+
+    def win(self, totals: np.ndarray) -> np.ndarray:
+        """
+        The team's win probability for one or more `stat_columns` totals
+        against the opponent's probable lineup
+        """
+        return self.matchup.team_win_p(self.use_home, totals, self.opp_total)
@@ -0,0 +1,204 @@
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from espn_api.basketball import League, Player
+
+from .config import starts_per_gameday
+from .model import (predict_cats_batch, predict_win_batch, start_stats,
+                    stat_columns)
+from .schedule import ScheduleIndex
+from .start import PlayerStart, ProjectionStore
+
+
+class TeamOdds(NamedTuple):
+    playoff: float
+    seed: List[float]
+    champion: float
+
+
+class PlayoffOdds:
+    """
+    Season simulator for playoff and seed probabilities.
+
+    Each team's category strength in a matchup period is the projection
+    total of its most owned healthy players over their games that period,
+    capped at the period's start limit. Pairwise matchup win probabilities
+    follow from the batched model, and the remaining regular season and
+    playoff bracket are simulated for `n` seasons at once. Matchups of the
+    current period can be given as known home win probabilities.
+    """
+
+    def __init__(
+        self,
+        league: League,
+        schedule: ScheduleIndex,
+        current_win_p: Optional[Dict[Tuple[int, int], float]] = None,
+        n: int = 20_000,
+        seed: Optional[int] = None,
+        projections: Optional[ProjectionStore] = None,
+    ):
+        self.league = league
+        self.projections = projections
+        self.schedule = schedule
+        self.current_win_p = current_win_p or {}
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+
+        self.team_ids: List[int] = [t.team_id for t in league.teams]
+        self.team_index = {tid: i for i, tid in enumerate(self.team_ids)}
+        self.period = league.currentMatchupPeriod
+        self.reg_season_count: int = league.settings.reg_season_count
+        self.playoff_team_count: int = league.settings.playoff_team_count
+        self.playoff_period_length: int = getattr(
+            league.settings, 'playoff_matchup_period_length', 1,
+        )
+        self._player_stats: Dict[int, np.ndarray] = {}
+        self._win_matrices: Dict[int, np.ndarray] = {}
+
+    def simulate(self) -> Dict[int, TeamOdds]:
+        """
+        Returns the odds for each team id. Empty once the regular season
+        is over.
+        """
+        if self.period > self.reg_season_count:
+            return {}
+
+        n_teams = len(self.team_ids)
+        points = np.tile(
+            [t.wins + 0.5 * t.ties for t in self.league.teams],
+            (self.n, 1),
+        ).astype(float)
+
+        for period in range(self.period, self.reg_season_count + 1):
+            win_p = self.win_matrix(period)
+            for home, away in self.pairings(period):
+                p = self.current_win_p.get(
+                    (self.team_ids[home], self.team_ids[away]),
+                    win_p[home, away],
+                ) if period == self.period else win_p[home, away]
+                home_win = self.rng.random(self.n) < p
+                points[:, home] += home_win
+                points[:, away] += ~home_win
+
+        # random tiebreak
+        points += self.rng.random(points.shape) * 1e-3
+        seeds = np.argsort(-points, axis=1)
+        n_playoff = min(self.playoff_team_count, n_teams)
+        champions = self.simulate_bracket(seeds[:, :n_playoff])
+
+        seed_p = np.zeros((n_teams, n_playoff))
+        for s in range(n_playoff):
+            seed_p[:, s] = np.bincount(seeds[:, s], minlength=n_teams)
+        seed_p /= self.n
+        champion_p = np.bincount(champions, minlength=n_teams) / self.n
+
+        return {
+            tid: TeamOdds(
+                playoff=float(seed_p[i].sum()),
+                seed=[float(p) for p in seed_p[i]],
+                champion=float(champion_p[i]),
+            )
+            for i, tid in enumerate(self.team_ids)
+        }
+
+    def simulate_bracket(self, seeds: np.ndarray) -> np.ndarray:
+        """
+        Simulates a single elimination bracket for each row of team
+        indices in seed order. Top seeds get byes when the playoff team
+        count is not a power of two. Returns the champion of each row.
+        """
+        n_seeds = seeds.shape[1]
+        size = 1
+        while size < n_seeds:
+            size *= 2
+        order = bracket_order(size)
+        teams: np.ndarray = np.full((self.n, size), -1)
+        for slot, s in enumerate(order):
+            if s <= n_seeds:
+                teams[:, slot] = seeds[:, s - 1]
+
+        period = self.reg_season_count + 1
+        while teams.shape[1] > 1:
+            win_p = self.win_matrix(period)
+            a, b = teams[:, 0::2], teams[:, 1::2]
+            p = win_p[np.maximum(a, 0), np.maximum(b, 0)]
+            a_wins = (b < 0) | ((a >= 0) & (self.rng.random(a.shape) < p))
+            teams = np.where(a_wins, a, b)
+            period += self.playoff_period_length
+        return teams[:, 0]
+
+    def pairings(self, period: int) -> List[Tuple[int, int]]:
+        pairs = set()
+        for team in self.league.teams:
+            if period > len(team.schedule):
+                continue
+            m = team.schedule[period - 1]
+            if m.home_team and m.away_team:
+                pairs.add((
+                    self.team_index[m.home_team.team_id],
+                    self.team_index[m.away_team.team_id],
+                ))
+        return sorted(pairs)
+
+    def win_matrix(self, period: int) -> np.ndarray:
+        """
+        (team, team) matrix of the probability that the row team beats
+        the column team in a matchup period
+        """
+        if period not in self._win_matrices:
+            strength = np.stack([
+                self.team_strength(team.roster, period)
+                for team in self.league.teams
+            ])
+            zeros = np.zeros(len(stat_columns))
+            cat_probs = predict_cats_batch(
+                zeros, zeros, strength[:, None, :], strength[None, :, :],
+            )
+            self._win_matrices[period] = predict_win_batch(cat_probs)
+        return self._win_matrices[period]
+
+    def team_strength(self, roster: List[Player], period: int) -> np.ndarray:
+        """
+        Projected `stat_columns` totals of a roster in a matchup period.
+        Periods past the schedule reuse the last known period.
+        """
+        period_dates = self.schedule.period_dates
+        last = max(period_dates)
+        start, end = period_dates[period if period in period_dates else last]
+        starts = self.schedule.starts_between(start, end)
+        games = Counter(s.player_id for s in starts)
+        game_days = {s.game_day_id for s in starts}
+
+        remaining = len(game_days) * starts_per_gameday
+        total = np.zeros(len(stat_columns))
+        healthy = [
+            p for p in roster
+            if not p.injured and p.injuryStatus != 'SUSPENSION'
+        ]
+        for player in sorted(healthy, key=lambda p: -p.percent_owned):
+            n_games = min(games[player.playerId], remaining)
+            if n_games > 0:
+                total += n_games * self.player_stats(player)
+                remaining -= n_games
+        return total
+
+    def player_stats(self, player: Player) -> np.ndarray:
+        if player.playerId not in self._player_stats:
+            gid = next(iter(player.schedule))
+            self._player_stats[player.playerId] = start_stats(
+                PlayerStart(player, gid, self.projections)
+            )
+        return self._player_stats[player.playerId]
+
+
+def bracket_order(size: int) -> List[int]:
+    """
+    Seeds in bracket slot order so that higher seeds meet as late as
+    possible, e.g. [1, 8, 4, 5, 2, 7, 3, 6] for 8 teams
+    """
+    order = [1]
+    while len(order) < size:
+        n = 2 * len(order) + 1
+        order = [s for seed in order for s in (seed, n - seed)]
+    return order
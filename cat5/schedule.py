@@ -0,0 +1,140 @@
+from bisect import bisect_left
+from collections import defaultdict
+from copy import copy
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+from espn_api.basketball import League, Player
+
+
+class ScheduledStart(NamedTuple):
+    game_datetime: datetime
+    player_id: int
+    game_day_id: str
+
+
+class ScheduleIndex:
+    """
+    League-wide index of rostered players' games, built once per run.
+    Starts are sorted by game time so the starts of any date range are a
+    bisect away, and matchup period boundaries are derived from the
+    league's matchup periods and the game days (see
+    `derive_period_dates`).
+    """
+
+    def __init__(self, league: League):
+        self.players: Dict[int, Player] = {}
+        self.game_days: Dict[str, date] = {}
+        starts: List[ScheduledStart] = []
+
+        for team in league.teams:
+            for player in team.roster:
+                self.players[player.playerId] = player
+                for gid, game in player.schedule.items():
+                    game_datetime: datetime = game['date']
+                    self.game_days[gid] = game_datetime.date()
+                    starts.append(
+                        ScheduledStart(game_datetime, player.playerId, gid)
+                    )
+
+        self.starts = sorted(starts)
+        self._start_times = [s.game_datetime for s in self.starts]
+
+        first = getattr(league, 'firstScoringPeriod', None)
+        final = getattr(league, 'finalScoringPeriod', None)
+        season_days = [
+            d for gid, d in self.game_days.items()
+            if (first is None or int(gid) >= int(first))
+            and (final is None or int(gid) <= int(final))
+        ]
+        self.period_dates = derive_period_dates(
+            season_days, getattr(league.settings, 'matchup_periods', {}),
+        )
+
+    def starts_between(
+        self,
+        start: datetime,
+        end: datetime,
+    ) -> List[ScheduledStart]:
+        """
+        Returns the scheduled starts with `start` <= game time < `end`
+        """
+        lo = bisect_left(self._start_times, start)
+        hi = bisect_left(self._start_times, end)
+        return self.starts[lo:hi]
+
+    def game_day_ids_between(
+        self,
+        start: datetime,
+        end: datetime,
+    ) -> Set[str]:
+        return {s.game_day_id for s in self.starts_between(start, end)}
+
+    def restricted(self, player_ids: Set[int]) -> 'ScheduleIndex':
+        """
+        A copy with only the players and starts of `player_ids`, keeping
+        the league-wide game days and period dates
+        """
+        index = copy(self)
+        index.players = {
+            pid: p for pid, p in self.players.items() if pid in player_ids
+        }
+        index.starts = [s for s in self.starts if s.player_id in player_ids]
+        index._start_times = [s.game_datetime for s in index.starts]
+        return index
+
+
+def derive_period_dates(
+    game_days: List[date],
+    matchup_periods: Dict[str, List[int]],
+) -> Dict[int, Tuple[datetime, datetime]]:
+    """
+    Derives matchup period (start, end) dates from the league's
+    `matchup_periods`, which map each matchup period to the ESPN schedule
+    weeks it spans, so a period combining weeks (e.g. a two-week playoff
+    round) covers all of them.
+
+    Schedule weeks are the Monday to Sunday weeks with games. ESPN folds
+    the All-Star break into a neighbouring week, so when the league has
+    fewer schedule weeks than there are weeks with games, the week with
+    the fewest game days is merged into its shorter neighbour until the
+    counts agree. Without matchup periods every week is a period.
+    """
+    week_days: defaultdict[date, Set[date]] = defaultdict(set)
+    for d in game_days:
+        week_days[d - timedelta(days=d.weekday())].add(d)
+
+    # each schedule week is a list of consecutive calendar weeks
+    weeks: List[List[date]] = [[week] for week in sorted(week_days)]
+
+    def n_days(w: List[date]) -> int:
+        return sum(len(week_days[week]) for week in w)
+
+    n_weeks = max(
+        (max(ids) for ids in matchup_periods.values() if ids), default=0,
+    )
+    while 0 < n_weeks < len(weeks):
+        i = min(range(len(weeks)), key=lambda j: n_days(weeks[j]))
+        if i == 0:
+            j = 1
+        elif i == len(weeks) - 1:
+            j = i - 1
+        else:
+            j = min(i - 1, i + 1, key=lambda k: n_days(weeks[k]))
+        lo, hi = min(i, j), max(i, j)
+        weeks[lo:hi + 1] = [weeks[lo] + weeks[hi]]
+
+    spans = {
+        int(period): (min(ids), max(ids))
+        for period, ids in matchup_periods.items()
+        if ids and max(ids) <= len(weeks)
+    } or {n: (n, n) for n in range(1, len(weeks) + 1)}
+    return {
+        period: (
+            datetime.combine(weeks[first - 1][0], datetime.min.time()),
+            datetime.combine(
+                weeks[last - 1][-1] + timedelta(days=7), datetime.min.time(),
+            ),
+        )
+        for period, (first, last) in sorted(spans.items())
+    }
@@ -0,0 +1,113 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
+
+from .model import (count_cats, get_proj_list, negative_cats, ratio_cats,
+                    ratio_to_count_cats, scored_cats)
+from .start import PlayerStart
+
+
+class Simulator:
+    """
+    Monte Carlo counterpart of `Model` taking the same inputs. All
+    categories are drawn for `n` trials at once as arrays, giving the
+    joint 9-category outcome and the matchup win per trial.
+
+    Player counts are independent Poissons, so each team total is drawn
+    as one Poisson of the summed projections. For ratio categories the
+    attempts are Poisson and makes binomial, so by Poisson thinning the
+    team makes and misses are independent Poissons of the summed
+    expected makes and misses.
+    """
+
+    def __init__(
+        self,
+        box: BoxScore,
+        home_starts: Iterable[PlayerStart],
+        away_starts: Iterable[PlayerStart],
+        n: int = 50_000,
+        seed: Optional[int] = None,
+    ):
+        self.box = box
+        self.home_starts = tuple(home_starts)
+        self.away_starts = tuple(away_starts)
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        # per category trial wins, so every category is drawn once
+        self._cat_wins: Dict[str, np.ndarray] = {}
+
+    def predict_cat(self, cat: str) -> float:
+        """
+        Give the simulated probability that the home team will win the
+        specified category in the matchup
+        """
+        return float(self.simulate_cat(cat).mean())
+
+    def predict_cats(self) -> Dict[str, float]:
+        return {cat: self.predict_cat(cat) for cat in scored_cats}
+
+    def predict_win(self) -> float:
+        """
+        Give the simulated probability that the home team will win 5+ of
+        the 9 scored categories
+        """
+        return float((self.simulate().sum(axis=0) >= 5).mean())
+
+    def simulate(self) -> np.ndarray:
+        """
+        Returns a (category, trial) array of home category wins, ordered
+        as `scored_cats`
+        """
+        return np.stack([self.simulate_cat(cat) for cat in scored_cats])
+
+    def simulate_cat(self, cat: str) -> np.ndarray:
+        """
+        Returns the home wins of the category for each trial. Ties are
+        broken with 50-50 probability.
+        """
+        if cat not in self._cat_wins:
+            self._cat_wins[cat] = self._simulate_cat(cat)
+        return self._cat_wins[cat]
+
+    def _simulate_cat(self, cat: str) -> np.ndarray:
+        if cat in count_cats:
+            diff = self._simulate_count_diff(cat)
+        elif cat in ratio_cats:
+            diff = self._simulate_ratio_diff(cat)
+        else:
+            raise ValueError(f'Invalid category: {cat}')
+
+        if cat in negative_cats:
+            diff = -diff
+        coin = self.rng.random(self.n) < 0.5
+        return (diff > 0) | ((diff == 0) & coin)
+
+    def _simulate_count_diff(self, cat: str) -> np.ndarray:
+        home = self.box.home_stats[cat]['value'] + self.rng.poisson(
+            sum(get_proj_list(self.home_starts, cat)), self.n,
+        )
+        away = self.box.away_stats[cat]['value'] + self.rng.poisson(
+            sum(get_proj_list(self.away_starts, cat)), self.n,
+        )
+        return (home - away).astype(float)
+
+    def _simulate_ratio_diff(self, cat: str) -> np.ndarray:
+        att_cat, make_cat = ratio_to_count_cats[cat]
+        ratios = []
+        for stats, starts in (
+            (self.box.home_stats, self.home_starts),
+            (self.box.away_stats, self.away_starts),
+        ):
+            att = np.array(get_proj_list(starts, att_cat))
+            ratio = np.array(get_proj_list(starts, cat))
+            makes = stats[make_cat]['value'] + self.rng.poisson(
+                float(np.sum(att * ratio)), self.n,
+            )
+            misses = stats[att_cat]['value'] - stats[make_cat]['value'] + \
+                self.rng.poisson(float(np.sum(att * (1 - ratio))), self.n)
+            total = makes + misses
+            ratios.append(np.divide(
+                makes, total, out=np.zeros(self.n), where=total > 0,
+            ))
+        return ratios[0] - ratios[1]
@@ -1,62 +1,64 @@
-
+import hashlib
+from collections import OrderedDict
 from datetime import date, datetime
-from functools import cache
-from typing import Dict, List, TypeAlias
+from typing import (Any, Dict, Iterable, List, NamedTuple, Optional,
+                    TypeAlias)
 
 from espn_api.basketball import Player
 
 PlayerStats: TypeAlias = Dict[str, Dict[str, Dict[str, float]]]
 
+EMA_WINDOW = 30
+# part of stored fingerprints so a change to `project` recomputes them
+PROJECTION_VERSION = 2
+# every category the models read from a start
+projected_cats = [
+    '3PM', 'REB', 'AST', 'STL', 'BLK', 'TO', 'PTS', 'FG%', 'FT%', 'FGA', 'FTA',
+]
+stat_periods = ['last_7', 'last_15', 'last_30', 'total']
+# players a projection store keeps, least recently used ones are evicted
+MAX_STORED_PLAYERS = 5000
+
 
 class PlayerStart:
-    def __init__(self, player: Player, game_day_id: str):
+    """
+    A player's start on a game day. Projections come from `store` when
+    given, so they are computed once per player, otherwise once per start.
+    """
+    __slots__ = ('player', 'game_day_id', 'game_datetime', 'game_date',
+                 'injured', 'store', '_projections')
+
+    def __init__(
+        self,
+        player: Player,
+        game_day_id: str,
+        store: Optional['ProjectionStore'] = None,
+    ):
         self.player = player
         self.game_day_id = game_day_id
         self.game_datetime: datetime = player.schedule[game_day_id]['date']
         self.game_date: date = self.game_datetime.date()
         self.injured = self.player.injured
-        self.ema_window = 30
+        self.store = store
+        self._projections: Dict[str, float] = {}
 
     def __repr__(self) -> str:
         return f'Start({self.player}, Date({self.game_date}))'
 
-    @cache
     def projection(self, cat: str) -> float:
-        player_stats: PlayerStats = self.player.stats
-        year = self.player.year
-        preseason_avg = player_stats.get(f'{year}_projected', {}) \
-            .get('avg', {}).get(cat, 0)
-
-        periods = ['last_7', 'last_15', 'last_30', 'total']
-        stats = {
-            period: player_stats.get(f'{year}_{period}', {}) for period in periods
-        }
-        gps = {period: int(stats[period].get('total', {}).get('GP', 0))
-               for period in periods}
-        avgs = {period: stats[period].get('avg', {}).get(cat, 0)
-                for period in periods}
-        inside_gps = {
-            period: gps[period] - gps[periods[i-1]]
-            for i, period in enumerate(periods) if i > 0
-        }
-        inside_avgs = {
-            period: (avgs[period] * gps[period] - avgs[periods[i-1]] * gps[periods[i-1]]) /
-            max(inside_gps[period], 1)
-            for i, period in enumerate(periods) if i > 0
-        }
-
-        ts: List[float] = (
-            [avgs['last_7']] * gps['last_7'] +
-            [inside_avgs['last_15']] * inside_gps['last_15'] +
-            [inside_avgs['last_30']] * inside_gps['last_30'] +
-            [avgs['total']] * gps['total']
-        )
-        ts += [preseason_avg] * (self.ema_window - len(ts))
-        ts = list(reversed(ts))
-        return ema_next(ts)
+        if not self._projections:
+            self._projections = (
+                self.store.projections(self.player) if self.store
+                else project_all(self.player)
+            )
+        if cat not in self._projections:
+            return project(self.player, cat)
+        return self._projections[cat]
 
 
 class EmptyStart(PlayerStart):
+    __slots__ = ()
+
     class EmptyPlayer(Player):
         def __init__(self):
             self.playerId = 0
@@ -68,11 +70,149 @@ class EmptyStart(PlayerStart):
     def __init__(self):
         self.player = self.EmptyPlayer()
 
-    @cache
     def projection(self, _: str) -> float:
         return 0.0
 
 
+class ProjectionStore:
+    """
+    Projections of every `projected_cats` category keyed by player id,
+    each with the stats fingerprint it was computed from. A player's
+    projections only change with their stats, so a store kept across runs
+    (see `dump` and `load`) only recomputes the players who played or
+    whose split windows moved since. At most `max_players` are kept, the
+    least recently used are evicted first.
+    """
+
+    class Entry(NamedTuple):
+        fingerprint: str
+        projections: Dict[str, float]
+
+    def __init__(self, max_players: int = MAX_STORED_PLAYERS) -> None:
+        self.entries: OrderedDict[int, ProjectionStore.Entry] = OrderedDict()
+        self.max_players = max_players
+        self.n_computed = 0
+
+    def projections(self, player: Player) -> Dict[str, float]:
+        fingerprint = stats_fingerprint(player)
+        entry = self.entries.get(player.playerId)
+        if entry is None or entry.fingerprint != fingerprint:
+            entry = self.Entry(fingerprint, project_all(player))
+            self.n_computed += 1
+        self.put(player.playerId, entry)
+        return entry.projections
+
+    def put(self, pid: int, entry: 'ProjectionStore.Entry') -> None:
+        self.entries[pid] = entry
+        self.entries.move_to_end(pid)
+        while len(self.entries) > self.max_players:
+            self.entries.popitem(last=False)
+
+    def update(self, players: Iterable[Player]) -> int:
+        """
+        Brings the projections of `players` up to date and returns how
+        many were recomputed
+        """
+        n_computed = self.n_computed
+        for player in players:
+            self.projections(player)
+        return self.n_computed - n_computed
+
+    def dump(self, players: Iterable[Player] | None = None) -> Dict[str, Any]:
+        """
+        JSON serializable entries, of `players` only when given
+        """
+        pids = (
+            self.entries.keys() if players is None
+            else {p.playerId for p in players} & self.entries.keys()
+        )
+        return {
+            str(pid): {
+                'fingerprint': self.entries[pid].fingerprint,
+                'projections': [
+                    self.entries[pid].projections[cat]
+                    for cat in projected_cats
+                ],
+            }
+            for pid in sorted(pids)
+        }
+
+    def load(self, data: Dict[str, Any]) -> None:
+        """
+        Adds the entries of a `dump`. Entries are kept as is, they are
+        recomputed on use if their fingerprint no longer matches.
+        """
+        for pid, entry in data.items():
+            self.put(int(pid), self.Entry(
+                entry['fingerprint'],
+                dict(zip(projected_cats, entry['projections'])),
+            ))
+
+
+def stats_fingerprint(player: Player) -> str:
+    """
+    The year, the games played of each stat split and a hash of the
+    preseason projected averages, which ESPN revises during the season,
+    so it changes whenever the projection inputs do, with
+    `PROJECTION_VERSION`
+    """
+    player_stats: PlayerStats = player.stats
+    year = player.year
+    gps = [
+        int(player_stats.get(f'{year}_{period}', {})
+            .get('total', {}).get('GP', 0))
+        for period in stat_periods
+    ]
+    projected = player_stats.get(f'{year}_projected', {}).get('avg', {})
+    projected_hash = hashlib.sha256(
+        repr([projected.get(cat, 0) for cat in projected_cats]).encode(),
+    ).hexdigest()[:8]
+    return ':'.join(str(x) for x in [
+        f'v{PROJECTION_VERSION}', year, *gps, projected_hash,
+    ])
+
+
+def project_all(player: Player) -> Dict[str, float]:
+    return {cat: project(player, cat) for cat in projected_cats}
+
+
+def project(player: Player, cat: str, ema_window: int = EMA_WINDOW) -> float:
+    player_stats: PlayerStats = player.stats
+    year = player.year
+    preseason_avg = player_stats.get(f'{year}_projected', {}) \
+        .get('avg', {}).get(cat, 0)
+
+    periods = stat_periods
+    stats = {
+        period: player_stats.get(f'{year}_{period}', {}) for period in periods
+    }
+    gps = {period: int(stats[period].get('total', {}).get('GP', 0))
+           for period in periods}
+    avgs = {period: stats[period].get('avg', {}).get(cat, 0)
+            for period in periods}
+    inside_gps = {
+        period: gps[period] - gps[periods[i-1]]
+        for i, period in enumerate(periods) if i > 0
+    }
+    inside_avgs = {
+        period: (
+            avgs[period] * gps[period] -
+            avgs[periods[i-1]] * gps[periods[i-1]]
+        ) / max(inside_gps[period], 1)
+        for i, period in enumerate(periods) if i > 0
+    }
+
+    ts: List[float] = (
+        [avgs['last_7']] * gps['last_7'] +
+        [inside_avgs['last_15']] * inside_gps['last_15'] +
+        [inside_avgs['last_30']] * inside_gps['last_30'] +
+        [avgs['total']] * gps['total']
+    )
+    ts += [preseason_avg] * (ema_window - len(ts))
+    ts = list(reversed(ts))
+    return ema_next(ts)
+
+
 def ema_next(ts: List[float]) -> float:
     alpha = 2 / (len(ts) + 1)
     ma = ts[0]
@@ -0,0 +1,142 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from espn_api.basketball import Player
+
+from .matchup import Lineup, Matchup, fill_days, is_droppable
+from .start import EmptyStart, PlayerStart
+
+
+class WaiverMove(NamedTuple):
+    add: Player
+    drop: Player
+    win: float
+    gain: float
+
+
+class WaiverEvaluator:
+    """
+    Ranks add/drop pairs of a free agent pool against the current matchup.
+
+    Every start of the team, rostered or free agent, is ranked by its
+    projected value: the win probability of the team's probable lineup
+    with that start added, against the opponent's probable lineup. The
+    baseline and every variant lineup are filled in that order, so an
+    added player starts when their projections earn it. Moves whose
+    added player would not start are left out, their gain would only
+    come from the drop. Only droppable players (see `is_droppable`) are
+    dropped and each added player keeps their best drop. Lineups are
+    reduced to `stat_columns` totals and every variant of a team is
+    scored in one batched model evaluation. Starts of players uncertain
+    to play count at their availability, as in the lineup optimizer's
+    expected totals.
+    """
+
+    def __init__(self, matchup: Matchup, free_agents: Iterable[Player]):
+        self.matchup = matchup
+        self.free_agent_starts = matchup.free_agent_starts(free_agents)
+        self.free_agents: Dict[int, Player] = {
+            pid: starts[0].player
+            for pid, starts in self.free_agent_starts.items()
+        }
+        self.day_index = {
+            gid: d for d, gid in enumerate(sorted(
+                matchup.matchup_period.game_day_ids
+            ))
+        }
+        self._values: Dict[bool, Dict[int, float]] = {}
+
+    def evaluate(self, use_home: bool, top_n: int = 10) -> List[WaiverMove]:
+        """
+        Returns the `top_n` moves for the home or away team ordered by win
+        probability gain over keeping the roster, one per added player
+        """
+        lineup, opp_lineup = self.matchup.lineups(use_home)
+        opp_total = opp_lineup.totals([opp_lineup.probable()])[0]
+        drops = [p for p in lineup.team.roster if is_droppable(p)]
+
+        pairs: List[Tuple[Player, Player]] = []
+        variants: List[List[PlayerStart]] = []
+        for add in self.free_agents.values():
+            for drop in drops:
+                variant = self.variant_lineup(lineup, add, drop)
+                if any(s.player.playerId == add.playerId for s in variant):
+                    pairs.append((add, drop))
+                    variants.append(variant)
+
+        baseline = self.variant_lineup(lineup, None, None)
+        totals = np.stack(
+            [self.matchup.expected_total(baseline)] +
+            [self.matchup.expected_total(variant) for variant in variants]
+        )
+        win = self.matchup.team_win_p(use_home, totals, opp_total)
+
+        moves = [
+            WaiverMove(add, drop, float(w), float(w - win[0]))
+            for (add, drop), w in zip(pairs, win[1:])
+        ]
+        # among equal gains, drop the least owned player
+        moves.sort(
+            key=lambda m: (round(m.gain, 9), -m.drop.percent_owned),
+            reverse=True,
+        )
+        best: Dict[int, WaiverMove] = {}
+        for move in moves:
+            best.setdefault(move.add.playerId, move)
+        return list(best.values())[:top_n]
+
+    def start_values(self, lineup: Lineup) -> Dict[int, float]:
+        """
+        Projected value of each rostered and free agent start of the
+        lineup's team keyed by start id, scored in one batch
+        """
+        use_home = lineup is self.matchup.home_lineup
+        values = self._values.get(use_home)
+        if values is not None:
+            return values
+
+        _, opp_lineup = self.matchup.lineups(use_home)
+        opp_total = opp_lineup.totals([opp_lineup.probable()])[0]
+        team_total = lineup.totals([lineup.probable()])[0]
+        starts = [
+            es.player_start for es in lineup.eligible_starts
+            if not isinstance(es.player_start, EmptyStart)
+        ] + [
+            s for fa_starts in self.free_agent_starts.values()
+            for s in fa_starts
+        ]
+        if not starts:
+            return {}
+        totals = team_total + np.stack(
+            [self.matchup.expected_stats(s) for s in starts]
+        )
+        wins = self.matchup.team_win_p(use_home, totals, opp_total)
+        values = {id(s): float(w) for s, w in zip(starts, wins)}
+        self._values[use_home] = values
+        return values
+
+    def variant_lineup(
+        self,
+        lineup: Lineup,
+        add: Optional[Player],
+        drop: Optional[Player],
+    ) -> List[PlayerStart]:
+        """
+        Lineup of the roster after adding `add` and dropping `drop`, the
+        starts taken by projected value (see `start_values`) within the
+        per-day caps
+        """
+        values = self.start_values(lineup)
+        eligible = [
+            es.player_start for es in lineup.eligible_starts
+            if not isinstance(es.player_start, EmptyStart)
+            and (drop is None
+                 or es.player_start.player.playerId != drop.playerId)
+        ]
+        if add is not None:
+            eligible += self.free_agent_starts[add.playerId]
+        eligible.sort(key=lambda s: values[id(s)], reverse=True)
+        days = np.array(
+            [self.day_index[s.game_day_id] for s in eligible], dtype=int,
+        )
+        return [eligible[k] for k in fill_days(days, lineup.remaining_gp)]
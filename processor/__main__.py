@@ -0,0 +1,50 @@
+import argparse
+import pickle
+from dataclasses import asdict
+from datetime import datetime
+
+from storage.keys import profile_key, projections_key
+
+from .db import DBWriter
+from .processor import Processor
+from .profiling import Profiler, format_report
+
+# local runner: processes pickled league and box scores snapshots and
+# saves the instance with the DB writer (mock unless DB_WRITE is set)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='run cat5 locally')
+    parser.add_argument('league_pickle')
+    parser.add_argument('box_scores_pickle')
+    parser.add_argument('--tag', default='local')
+    parser.add_argument('--iter', type=int, default=None)
+    parser.add_argument('--date', default=None, help='YYYYMMDD run date')
+    parser.add_argument('--profile', action='store_true')
+    args = parser.parse_args()
+
+    with open(args.league_pickle, 'rb') as f:
+        league = pickle.load(f)
+    with open(args.box_scores_pickle, 'rb') as f:
+        box_scores = pickle.load(f)
+
+    processor = Processor(league, box_scores)
+    if args.iter:
+        processor.n_iter = args.iter
+    if args.date:
+        processor.now = datetime.strptime(args.date, '%Y%m%d')
+    if args.profile:
+        processor.profiler = Profiler()
+
+    db = DBWriter()
+    processor.projections.load(db.read(projections_key(league.year)) or {})
+    processor.warm_start(db.read_instance(args.tag))
+    cat5_instance_dict = asdict(processor.build())
+    db.write_instance(args.tag, cat5_instance_dict)
+    db.write_summary(args.tag, cat5_instance_dict)
+    db.write(
+        projections_key(league.year),
+        processor.projections.dump(processor.projected_players()),
+    )
+    if processor.profiler:
+        report = processor.profiler.report()
+        db.write(profile_key(args.tag), report)
+        print(format_report(report))
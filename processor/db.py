@@ -1,45 +1,237 @@
-import base64
-import gzip
+import hashlib
 import json
 import os
+from typing import Any, Dict, Optional
 
-import boto3
+from storage import (TABLE_NAME, DynamoStorage, decode_json, encode_json,
+                     get_storage)
+from storage.history import checkpoint_run
+from storage.keys import (history_key, history_run_key, matchup_key,
+                          summary_key)
 
-TABLE_NAME = os.environ.get("TABLE_NAME", "Cat5Table")
-AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
+from .history import history_items
+
+# fields that change on every run without changing the content
+VOLATILE_FIELDS = ('updateTimestamp',)
 
 
 class DBWriter:
-    dynamo = boto3.resource("dynamodb", region_name=AWS_REGION)
+    """
+    Items are written with the hash of their content as the record
+    version. The stored versions are read first, in one batch per call,
+    and items whose content did not change since any earlier run are not
+    written again: a conditional put that fails consumes write units all
+    the same. `metrics` counts the items and bytes written and skipped
+    and the write units consumed.
+    """
 
     def __init__(self, table_name=TABLE_NAME):
-        self.table = self.dynamo.Table(table_name)
-        self.write_mock = os.environ.get('DB_WRITE', '').lower() != 'prod'
+        self.mode = os.environ.get('DB_WRITE', '').lower() or 'mock'
+        self.storage = get_storage(self.mode, table_name)
+        self.metrics = {'items': 0, 'skipped': 0, 'bytes': 0, 'units': 0.0}
+        print(f'--> db initialized: WRITE={self.mode.upper()}')
 
-        self.mock_db_dir = os.path.join('.mock-db', table_name)
-        if self.write_mock:
-            os.makedirs(self.mock_db_dir, exist_ok=True)
+    def write(self, key: str, data: dict) -> None:
+        self.write_items({key: data})
 
-        print(
-            f'--> db initialized: '
-            f'WRITE={"PROD" if not self.write_mock else "MOCK"}'
-        )
+    def write_items(self, items: Dict[str, dict]) -> None:
+        """
+        Writes items in order, skipping those whose stored version is
+        their content hash
+        """
+        versions = {key: content_hash(data) for key, data in items.items()}
+        stored = self.storage.versions(list(items))
+        for key, data in items.items():
+            if stored.get(key) == versions[key]:
+                self.metrics['skipped'] += 1
+                print(f'--> db write skipped, unchanged: {key}')
+                continue
+            payload = encode_json(data)
+            units = self.storage.put(key, payload, version=versions[key])
+            self._count(len(payload), units)
+            print(f'--> db write: {key}')
 
-    def write(self, key: str, data: dict) -> None:
-        if self.write_mock:
-            self._mock_write(key, data)
-        else:
-            self._prod_write(key, data)
-
-    def _mock_write(self, key: str, data: dict) -> None:
-        loc = os.path.join(self.mock_db_dir, f'{key}.json')
-        with open(loc, 'w') as f:
-            json.dump(data, f, indent=4)
-        print(f'--> mock db write: {loc}')
-
-    def _prod_write(self, key: str, data: dict) -> None:
-        json_data = json.dumps(data)
-        compressed_data = gzip.compress(json_data.encode('utf-8'))
-        base64_data = base64.b64encode(compressed_data).decode('utf-8')
-        self.table.put_item(Item={'key': key, 'data': base64_data})
-        print(f'--> prod db write: {key}')
+    def write_instance(self, key: str, data: dict) -> None:
+        """
+        Writes a cat5 instance as a small index item under `key` plus
+        one item per matchup (see `shard_instance`)
+        """
+        # index is written last so readers never see missing shards
+        self.write_items(shard_instance(key, data))
+
+    def start_instance(
+        self,
+        key: str,
+        header: Dict[str, Any],
+        matchup_count: int,
+    ) -> None:
+        """
+        Marks the instance under `key` as in progress before its matchups
+        are written one by one with `write_matchup`. Fields of the
+        previous index not in `header` are kept so readers see the
+        previous run's values until `write_instance` completes the run.
+        A complete previous index that already covers the header (see
+        `covers_header`) is left as is, so the index is only written once,
+        by `write_index`.
+        """
+        prev = self.read(key) or {}
+        if prev.get('complete') and covers_header(prev, header, matchup_count):
+            return
+        index = {
+            **prev,
+            **header,
+            'matchupCount': matchup_count,
+            'complete': False,
+        }
+        self.write(key, index)
+
+    def write_matchup(self, key: str, i: int, matchup: dict) -> None:
+        self.write(matchup_key(key, i), matchup)
+
+    def write_index(self, key: str, data: dict) -> None:
+        """
+        Writes only the index item of a complete instance whose matchups
+        were already written with `write_matchup`
+        """
+        self.write(key, shard_instance(key, data)[key])
+
+    def write_summary(self, key: str, data: dict) -> None:
+        """
+        Writes the small summary item of an instance (see
+        `instance_summary`) read by the multi-tag summaries endpoint
+        """
+        self.write(summary_key(key), instance_summary(data))
+
+    def write_history(self, key: str, data: dict) -> None:
+        """
+        Appends the instance to the matchup period history (see
+        `history_items`), reading the runs since the last checkpoint to
+        diff against
+        """
+        period = data['matchupPeriod']
+        head = self.read(history_key(key, period))
+        n = head['runCount'] if head else 0
+        keys = [
+            history_run_key(key, period, r)
+            for r in range(checkpoint_run(max(n - 1, 0)), n)
+        ]
+        records = self.storage.batch_get(keys)
+        runs = [decode_json(records[k].data) for k in keys if k in records]
+        self.write_items(history_items(key, data, head, runs))
+
+    def read_instance(self, key: str) -> Optional[dict]:
+        """
+        Reads back an instance written with `write_instance`, skipping
+        matchups whose shard is missing
+        """
+        index = self.read(key)
+        if index is None:
+            return None
+        n = index.get('matchupCount', 0)
+        keys = [matchup_key(key, i) for i in range(n)]
+        records = self.storage.batch_get(keys)
+        matchups = [decode_json(records[k].data) for k in keys if k in records]
+        return {**index, 'matchups': matchups}
+
+    def read(self, key: str) -> Optional[dict]:
+        record = self.storage.get(key)
+        if record is None:
+            return None
+        return decode_json(record.data)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        `metrics` with the read units, throttled requests and pacing
+        delay of the DynamoDB backend
+        """
+        report: Dict[str, Any] = dict(self.metrics)
+        if isinstance(self.storage, DynamoStorage):
+            report['readUnits'] = self.storage.read_units
+            report['throttled'] = self.storage.throttled
+            pacer = self.storage.pacer
+            report['pacedSeconds'] = round(pacer.waited, 3) if pacer else 0.0
+        return report
+
+    def _count(self, size: int, units: float, items: int = 1) -> None:
+        self.metrics['items'] += items
+        self.metrics['bytes'] += size
+        self.metrics['units'] += units
+
+
+def content_hash(data: Any) -> str:
+    """
+    Hash of JSON data without its `VOLATILE_FIELDS`, at any depth
+    """
+    digest = hashlib.sha256(
+        json.dumps(strip_volatile(data), sort_keys=True).encode('utf-8')
+    )
+    return digest.hexdigest()[:32]
+
+
+def strip_volatile(data: Any) -> Any:
+    if isinstance(data, dict):
+        return {
+            k: strip_volatile(v) for k, v in data.items()
+            if k not in VOLATILE_FIELDS
+        }
+    if isinstance(data, list):
+        return [strip_volatile(v) for v in data]
+    return data
+
+
+def covers_header(
+    index: Dict[str, Any],
+    header: Dict[str, Any],
+    matchup_count: int,
+) -> bool:
+    """
+    Whether an index has the header's values apart from `VOLATILE_FIELDS`
+    and as many matchups, so every shard is in place and every player a
+    new shard refers to is known. The index may hold more players, the
+    free agents of its moves.
+    """
+    players = index.get('players', {})
+    return index.get('matchupCount') == matchup_count and all(
+        index.get(k) == v for k, v in header.items()
+        if k not in VOLATILE_FIELDS and k != 'players'
+    ) and all(
+        players.get(k) == v for k, v in header.get('players', {}).items()
+    )
+
+
+def instance_summary(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The matchup descriptions and default win probabilities of an
+    instance with its update timestamps
+    """
+    return {
+        'leagueId': data['leagueId'],
+        'matchupPeriod': data['matchupPeriod'],
+        'updateTimestamp': data['updateTimestamp'],
+        'matchups': [
+            {
+                'desc': m['desc'],
+                'homeTeam': m['homeTeam'],
+                'awayTeam': m['awayTeam'],
+                'win': m['forecasts']['default']['win'],
+                'updateTimestamp': m['updateTimestamp'],
+            }
+            for m in data['matchups']
+        ],
+    }
+
+
+def shard_instance(key: str, data: Dict[str, Any]) -> Dict[str, dict]:
+    """
+    Splits an instance dict into matchup shards keyed by `matchup_key`
+    followed by the index item, which keeps every top level field except
+    the matchups and records the shard count and that the instance is
+    complete
+    """
+    matchups = data['matchups']
+    index = {k: v for k, v in data.items() if k != 'matchups'}
+    index['matchupCount'] = len(matchups)
+    index['complete'] = True
+    items = {matchup_key(key, i): m for i, m in enumerate(matchups)}
+    items[key] = index
+    return items
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import boto3
+
+from .db import shard_instance
+
+EXPORT_MODE = os.environ.get('EXPORT', '')
+EXPORT_DIR = os.environ.get('EXPORT_DIR', '.mock-export')
+EXPORT_BUCKET = os.environ.get('EXPORT_BUCKET', '')
+AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MANIFEST_CACHE_CONTROL = 'public, max-age=60, must-revalidate'
+# tag of hashed exports no longer in the manifest, the bucket's lifecycle
+# rule expires tagged objects (see template.yaml)
+RETIRED_TAG = {'Key': 'cat5-export', 'Value': 'retired'}
+
+
+class StaticExporter:
+    """
+    Exports an instance as precompressed static JSON for CDN serving.
+    Each document is written under a content-hashed name so it can be
+    cached forever, and `<tag>/manifest.json` points at the latest ones:
+
+        <tag>/full.<hash>.json          full instance
+        <tag>/index.<hash>.json         instance without matchups
+        <tag>/matchups/<i>.<hash>.json  single matchup
+
+    `mode` is 'local' to write to a directory or 's3' to upload to a
+    bucket. Any other mode disables the export.
+
+    In S3, hashed documents the new manifest no longer points at are
+    tagged with `RETIRED_TAG` and expire a week later. The manifest and
+    the documents it points at are never expired, so the site keeps its
+    data when the processor stops running.
+    """
+
+    def __init__(
+        self,
+        mode=EXPORT_MODE,
+        out_dir=EXPORT_DIR,
+        bucket=EXPORT_BUCKET,
+    ):
+        self.mode = mode.lower()
+        self.out_dir = out_dir
+        self.bucket = bucket
+        if self.mode == 's3':
+            self.s3 = boto3.client('s3', region_name=AWS_REGION)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ('local', 's3')
+
+    def export(self, tag: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        shards = shard_instance(tag, data)
+        index = shards.pop(tag)
+        previous = self._read_manifest(tag)
+        matchups: List[str] = [
+            self._put_hashed(f'{tag}/matchups/{i}', shard)
+            for i, shard in enumerate(shards.values())
+        ]
+        manifest = {
+            'updateTimestamp': data['updateTimestamp'],
+            'full': self._put_hashed(f'{tag}/full', data),
+            'index': self._put_hashed(f'{tag}/index', index),
+            'matchups': matchups,
+        }
+        self._put(
+            f'{tag}/manifest.json',
+            json.dumps(manifest).encode('utf-8'),
+            MANIFEST_CACHE_CONTROL,
+            compressed=False,
+        )
+        if previous is not None:
+            current = set(manifest_paths(manifest))
+            for path in set(manifest_paths(previous)) - current:
+                self._retire(path)
+        print(f'--> static export: {tag} ({len(matchups)} matchups)')
+        return manifest
+
+    def _read_manifest(self, tag: str) -> Optional[Dict[str, Any]]:
+        """
+        The manifest of the previous export in S3, None when there is none
+        or the export is local, which keeps every file
+        """
+        if self.mode != 's3':
+            return None
+        try:
+            obj = self.s3.get_object(
+                Bucket=self.bucket, Key=f'{tag}/manifest.json',
+            )
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(obj['Body'].read())
+
+    def _retire(self, path: str) -> None:
+        self.s3.put_object_tagging(
+            Bucket=self.bucket,
+            Key=path,
+            Tagging={'TagSet': [RETIRED_TAG]},
+        )
+
+    def _put_hashed(self, name: str, data: Any) -> str:
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        content_hash = hashlib.sha256(body).hexdigest()[:12]
+        path = f'{name}.{content_hash}.json'
+        self._put(path, gzip.compress(body, mtime=0), IMMUTABLE_CACHE_CONTROL)
+        return path
+
+    def _put(
+        self,
+        path: str,
+        body: bytes,
+        cache_control: str,
+        compressed: bool = True,
+    ) -> None:
+        if self.mode == 's3':
+            extra = {'ContentEncoding': 'gzip'} if compressed else {}
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=path,
+                Body=body,
+                ContentType='application/json',
+                CacheControl=cache_control,
+                **extra,
+            )
+        else:
+            # local files keep the encoding visible in the name
+            suffix = '.gz' if compressed else ''
+            loc = os.path.join(self.out_dir, path + suffix)
+            os.makedirs(os.path.dirname(loc), exist_ok=True)
+            with open(loc, 'wb') as f:
+                f.write(body)
+
+
+def manifest_paths(manifest: Dict[str, Any]) -> List[str]:
+    return [manifest['full'], manifest['index'], *manifest['matchups']]
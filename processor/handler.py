@@ -5,8 +5,14 @@ from espn_api.basketball import League
 from pydantic import ValidationError
 from pydantic.dataclasses import dataclass
 
+from storage.keys import league_key, profile_key, projections_key
+
 from .db import DBWriter
-from .processor import Processor
+from .export import StaticExporter
+from .processor import Processor, run_work_unit
+from .profiling import Profiler, profile_stage
+from .snapshot import league_snapshot, load_league
+from .work import decode_unit_event, encode_unit_result, get_queue
 
 IN_PROGRESS = 'IN_PROGRESS'
 SUCCESS = 'SUCCESS'
@@ -19,6 +25,12 @@ class LambdaPayload:
     leagueId: str
     year: int
     iter: Optional[int] = None
+    simulate: Optional[bool] = None
+    freeAgents: Optional[int] = None
+    seed: Optional[int] = None
+    profile: Optional[bool] = None
+    live: Optional[bool] = None
+    injuryAvailability: Optional[Dict[str, float]] = None
 
 
 @dataclass
@@ -26,10 +38,14 @@ class LambdaRespose:
     status: str
     msg: Optional[str] = ''
     tag: Optional[str] = ''
+    profile: Optional[Dict[str, Any]] = None
+    writes: Optional[Dict[str, Any]] = None
 
 
 def lambda_handler(event: Dict[str, Any], _) -> Dict[str, Any]:
     try:
+        if 'workUnit' in event:
+            return work_unit_handler(event, _)
         return handler(event, _)
     except Exception as e:
         print('----- unexpected lambda error -----')
@@ -41,6 +57,7 @@ def lambda_handler(event: Dict[str, Any], _) -> Dict[str, Any]:
 def handler(event: Dict[str, Any], _) -> Dict[str, Any]:
     resp = LambdaRespose(IN_PROGRESS)
     db = DBWriter()
+    exporter = StaticExporter()
 
     # read event payload
     print('--> parsing event')
@@ -56,23 +73,114 @@ def handler(event: Dict[str, Any], _) -> Dict[str, Any]:
         resp.msg = f'invalid payload: {e}'
         return asdict(resp)
 
-    # fetch espn league
-    print('--> fetching league from espn')
-    league = League(lambda_payload.leagueId, lambda_payload.year)
-    box_scores = league.box_scores()
+    profiler = Profiler() if lambda_payload.profile else None
+
+    # fetch espn league, or only its box scores in live mode
+    with profile_stage(profiler, 'fetch'):
+        league: Optional[League] = None
+        if lambda_payload.live:
+            print('--> loading cached league')
+            league = read_league(db, lambda_payload.tag)
+        live = league is not None
+        if league is None:
+            print('--> fetching league from espn')
+            league = League(lambda_payload.leagueId, lambda_payload.year)
+        box_scores = league.box_scores()
+        free_agents = []
+        if lambda_payload.freeAgents and not live:
+            free_agents = league.free_agents(size=lambda_payload.freeAgents)
+    if not live:
+        db.write(league_key(lambda_payload.tag), league_snapshot(league))
 
     # process cat5 data
     print('--> running cat5 processor')
-    processor = Processor(league, box_scores)
+    processor = Processor(league, box_scores, free_agents)
+    # projections of players whose stats did not change are reused
+    print('--> loading stored projections')
+    processor.projections.load(
+        db.read(projections_key(lambda_payload.year)) or {}
+    )
     if lambda_payload.iter:
         processor.n_iter = lambda_payload.iter
-    cat5_instance = processor.build()
+    # live updates only use the analytic model
+    if lambda_payload.simulate and not live:
+        processor.simulate = True
+    processor.live = live
+    if lambda_payload.injuryAvailability is not None:
+        processor.injury_availability = lambda_payload.injuryAvailability
+    if lambda_payload.seed is not None:
+        processor.seed = lambda_payload.seed
+    processor.queue = get_queue(run_work_unit)
+    processor.profiler = profiler
+
+    # seed the optimizers with the previous run's lineups
+    n_warm = processor.warm_start(db.read_instance(lambda_payload.tag))
+    print(f'--> warm started matchups: {n_warm}')
+
+    # write matchups as they finish so readers see progress and a failed
+    # run keeps the finished ones
+    print('--> saving matchups to db as they finish')
+    db.start_instance(
+        lambda_payload.tag, processor.get_header(), processor.matchup_count,
+    )
+    matchups = []
+    for i, matchup in enumerate(processor.get_matchups()):
+        db.write_matchup(lambda_payload.tag, i, asdict(matchup))
+        matchups.append(matchup)
+    cat5_instance = processor.finish(matchups)
     cat5_instance_dict = asdict(cat5_instance)
 
-    # write to db
+    # complete the update
     print('--> saving update to db')
-    db.write(lambda_payload.tag, cat5_instance_dict)
+    with profile_stage(profiler, 'db write'):
+        db.write_index(lambda_payload.tag, cat5_instance_dict)
+        db.write_history(lambda_payload.tag, cat5_instance_dict)
+        db.write_summary(lambda_payload.tag, cat5_instance_dict)
+        # only the players of this run are kept, so the stored entries
+        # do not grow with every player ever rostered
+        if processor.projections.n_computed:
+            db.write(
+                projections_key(lambda_payload.year),
+                processor.projections.dump(processor.projected_players()),
+            )
+
+    # export static files
+    if exporter.enabled:
+        print('--> exporting static files')
+        with profile_stage(profiler, 'export'):
+            exporter.export(lambda_payload.tag, cat5_instance_dict)
+
+    # save the profile next to the instance
+    if profiler:
+        resp.profile = profiler.report()
+        db.write(profile_key(lambda_payload.tag), resp.profile)
+
+    resp.writes = db.report()
+    print(f'--> db writes: {resp.writes}')
 
     resp.status = SUCCESS
     resp.msg = 'update saved to db'
     return asdict(resp)
+
+
+def read_league(db: DBWriter, tag: str) -> Optional[League]:
+    """
+    The league of the last full update of `tag`, with its rosters,
+    schedules and player stats (see `league_snapshot`)
+    """
+    data = db.read(league_key(tag))
+    league = load_league(data) if data is not None else None
+    if league is None:
+        print('--> no cached league, running a full update')
+    return league
+
+
+def work_unit_handler(event: Dict[str, Any], _) -> Dict[str, Any]:
+    """
+    Runs one matchup work unit fanned out by `LambdaQueue`. Events not
+    signed with `WORK_UNIT_KEY` are rejected before their payload is
+    unpickled.
+    """
+    unit = decode_unit_event(event)
+    print(f'--> running work unit {unit.box_index}')
+    return encode_unit_result(run_work_unit(unit))
@@ -0,0 +1,55 @@
+from typing import Any, Dict, List, Optional
+
+from storage.history import CHECKPOINT_INTERVAL, diff_state, replay_state
+from storage.keys import history_key, history_run_key
+
+
+def history_state(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact per-matchup state tracked in the history: the forecasts and
+    player values keyed by player id
+    """
+    return {
+        str(i): {
+            'forecasts': matchup['forecasts'],
+            'homePlayerValue': {
+                pv['player']: pv['value'] for pv in matchup['homePlayerValue']
+            },
+            'awayPlayerValue': {
+                pv['player']: pv['value'] for pv in matchup['awayPlayerValue']
+            },
+        }
+        for i, matchup in enumerate(data['matchups'])
+    }
+
+
+def history_items(
+    key: str,
+    data: Dict[str, Any],
+    head: Optional[Dict[str, Any]],
+    runs: List[Dict[str, Any]],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Builds the history items for a new instance: a run item followed by
+    the updated head item, which only counts the runs. Every
+    `CHECKPOINT_INTERVAL` runs, starting with the first, the run item
+    holds the full state, the others hold the delta against the state
+    replayed from `runs`, the runs since the last checkpoint. A run that
+    changed nothing adds no items.
+    """
+    period = data['matchupPeriod']
+    state = history_state(data)
+    n = head['runCount'] if head else 0
+    delta = diff_state(replay_state(runs) if n else {}, state)
+    if n and not delta:
+        return {}
+
+    run: Dict[str, Any] = {'updateTimestamp': data['updateTimestamp']}
+    if n % CHECKPOINT_INTERVAL == 0:
+        run['state'] = state
+    else:
+        run['delta'] = delta
+    return {
+        history_run_key(key, period, n): run,
+        history_key(key, period): {'matchupPeriod': period, 'runCount': n + 1},
+    }
@@ -1,27 +1,121 @@
-from dataclasses import fields, is_dataclass
+from copy import copy
+from dataclasses import asdict, fields, is_dataclass, replace
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from espn_api.basketball import League, Team
+import numpy as np
+from espn_api.basketball import League, Player, Team
 from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
 
-from cat5 import EmptyStart, Matchup, MatchupPeriod
+from cat5 import (DailyPlanner, EmptyStart, Matchup, MatchupPeriod, Model,
+                  PlayoffOdds, Simulator, WaiverEvaluator)
+from cat5.config import injury_availability, n_scenarios
+from cat5.matchup import StartId
+from cat5.start import ProjectionStore
 
 from . import struct
+from .profiling import Profiler, profile_stage
+from .work import WorkQueue, WorkUnit, decode, encode
+
+# processor attributes a work unit carries to its worker
+WORKER_SETTINGS = ('now', 'n_iter', 'simulate', 'n_sim', 'n_waiver_moves',
+                   'warm_lineups', 'warm_iter_fraction', 'live',
+                   'live_gp_tolerance', 'previous_matchups',
+                   'injury_availability', 'n_scenarios')
+
+# previous optimized (home, away) lineups keyed by (home, away) team ids
+WarmLineups = Dict[Tuple[str, str], Tuple[List[StartId], List[StartId]]]
 
 
 class Processor:
-    def __init__(self, league: League, box_scores: List[BoxScore]):
+    def __init__(
+        self,
+        league: League,
+        box_scores: List[BoxScore],
+        free_agents: Iterable[Player] = (),
+        matchup_period: Optional[MatchupPeriod] = None,
+    ):
         self.league = league
         self.box_scores = box_scores
-        self.matchup_period = MatchupPeriod(league)
+        self.free_agents = list(free_agents)
+        self.matchup_period = matchup_period or MatchupPeriod(league)
+        # projections of this run, loaded from and dumped to the DB by
+        # the caller
+        self.projections = ProjectionStore()
         self.now = datetime.now()
         self.n_iter = 2000
+        self.simulate = False
+        self.n_sim = 50_000
+        self.n_seasons = 20_000
+        self.n_waiver_moves = 10
+        self.warm_lineups: WarmLineups = {}
+        self.warm_iter_fraction = 0.25
+        self.live = False
+        self.live_gp_tolerance = 3
+        self.previous_matchups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.previous_players: Dict[str, Dict[str, Any]] = {}
+        self.injury_availability = dict(injury_availability)
+        self.n_scenarios = n_scenarios
+        self.seed: Optional[int] = None
+        self.queue: Optional[WorkQueue] = None
+        self.profiler: Optional[Profiler] = None
 
     def build(self) -> struct.Cat5Instance:
-        matchups = self.get_matchups()
-        teams = self.get_teams()
-        players = self.get_players()
+        return self.finish(list(self.get_matchups()))
+
+    def get_header(self) -> Dict[str, Any]:
+        """
+        The instance fields known before any matchup is processed, with
+        players limited to the rostered ones
+        """
+        return {
+            'leagueId': str(self.league.league_id),
+            'matchupPeriod': self.matchup_period.period,
+            'updateTimestamp': int(self.now.timestamp()),
+            'maxGP': self.matchup_period.max_gp,
+            'teams': {k: asdict(v) for k, v in self.get_teams().items()},
+            'players': {k: asdict(v) for k, v in self.get_players([]).items()},
+        }
+
+    def warm_start(self, previous: Optional[Dict[str, Any]]) -> int:
+        """
+        Seeds the lineup optimizers with the optimized lineups of a
+        previous instance dict of the same matchup period. Returns the
+        number of matchups seeded.
+        """
+        self.warm_lineups = {}
+        self.previous_matchups = {}
+        if not previous or (
+            previous.get('matchupPeriod') != self.matchup_period.period
+        ):
+            return 0
+        self.previous_players = previous.get('players', {})
+        for m in previous.get('matchups', []):
+            home = m.get('homeOptimizedLineup')
+            away = m.get('awayOptimizedLineup')
+            if home is None or away is None:
+                continue
+            self.previous_matchups[(m['homeTeam'], m['awayTeam'])] = m
+            self.warm_lineups[(m['homeTeam'], m['awayTeam'])] = (
+                [(int(s['player']), s['gameDay']) for s in home],
+                [(int(s['player']), s['gameDay']) for s in away],
+            )
+        return len(self.warm_lineups)
+
+    @property
+    def matchup_count(self) -> int:
+        return sum(1 for box in self.box_scores if box.away_team)
+
+    def finish(self, matchups: List[struct.Matchup]) -> struct.Cat5Instance:
+        """
+        Assembles the instance from the processed matchups
+        """
+        with profile_stage(self.profiler, 'teams'):
+            teams = self.get_teams()
+        with profile_stage(self.profiler, 'players'):
+            players = self.get_players(matchups)
+        with profile_stage(self.profiler, 'playoff odds'):
+            playoff_odds = self.get_playoff_odds(matchups)
         instance = struct.Cat5Instance(
             leagueId=str(self.league.league_id),
             matchupPeriod=self.matchup_period.period,
@@ -30,74 +124,374 @@ class Processor:
             matchups=matchups,
             teams=teams,
             players=players,
+            playoffOdds=playoff_odds,
         )
         instance_rounded: struct.Cat5Instance = round_floats(instance, 4)
         return instance_rounded
 
-    def get_matchups(self) -> List[struct.Matchup]:
-        matchups: List[struct.Matchup] = []
-        for box in self.box_scores:
+    def get_matchups(self) -> Iterator[struct.Matchup]:
+        """
+        Yields each matchup in box score order as soon as it is processed,
+        in place or through `queue` as work units when one is set. Both
+        give the same result for the same `seed`.
+        """
+        with profile_stage(self.profiler, 'projections'):
+            self.update_projections()
+
+        if self.queue:
+            with profile_stage(self.profiler, 'scatter'):
+                units = self.scatter()
+            results = self.queue.imap(units)
+            for unit in units:
+                # only the wait is profiled when matchups run elsewhere
+                with profile_stage(self.profiler, f'matchup {unit.box_index}'):
+                    gathered = self.gather(next(results))
+                yield gathered
+            return
+
+        for i, (box, seed) in enumerate(
+            zip(self.box_scores, self.matchup_seeds())
+        ):
+            with profile_stage(self.profiler, f'matchup {i}'):
+                matchup = self.get_matchup(box, seed)
+            if matchup:
+                yield matchup
+
+    def scatter(self) -> List[WorkUnit]:
+        """
+        One work unit per matchup with the inputs `run_work_unit` needs
+        (see `unit_inputs`). `box_index` is the position of the unit's
+        box score.
+        """
+        seeds = self.matchup_seeds()
+        units: List[WorkUnit] = []
+        for i, (box, seed) in enumerate(zip(self.box_scores, seeds)):
             if not box.away_team:
                 print(f'{box.home_team} has a BYE')
                 continue
+            units.append(WorkUnit(i, seed, encode(self.unit_inputs(box))))
+        return units
 
-            matchup = Matchup(box, self.matchup_period, self.now)
-            home_team: Team = box.home_team
-            away_team: Team = box.away_team
+    def unit_inputs(self, box: BoxScore) -> Dict[str, Any]:
+        """
+        The inputs of the matchup of `box` only: the box with its two
+        teams, whose schedules would reference every other team, a
+        league and matchup period limited to them, the free agents and
+        the projections of all their players
+        """
+        teams = [copy(box.home_team), copy(box.away_team)]
+        for team in teams:
+            team.schedule = []
+        unit_box = copy(box)
+        unit_box.home_team, unit_box.away_team = teams
 
-            matchup.home_lineup.set_probable()
-            matchup.away_lineup.set_probable()
-            model = matchup.get_model()
-            default_forecast = struct.Forecast(
-                win=model.predict_win(),
-                catWin=model.predict_cats(),
-            )
+        league = copy(self.league)
+        league.teams = teams
+        league.draft = []
+        league.player_map = {}
 
-            matchup.home_lineup.set_probable()
-            matchup.away_lineup.set_probable()
-            home_player_values = matchup.optimize_home_lineup(self.n_iter)
-            model = matchup.get_model()
-            home_opt_forecast = struct.Forecast(
-                win=model.predict_win(),
-                catWin=model.predict_cats(),
-            )
+        players = [p for team in teams for p in team.roster]
+        matchup_period = copy(self.matchup_period)
+        matchup_period.schedule = self.matchup_period.schedule.restricted(
+            {p.playerId for p in players}
+        )
+        return {
+            'league': league,
+            'box': unit_box,
+            'matchup_period': matchup_period,
+            'free_agents': self.free_agents,
+            'projections': self.projections.dump(players + self.free_agents),
+            'settings': {
+                name: getattr(self, name) for name in WORKER_SETTINGS
+            },
+        }
 
-            matchup.home_lineup.set_probable()
-            matchup.away_lineup.set_probable()
-            away_player_values = matchup.optimize_away_lineup(self.n_iter)
-            model = matchup.get_model()
-            away_opt_forecast = struct.Forecast(
-                win=model.predict_win(),
-                catWin=model.predict_cats(),
+    def gather(self, result: bytes) -> struct.Matchup:
+        matchup: struct.Matchup = decode(result)
+        return matchup
+
+    def update_projections(self) -> int:
+        """
+        Recomputes the projections of the players whose stats changed
+        since the store was loaded, in bulk before any matchup needs them
+        """
+        n_computed = self.projections.update(self.projected_players())
+        print(f'--> projections recomputed: {n_computed}')
+        return n_computed
+
+    def projected_players(self) -> List[Player]:
+        rostered = [p for team in self.league.teams for p in team.roster]
+        return rostered + self.free_agents
+
+    def matchup_seeds(self) -> List[int]:
+        """
+        Independent seeds for each box score derived from `seed`
+        """
+        seq = np.random.SeedSequence(self.seed)
+        return [
+            int(child.generate_state(1)[0])
+            for child in seq.spawn(len(self.box_scores))
+        ]
+
+    def get_matchup(
+        self,
+        box: BoxScore,
+        seed: int,
+    ) -> Optional[struct.Matchup]:
+        if not box.away_team:
+            print(f'{box.home_team} has a BYE')
+            return None
+
+        # lineup sampling draws from the global generator
+        np.random.seed(seed)
+        matchup = Matchup(
+            box, self.matchup_period, self.now,
+            self.injury_availability, self.n_scenarios, self.projections,
+        )
+        home_team: Team = box.home_team
+        away_team: Team = box.away_team
+
+        previous = self.previous_matchups.get(
+            (str(home_team.team_id), str(away_team.team_id))
+        )
+        if self.live and previous and self.is_refreshable(matchup, previous):
+            return self.refresh_matchup(matchup, previous, seed)
+
+        matchup.home_lineup.set_probable()
+        matchup.away_lineup.set_probable()
+        default_forecast = self.get_forecast(matchup, seed)
+
+        # a warm start needs fewer samples to reach the same lineups
+        home_warm, away_warm = self.warm_lineups.get(
+            (str(home_team.team_id), str(away_team.team_id)), (None, None),
+        )
+        n_iter = self.n_iter
+        if home_warm is not None:
+            n_iter = max(int(self.n_iter * self.warm_iter_fraction), 1)
+
+        matchup.home_lineup.set_probable()
+        matchup.away_lineup.set_probable()
+        home_player_values = matchup.optimize_home_lineup(n_iter, home_warm)
+        home_opt_forecast = self.get_forecast(matchup, seed)
+        home_opt_lineup = matchup.home_lineup.start_ids()
+
+        matchup.home_lineup.set_probable()
+        matchup.away_lineup.set_probable()
+        away_player_values = matchup.optimize_away_lineup(n_iter, away_warm)
+        away_opt_forecast = self.get_forecast(matchup, seed)
+        away_opt_lineup = matchup.away_lineup.start_ids()
+
+        matchup.optimize_both_lineups(self.n_iter)
+        both_opt_forecast = self.get_forecast(matchup, seed)
+
+        home_moves = self.get_waiver_moves(matchup, use_home=True)
+        away_moves = self.get_waiver_moves(matchup, use_home=False)
+        home_plan = self.get_streaming_plan(matchup, use_home=True)
+        away_plan = self.get_streaming_plan(matchup, use_home=False)
+
+        max_gp = self.matchup_period.max_gp
+        home_gp = max_gp - matchup.home_lineup.remaining_gp
+        away_gp = max_gp - matchup.away_lineup.remaining_gp
+
+        matchup_struct = struct.Matchup(
+            desc=(
+                f'({self.matchup_period.period}) '
+                f'{away_team.team_abbrev} @ {home_team.team_abbrev}'
+            ),
+            homeTeam=str(home_team.team_id),
+            awayTeam=str(away_team.team_id),
+            forecasts=struct.MatchupForecasts(
+                default=default_forecast,
+                homeOptimized=home_opt_forecast,
+                awayOptimized=away_opt_forecast,
+                bothOptimized=both_opt_forecast,
+            ),
+            homePlayerValue=[
+                struct.PlayerValue(str(pv.player.playerId), pv.value)
+                for pv in home_player_values
+            ],
+            awayPlayerValue=[
+                struct.PlayerValue(str(pv.player.playerId), pv.value)
+                for pv in away_player_values
+            ],
+            homeWaiverMoves=home_moves,
+            awayWaiverMoves=away_moves,
+            homeStreamingPlan=home_plan,
+            awayStreamingPlan=away_plan,
+            homeOptimizedLineup=[
+                struct.LineupStart(str(pid), gid)
+                for pid, gid in home_opt_lineup
+            ],
+            awayOptimizedLineup=[
+                struct.LineupStart(str(pid), gid)
+                for pid, gid in away_opt_lineup
+            ],
+            homeGP=home_gp,
+            awayGP=away_gp,
+            optimizedHomeGP=home_gp,
+            optimizedAwayGP=away_gp,
+            updateTimestamp=int(self.now.timestamp()),
+        )
+        matchup_rounded: struct.Matchup = round_floats(matchup_struct, 4)
+        return matchup_rounded
+
+    def is_refreshable(
+        self,
+        matchup: Matchup,
+        previous: Dict[str, Any],
+    ) -> bool:
+        """
+        Whether a live update can keep the previous optimization: neither
+        team's games played moved more than `live_gp_tolerance` since the
+        last full optimization, so refreshes in between do not reset the
+        tolerance
+        """
+        if 'optimizedHomeGP' not in previous:
+            return False
+        max_gp = self.matchup_period.max_gp
+        home_gp = max_gp - matchup.home_lineup.remaining_gp
+        away_gp = max_gp - matchup.away_lineup.remaining_gp
+        return (
+            abs(home_gp - previous['optimizedHomeGP']) <=
+            self.live_gp_tolerance and
+            abs(away_gp - previous['optimizedAwayGP']) <=
+            self.live_gp_tolerance
+        )
+
+    def refresh_matchup(
+        self,
+        matchup: Matchup,
+        previous: Dict[str, Any],
+        seed: int,
+    ) -> struct.Matchup:
+        """
+        Live update of a matchup from its previous run: the forecasts are
+        rescored on the current box score with the previous optimized
+        lineups, less the starts played since, and the player values,
+        waiver moves, streaming plans and games played at the last full
+        optimization are kept
+        """
+        home_warm, away_warm = self.warm_lineups[
+            (previous['homeTeam'], previous['awayTeam'])
+        ]
+        n_iter = max(int(self.n_iter * self.warm_iter_fraction), 1)
+
+        matchup.home_lineup.set_probable()
+        matchup.away_lineup.set_probable()
+        default_forecast = self.get_forecast(matchup, seed)
+
+        matchup.home_lineup.set_warm(home_warm)
+        home_opt_forecast = self.get_forecast(matchup, seed)
+        home_opt_lineup = matchup.home_lineup.start_ids()
+
+        matchup.home_lineup.set_probable()
+        matchup.away_lineup.set_warm(away_warm)
+        away_opt_forecast = self.get_forecast(matchup, seed)
+        away_opt_lineup = matchup.away_lineup.start_ids()
+
+        # candidates are scored in one batch, so this stays cheap
+        matchup.optimize_both_lineups(n_iter)
+        both_opt_forecast = self.get_forecast(matchup, seed)
+
+        max_gp = self.matchup_period.max_gp
+        matchup_struct = replace(
+            struct.Matchup(**previous),
+            forecasts=struct.MatchupForecasts(
+                default=default_forecast,
+                homeOptimized=home_opt_forecast,
+                awayOptimized=away_opt_forecast,
+                bothOptimized=both_opt_forecast,
+            ),
+            homeOptimizedLineup=[
+                struct.LineupStart(str(pid), gid)
+                for pid, gid in home_opt_lineup
+            ],
+            awayOptimizedLineup=[
+                struct.LineupStart(str(pid), gid)
+                for pid, gid in away_opt_lineup
+            ],
+            homeGP=max_gp - matchup.home_lineup.remaining_gp,
+            awayGP=max_gp - matchup.away_lineup.remaining_gp,
+            updateTimestamp=int(self.now.timestamp()),
+        )
+        matchup_rounded: struct.Matchup = round_floats(matchup_struct, 4)
+        return matchup_rounded
+
+    def get_forecast(
+        self,
+        matchup: Matchup,
+        seed: Optional[int] = None,
+    ) -> struct.Forecast:
+        """
+        Forecast for the current lineups, from the analytic model or from
+        a Monte Carlo simulation when `simulate` is set. With players
+        uncertain to play the analytic forecast is a mixture over their
+        availability scenarios.
+        """
+        if matchup.is_uncertain and not self.simulate:
+            win, cat_win = matchup.forecast()
+            return struct.Forecast(win=win, catWin=cat_win)
+
+        model: Model | Simulator
+        if self.simulate:
+            model = Simulator(
+                matchup.box,
+                matchup.home_lineup.lineup,
+                matchup.away_lineup.lineup,
+                n=self.n_sim,
+                seed=seed,
             )
+        else:
+            model = matchup.get_model()
+        return struct.Forecast(
+            win=model.predict_win(),
+            catWin=model.predict_cats(),
+        )
 
-            matchups.append(
-                struct.Matchup(
-                    desc=(
-                        f'({self.matchup_period.period}) '
-                        f'{away_team.team_abbrev} @ {home_team.team_abbrev}'
-                    ),
-                    homeTeam=str(home_team.team_id),
-                    awayTeam=str(away_team.team_id),
-                    forecasts=struct.MatchupForecasts(
-                        default=default_forecast,
-                        homeOptimized=home_opt_forecast,
-                        awayOptimized=away_opt_forecast,
-                    ),
-                    homePlayerValue=[
-                        struct.PlayerValue(str(pv.player.playerId), pv.value)
-                        for pv in home_player_values
-                    ],
-                    awayPlayerValue=[
-                        struct.PlayerValue(str(pv.player.playerId), pv.value)
-                        for pv in away_player_values
-                    ],
-                    homeGP=self.matchup_period.max_gp - matchup.home_lineup.remaining_gp,
-                    awayGP=self.matchup_period.max_gp - matchup.away_lineup.remaining_gp,
-                )
+    def get_waiver_moves(
+        self,
+        matchup: Matchup,
+        use_home: bool,
+    ) -> List[struct.WaiverMove]:
+        """
+        Best add/drop pairs from the free agent pool, empty when no pool
+        was given
+        """
+        if not self.free_agents:
+            return []
+        evaluator = WaiverEvaluator(matchup, self.free_agents)
+        return [
+            struct.WaiverMove(
+                add=str(move.add.playerId),
+                drop=str(move.drop.playerId),
+                win=move.win,
+                gain=move.gain,
             )
+            for move in evaluator.evaluate(use_home, self.n_waiver_moves)
+        ]
 
-        return matchups
+    def get_streaming_plan(
+        self,
+        matchup: Matchup,
+        use_home: bool,
+    ) -> struct.StreamingPlan:
+        """
+        Day by day starts for the rest of the period, with streaming adds
+        from the free agent pool when one was given
+        """
+        plan = DailyPlanner(matchup, use_home, self.free_agents).plan()
+        return struct.StreamingPlan(
+            win=plan.win,
+            days=[
+                struct.DayPlan(
+                    date=day.game_date.isoformat(),
+                    starts=[str(s.player.playerId) for s in day.starts],
+                    add=str(day.add.playerId) if day.add else None,
+                    drop=str(day.drop.playerId) if day.drop else None,
+                )
+                for day in plan.days
+            ],
+        )
 
     def get_teams(self) -> Dict[str, struct.Team]:
         teams: Dict[str, struct.Team] = {}
@@ -115,16 +509,62 @@ class Processor:
             )
         return dict(sorted(teams.items(), key=lambda x: int(x[0])))
 
-    def get_players(self) -> Dict[str, struct.Player]:
+    def get_playoff_odds(
+        self,
+        matchups: List[struct.Matchup],
+    ) -> Dict[str, struct.PlayoffOdds]:
+        current_win_p = {
+            (int(m.homeTeam), int(m.awayTeam)): m.forecasts.default.win
+            for m in matchups
+        }
+        odds = PlayoffOdds(
+            self.league,
+            self.matchup_period.schedule,
+            current_win_p,
+            n=self.n_seasons,
+            seed=self.seed,
+            projections=self.projections,
+        ).simulate()
+        return {
+            str(tid): struct.PlayoffOdds(
+                playoff=o.playoff,
+                seed=o.seed,
+                champion=o.champion,
+            )
+            for tid, o in sorted(odds.items())
+        }
+
+    def get_players(
+        self,
+        matchups: List[struct.Matchup],
+    ) -> Dict[str, struct.Player]:
         players: Dict[str, struct.Player] = {}
         empty_player = EmptyStart.EmptyPlayer()
-        for team in self.league.teams:
-            for player in [*team.roster, empty_player]:
-                players[str(player.playerId)] = struct.Player(
-                    name=player.name,
-                    pos=player.position,
-                    proTeam=player.proTeam,
-                )
+        # only free agents that appear in a suggested move
+        added = {
+            move.add
+            for m in matchups
+            for move in m.homeWaiverMoves + m.awayWaiverMoves
+        } | {
+            day.add
+            for m in matchups
+            for day in m.homeStreamingPlan.days + m.awayStreamingPlan.days
+            if day.add
+        }
+        free_agents = [
+            p for p in self.free_agents if str(p.playerId) in added
+        ]
+        rostered = [p for team in self.league.teams for p in team.roster]
+        for player in [*rostered, *free_agents, empty_player]:
+            players[str(player.playerId)] = struct.Player(
+                name=player.name,
+                pos=player.position,
+                proTeam=player.proTeam,
+            )
+        # free agents of moves kept by a live update are not fetched again
+        for pid in added - players.keys():
+            if pid in self.previous_players:
+                players[pid] = struct.Player(**self.previous_players[pid])
         return dict(sorted(players.items(), key=lambda x: int(x[0])))
 
 
@@ -140,3 +580,20 @@ def round_floats(obj: Any, ndigits: int) -> Any:
     elif isinstance(obj, float):
         return round(obj, ndigits)
     return obj
+
+
+def run_work_unit(unit: WorkUnit) -> bytes:
+    """
+    Worker entry point: processes the matchup of a work unit made by
+    `Processor.scatter` and returns the serialized `struct.Matchup`
+    """
+    inputs = decode(unit.payload)
+    box = inputs['box']
+    processor = Processor(
+        inputs['league'], [box], inputs['free_agents'],
+        inputs['matchup_period'],
+    )
+    processor.projections.load(inputs['projections'])
+    for name, value in inputs['settings'].items():
+        setattr(processor, name, value)
+    return encode(processor.get_matchup(box, unit.seed))
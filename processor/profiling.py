@@ -0,0 +1,129 @@
+import cProfile
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+TOP_N = 20
+
+
+class Profiler:
+    """
+    Collects cProfile and tracemalloc stats for named stages of a run.
+    Each stage reports its wall time, the top `top_n` functions by own
+    time and by cumulative time, and the top allocation sites by memory
+    allocated during the stage with the traced peak.
+
+    Profiling only happens inside `stage`, so a run without a profiler
+    pays nothing (see `profile_stage`).
+    """
+
+    def __init__(self, top_n: int = TOP_N):
+        self.top_n = top_n
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            seconds = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            self.stages.append({
+                'stage': name,
+                'seconds': seconds,
+                **self._function_stats(profile),
+                'allocations': self._allocation_stats(before, after),
+                'peakKB': peak / 1024,
+            })
+            print(f'--> profiled {name}: {seconds:.2f}s')
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'totalSeconds': sum(s['seconds'] for s in self.stages),
+            'stages': self.stages,
+        }
+
+    def _function_stats(self, profile: cProfile.Profile) -> Dict[str, Any]:
+        stats = pstats.Stats(profile).stats  # type: ignore[attr-defined]
+        rows = [
+            {
+                'function': f'{file}:{line}({func})',
+                'calls': nc,
+                'ownSeconds': tt,
+                'cumulativeSeconds': ct,
+            }
+            for (file, line, func), (_, nc, tt, ct, _) in stats.items()
+        ]
+        return {
+            'hot': sorted(
+                rows, key=lambda r: r['ownSeconds'], reverse=True,
+            )[:self.top_n],
+            'cumulative': sorted(
+                rows, key=lambda r: r['cumulativeSeconds'], reverse=True,
+            )[:self.top_n],
+        }
+
+    def _allocation_stats(
+        self,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+    ) -> List[Dict[str, Any]]:
+        # leave out the profiler's own allocations
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+        ]
+        diffs = after.filter_traces(filters).compare_to(
+            before.filter_traces(filters), 'lineno',
+        )
+        return [
+            {
+                'site': f'{d.traceback[0].filename}:{d.traceback[0].lineno}',
+                'sizeKB': d.size_diff / 1024,
+                'count': d.count_diff,
+            }
+            for d in diffs[:self.top_n]
+        ]
+
+
+def profile_stage(
+    profiler: Optional[Profiler],
+    name: str,
+) -> ContextManager[None]:
+    """
+    The profiler's stage, or a no-op context when profiling is off
+    """
+    return profiler.stage(name) if profiler else nullcontext()
+
+
+def format_report(report: Dict[str, Any], top_n: int = 10) -> str:
+    lines = [f'total: {report["totalSeconds"]:.2f}s']
+    for stage in report['stages']:
+        lines += [
+            '',
+            f'[{stage["stage"]}] {stage["seconds"]:.2f}s, '
+            f'peak {stage["peakKB"]:.0f} KB',
+        ]
+        for row in stage['hot'][:top_n]:
+            lines.append(
+                f'  {row["ownSeconds"]:8.3f}s {row["calls"]:>9} '
+                f'{row["function"]}'
+            )
+        for alloc in stage['allocations'][:top_n]:
+            lines.append(f'  {alloc["sizeKB"]:8.0f} KB {alloc["site"]}')
+    return '\n'.join(lines)
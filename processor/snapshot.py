@@ -0,0 +1,179 @@
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from espn_api.base_settings import BaseSettings
+from espn_api.basketball import League, Player, Team
+from espn_api.basketball.box_score import get_box_scoring_type_class
+
+from cat5.start import projected_cats, stat_periods
+
+# bumped on any change of the layout below, older snapshots are ignored
+SNAPSHOT_VERSION = 1
+# league settings read by the processor
+SETTINGS_FIELDS = ('name', 'reg_season_count', 'matchup_periods',
+                   'team_count', 'playoff_team_count',
+                   'playoff_matchup_period_length', 'scoring_type')
+# player fields read by the processor besides stats and schedule
+PLAYER_FIELDS = ('name', 'playerId', 'position', 'proTeam', 'lineupSlot',
+                 'eligibleSlots', 'injuryStatus', 'injured', 'percent_owned')
+
+
+class ScheduledMatchup(NamedTuple):
+    home_team: Optional[Team]
+    away_team: Optional[Team]
+
+
+class SnapshotSettings(BaseSettings):
+    def __init__(self, data: Dict[str, Any]):
+        for name in SETTINGS_FIELDS:
+            setattr(self, name, data[name])
+
+
+class SnapshotTeam(Team):
+    def __init__(self, data: Dict[str, Any], roster: List[Player]):
+        self.team_id = data['id']
+        self.team_abbrev = data['abbrev']
+        self.team_name = data['name']
+        self.owners = data['owners']
+        self.logo_url = data['logoUrl']
+        self.wins, self.losses, self.ties = data['record']
+        self.standing = data['standing']
+        self.roster = roster
+        self.schedule: List[ScheduledMatchup] = []
+
+
+class SnapshotPlayer(Player):
+    def __init__(
+        self,
+        data: Dict[str, Any],
+        year: int,
+        schedule: Dict[str, List[str]],
+    ):
+        for name in PLAYER_FIELDS:
+            setattr(self, name, data[name])
+        self.year = year
+        self.stats = data['stats']
+        self.schedule = {
+            gid: {'team': team, 'date': datetime.fromisoformat(date)}
+            for gid, (team, date) in schedule.items()
+        }
+
+
+def league_snapshot(league: League) -> Dict[str, Any]:
+    """
+    The parts of a league a live update reads as JSON: the period ids,
+    the settings, each team's record, roster and schedule, and each
+    rostered player's projection inputs. Schedules are the same for all
+    players of a pro team, so they are stored once per pro team.
+    """
+    pro_schedules: Dict[str, Dict[str, List[str]]] = {}
+    players: Dict[str, Dict[str, Any]] = {}
+    for team in league.teams:
+        for player in team.roster:
+            pro_schedules.setdefault(player.proTeam, {
+                gid: [game['team'], game['date'].isoformat()]
+                for gid, game in player.schedule.items()
+            })
+            players[str(player.playerId)] = {
+                **{name: getattr(player, name) for name in PLAYER_FIELDS},
+                'stats': projection_stats(player),
+            }
+
+    return {
+        'version': SNAPSHOT_VERSION,
+        'leagueId': league.league_id,
+        'year': league.year,
+        'currentMatchupPeriod': league.currentMatchupPeriod,
+        'scoringPeriodId': league.scoringPeriodId,
+        'firstScoringPeriod': league.firstScoringPeriod,
+        'finalScoringPeriod': league.finalScoringPeriod,
+        'currentWeek': league.current_week,
+        'matchupIds': {str(k): v for k, v in league.matchup_ids.items()},
+        'settings': {
+            name: getattr(league.settings, name) for name in SETTINGS_FIELDS
+        },
+        'teams': [
+            {
+                'id': team.team_id,
+                'abbrev': team.team_abbrev,
+                'name': team.team_name,
+                'owners': [
+                    {'firstName': o['firstName'], 'lastName': o['lastName']}
+                    for o in team.owners
+                ],
+                'logoUrl': team.logo_url,
+                'record': [team.wins, team.losses, team.ties],
+                'standing': team.standing,
+                'roster': [p.playerId for p in team.roster],
+                'schedule': [
+                    [team_id(m.home_team), team_id(m.away_team)]
+                    for m in team.schedule
+                ],
+            }
+            for team in league.teams
+        ],
+        'players': players,
+        'proSchedules': pro_schedules,
+    }
+
+
+def load_league(data: Dict[str, Any]) -> Optional[League]:
+    """
+    Rebuilds a league from a `league_snapshot`, or None when the snapshot
+    is of another version. Its requests go to ESPN like a fetched
+    league's, so box scores are current.
+    """
+    if data.get('version') != SNAPSHOT_VERSION:
+        return None
+    year = data['year']
+    league = League(data['leagueId'], year, fetch_league=False)
+    league.currentMatchupPeriod = data['currentMatchupPeriod']
+    league.scoringPeriodId = data['scoringPeriodId']
+    league.firstScoringPeriod = data['firstScoringPeriod']
+    league.finalScoringPeriod = data['finalScoringPeriod']
+    league.current_week = data['currentWeek']
+    league.matchup_ids = {int(k): v for k, v in data['matchupIds'].items()}
+    league.settings = SnapshotSettings(data['settings'])
+    league.BoxScoreClass = get_box_scoring_type_class(
+        league.settings.scoring_type
+    )
+    # box score players are only read for their stats, not their games
+    league.pro_schedule = {}
+
+    players = {
+        int(pid): SnapshotPlayer(p, year, data['proSchedules'][p['proTeam']])
+        for pid, p in data['players'].items()
+    }
+    teams = {
+        t['id']: SnapshotTeam(t, [players[pid] for pid in t['roster']])
+        for t in data['teams']
+    }
+    for t in data['teams']:
+        teams[t['id']].schedule = [
+            ScheduledMatchup(teams.get(home), teams.get(away))
+            for home, away in t['schedule']
+        ]
+    league.teams = list(teams.values())
+    return league
+
+
+def projection_stats(player: Player) -> Dict[str, Any]:
+    """
+    The stat splits `project` and `stats_fingerprint` read, limited to
+    the projected categories' averages and the games played
+    """
+    splits = [f'{player.year}_{p}' for p in [*stat_periods, 'projected']]
+    return {
+        split: {
+            'avg': {
+                cat: v for cat, v in player.stats[split].get('avg', {}).items()
+                if cat in projected_cats
+            },
+            'total': {'GP': player.stats[split].get('total', {}).get('GP', 0)},
+        }
+        for split in splits if split in player.stats
+    }
+
+
+def team_id(team: Any) -> int:
+    return team.team_id if isinstance(team, Team) else 0
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from pydantic.dataclasses import dataclass
 
@@ -31,6 +31,7 @@ class MatchupForecasts:
     default: Forecast
     homeOptimized: Forecast
     awayOptimized: Forecast
+    bothOptimized: Forecast
 
 
 @dataclass
@@ -39,6 +40,34 @@ class PlayerValue:
     value: float
 
 
+@dataclass
+class WaiverMove:
+    add: str
+    drop: str
+    win: float
+    gain: float
+
+
+@dataclass
+class DayPlan:
+    date: str
+    starts: List[str]
+    add: Optional[str]
+    drop: Optional[str]
+
+
+@dataclass
+class StreamingPlan:
+    win: float
+    days: List[DayPlan]
+
+
+@dataclass
+class LineupStart:
+    player: str
+    gameDay: str
+
+
 @dataclass
 class Matchup:
     desc: str
@@ -47,8 +76,25 @@ class Matchup:
     forecasts: MatchupForecasts
     homePlayerValue: List[PlayerValue]
     awayPlayerValue: List[PlayerValue]
+    homeWaiverMoves: List[WaiverMove]
+    awayWaiverMoves: List[WaiverMove]
+    homeStreamingPlan: StreamingPlan
+    awayStreamingPlan: StreamingPlan
+    homeOptimizedLineup: List[LineupStart]
+    awayOptimizedLineup: List[LineupStart]
     homeGP: int
     awayGP: int
+    # games played at the last full optimization, kept by live refreshes
+    optimizedHomeGP: int
+    optimizedAwayGP: int
+    updateTimestamp: int
+
+
+@dataclass
+class PlayoffOdds:
+    playoff: float
+    seed: List[float]
+    champion: float
 
 
 @dataclass
@@ -60,3 +106,4 @@ class Cat5Instance:
     matchups: List[Matchup]
     teams: Dict[str, Team]
     players: Dict[str, Player]
+    playoffOdds: Dict[str, PlayoffOdds]
@@ -0,0 +1,213 @@
+import base64
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import pickle
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (Any, Callable, Dict, Iterator, List, NamedTuple,
+                    Optional)
+
+import boto3
+from botocore.config import Config
+
+QUEUE_MODE = os.environ.get('QUEUE', '')
+WORKER_FUNCTION = os.environ.get('WORKER_FUNCTION', 'Cat5Processor')
+AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
+# a worker invocation can run up to the function timeout
+WORKER_TIMEOUT = int(os.environ.get('WORKER_TIMEOUT', 90))
+# attempts of invocations that were throttled or lost in transit, units
+# that raise return their error and are not rerun
+WORKER_ATTEMPTS = 3
+# secret the Lambda work unit events and their results are signed with,
+# payloads are only unpickled when their signature checks out
+WORK_UNIT_KEY = os.environ.get('WORK_UNIT_KEY', '')
+
+
+class WorkUnit(NamedTuple):
+    """
+    Inputs of one matchup: the gzipped pickle of its processor inputs and
+    the seed for its random draws
+    """
+    box_index: int
+    seed: int
+    payload: bytes
+
+
+Worker = Callable[[WorkUnit], bytes]
+
+
+class WorkQueue(ABC):
+    """
+    Runs work units and yields their serialized results in order, each
+    as soon as it and the units before it are done
+    """
+
+    @abstractmethod
+    def imap(self, units: List[WorkUnit]) -> Iterator[bytes]:
+        ...
+
+    def map(self, units: List[WorkUnit]) -> List[bytes]:
+        return list(self.imap(units))
+
+
+class LocalQueue(WorkQueue):
+    def __init__(self, worker: Worker):
+        self.worker = worker
+
+    def imap(self, units: List[WorkUnit]) -> Iterator[bytes]:
+        for unit in units:
+            yield self.worker(unit)
+
+
+class ProcessQueue(WorkQueue):
+    """
+    Runs work units in a local process pool. `worker` must be picklable,
+    i.e. a module level function.
+    """
+
+    def __init__(self, worker: Worker, workers: Optional[int] = None):
+        self.worker = worker
+        self.workers = workers
+
+    def imap(self, units: List[WorkUnit]) -> Iterator[bytes]:
+        with ProcessPoolExecutor(self.workers) as pool:
+            yield from pool.map(self.worker, units)
+
+
+class LambdaQueue(WorkQueue):
+    """
+    Fans work units out to concurrent invocations of the worker Lambda,
+    which handles events made by `encode_unit_event`. Responses are
+    waited on for up to `WORKER_TIMEOUT` seconds instead of the 60
+    second client default.
+    """
+
+    def __init__(
+        self,
+        function_name: str = WORKER_FUNCTION,
+        key: str = WORK_UNIT_KEY,
+    ):
+        if not key:
+            raise ValueError('WORK_UNIT_KEY is required to fan out work')
+        self.function_name = function_name
+        self.key = key
+        self.lambda_client = boto3.client(
+            'lambda',
+            region_name=AWS_REGION,
+            config=Config(
+                read_timeout=WORKER_TIMEOUT,
+                retries={
+                    'mode': 'standard',
+                    'total_max_attempts': WORKER_ATTEMPTS,
+                },
+            ),
+        )
+
+    def imap(self, units: List[WorkUnit]) -> Iterator[bytes]:
+        if not units:
+            return
+        with ThreadPoolExecutor(len(units)) as pool:
+            yield from pool.map(self._invoke, units)
+
+    def _invoke(self, unit: WorkUnit) -> bytes:
+        response = self.lambda_client.invoke(
+            FunctionName=self.function_name,
+            InvocationType='RequestResponse',
+            Payload=json.dumps(encode_unit_event(unit, self.key)),
+        )
+        payload = json.load(response['Payload'])
+        if 'result' not in payload:
+            raise RuntimeError(f'work unit {unit.box_index} failed: {payload}')
+        return decode_unit_result(payload, self.key)
+
+
+def get_queue(worker: Worker, mode: str = QUEUE_MODE) -> Optional[WorkQueue]:
+    """
+    'local', 'process' or 'lambda'. Any other mode processes matchups
+    directly without work units.
+    """
+    mode = mode.lower()
+    if mode == 'local':
+        return LocalQueue(worker)
+    if mode == 'process':
+        return ProcessQueue(worker)
+    if mode == 'lambda':
+        return LambdaQueue()
+    return None
+
+
+def encode(obj: Any) -> bytes:
+    return gzip.compress(pickle.dumps(obj), compresslevel=6, mtime=0)
+
+
+def decode(data: bytes) -> Any:
+    return pickle.loads(gzip.decompress(data))
+
+
+def encode_unit_event(
+    unit: WorkUnit,
+    key: str = WORK_UNIT_KEY,
+) -> Dict[str, Any]:
+    return {
+        'workUnit': {
+            'boxIndex': unit.box_index,
+            'seed': unit.seed,
+            'payload': base64.b64encode(unit.payload).decode('ascii'),
+            'signature': sign(unit_message(unit), key),
+        }
+    }
+
+
+def decode_unit_event(
+    event: Dict[str, Any],
+    key: str = WORK_UNIT_KEY,
+) -> WorkUnit:
+    """
+    The work unit of an event made by `encode_unit_event`. Raises
+    ValueError when the event is not signed with `key`.
+    """
+    event_unit = event['workUnit']
+    unit = WorkUnit(
+        box_index=int(event_unit['boxIndex']),
+        seed=int(event_unit['seed']),
+        payload=base64.b64decode(event_unit['payload']),
+    )
+    verify(unit_message(unit), event_unit.get('signature', ''), key)
+    return unit
+
+
+def encode_unit_result(
+    result: bytes,
+    key: str = WORK_UNIT_KEY,
+) -> Dict[str, Any]:
+    return {
+        'result': base64.b64encode(result).decode('ascii'),
+        'signature': sign(result, key),
+    }
+
+
+def decode_unit_result(
+    payload: Dict[str, Any],
+    key: str = WORK_UNIT_KEY,
+) -> bytes:
+    result = base64.b64decode(payload['result'])
+    verify(result, payload.get('signature', ''), key)
+    return result
+
+
+def unit_message(unit: WorkUnit) -> bytes:
+    return f'{unit.box_index}:{unit.seed}:'.encode('ascii') + unit.payload
+
+
+def sign(message: bytes, key: str) -> str:
+    if not key:
+        raise ValueError('WORK_UNIT_KEY is not set')
+    return hmac.new(key.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def verify(message: bytes, signature: str, key: str) -> None:
+    if not hmac.compare_digest(sign(message, key), signature):
+        raise ValueError('work unit signature mismatch')
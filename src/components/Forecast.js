@@ -1,6 +1,7 @@
 import { Radio, Select, Table } from "antd";
 import * as React from "react";
 import '../styles/forecast.css';
+import { decodeColumnar, isColumnar } from "../utils/columnar";
 import { timeSince } from "../utils/display";
 import Container from "./common/Container";
 
@@ -34,7 +35,13 @@ const formatPlayer = (player) => (
 )
 
 
-const Forecast = ({ cat5Data }) => {
+const Forecast = ({ cat5Data: data }) => {
+  // the API serves the columnar format, static exports the legacy one
+  const cat5Data = React.useMemo(
+    () => (isColumnar(data) ? decodeColumnar(data) : data),
+    [data],
+  );
+
   // selectors
   const [selectedMatchup, setSelectedMatchup] = React.useState(0);
   const [selectedRadio, setSelectedRadio] = React.useState('default');
@@ -7,6 +7,30 @@ import Layout from "../components/Layout"
 import config from '../config.json'
 
 const API_ENDPOINT = 'https://1jk32bv8k9.execute-api.us-east-2.amazonaws.com/Prod/cat5/data/'
+// static export bucket, set to load pre-rendered data instead of calling the API
+const STATIC_ENDPOINT = ''
+
+const fetchJson = (url) => (
+  fetch(url,
+    {
+      method: 'GET',
+      headers: {
+        'Accept': 'application/json',
+      },
+    },
+  )
+    .then(response => {
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return response.json();
+    })
+)
+
+const fetchStatic = (tag) => (
+  fetchJson(`${STATIC_ENDPOINT}${tag}/manifest.json`)
+    .then(manifest => fetchJson(`${STATIC_ENDPOINT}${manifest.full}`))
+)
 
 const ApiPage = ({ location }) => {
   // get query params
@@ -20,21 +44,14 @@ const ApiPage = ({ location }) => {
   const [isError, setIsError] = React.useState(false)
   const [cat5Data, setCat5Data] = React.useState([{}])
   React.useEffect(() => {
-    const url = `${API_ENDPOINT}${tag}`
-    fetch(url,
-      {
-        method: 'GET',
-        headers: {
-          'Accept': 'application/json',
-        },
-      },
-    )
-      .then(response => {
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        return response.json();
+    const apiFetch = () => fetchJson(`${API_ENDPOINT}${tag}?format=columnar`)
+    const dataFetch = STATIC_ENDPOINT
+      ? fetchStatic(tag).catch(error => {
+        console.warn(error)
+        return apiFetch()
       })
+      : apiFetch()
+    dataFetch
       .then(result => {
         setCat5Data(result)
         setIsReady(true)
@@ -0,0 +1,97 @@
+// decoder of the API's columnar format (api/columnar.py), returns data in
+// the legacy shape with string ids
+const COLUMNAR_SCHEMA = 'cat5-columnar';
+const COLUMNAR_VERSION = 2;
+
+const TEAM_FIELDS = ['abbrev', 'name', 'manager', 'logoUrl', 'record', 'seed'];
+const PLAYER_FIELDS = ['name', 'pos', 'proTeam'];
+const ODDS_FIELDS = ['playoff', 'seed', 'champion'];
+const SIDES = ['home', 'away'];
+
+const optionalString = (v) => (v === null || v === undefined ? null : String(v));
+
+const decodeTable = (columns, fields) => {
+  const table = {};
+  columns.ids.forEach((id, i) => {
+    const row = {};
+    fields.forEach((field) => {
+      row[field] = columns[field][i];
+    });
+    table[String(id)] = row;
+  });
+  return table;
+};
+
+const decodeMatchup = (m, cats) => {
+  const forecasts = {};
+  Object.entries(m.forecasts).forEach(([name, f]) => {
+    const catWin = {};
+    cats.forEach((cat, i) => {
+      catWin[cat] = f.catWin[i];
+    });
+    forecasts[name] = { win: f.win, catWin };
+  });
+
+  const decoded = {
+    desc: m.desc,
+    homeTeam: String(m.homeTeam),
+    awayTeam: String(m.awayTeam),
+    forecasts,
+    homeGP: m.homeGP,
+    awayGP: m.awayGP,
+    optimizedHomeGP: m.optimizedHomeGP,
+    optimizedAwayGP: m.optimizedAwayGP,
+    updateTimestamp: m.updateTimestamp,
+  };
+  SIDES.forEach((side) => {
+    const values = m[`${side}PlayerValue`];
+    decoded[`${side}PlayerValue`] = values.players.map((p, i) => ({
+      player: String(p),
+      value: values.values[i],
+    }));
+
+    const moves = m[`${side}WaiverMoves`];
+    decoded[`${side}WaiverMoves`] = moves.add.map((a, i) => ({
+      add: String(a),
+      drop: String(moves.drop[i]),
+      win: moves.win[i],
+      gain: moves.gain[i],
+    }));
+
+    const plan = m[`${side}StreamingPlan`];
+    decoded[`${side}StreamingPlan`] = {
+      win: plan.win,
+      days: plan.dates.map((date, i) => ({
+        date,
+        starts: plan.starts[i].map(String),
+        add: optionalString(plan.add[i]),
+        drop: optionalString(plan.drop[i]),
+      })),
+    };
+
+    const lineup = m[`${side}OptimizedLineup`];
+    decoded[`${side}OptimizedLineup`] = lineup.players.map((p, i) => ({
+      player: String(p),
+      gameDay: optionalString(lineup.gameDays[i]) || '',
+    }));
+  });
+  return decoded;
+};
+
+export const isColumnar = (data) => data?.schema === COLUMNAR_SCHEMA;
+
+export const decodeColumnar = (data) => {
+  if (data.version !== COLUMNAR_VERSION) {
+    throw new Error(`unsupported columnar version: ${data.version}`);
+  }
+  return {
+    leagueId: data.leagueId,
+    matchupPeriod: data.matchupPeriod,
+    updateTimestamp: data.updateTimestamp,
+    maxGP: data.maxGP,
+    matchups: data.matchups.map((m) => decodeMatchup(m, data.cats)),
+    teams: decodeTable(data.teams, TEAM_FIELDS),
+    players: decodeTable(data.players, PLAYER_FIELDS),
+    playoffOdds: decodeTable(data.playoffOdds, ODDS_FIELDS),
+  };
+};
@@ -0,0 +1,43 @@
+import os
+from functools import cache
+
+from .base import (ConditionFailedError, Record, Storage, decode_json,
+                   encode_json, write_units)
+from .dynamo import DynamoStorage
+from .memory import MemoryStorage
+from .sqlite import SQLiteStorage
+
+TABLE_NAME = os.environ.get("TABLE_NAME", "Cat5Table")
+AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
+MOCK_DB_DIR = '.mock-db'
+# provisioned write capacity units writes are paced to, unpaced if unset
+TABLE_WCU = float(os.environ.get('TABLE_WCU', 0)) or None
+
+
+@cache
+def get_storage(mode: str, table_name: str = TABLE_NAME) -> Storage:
+    """
+    Returns the storage backend for `mode` ('prod', 'memory' or the local
+    SQLite mock). Backends are cached so clients and connections are
+    reused across warm invocations.
+    """
+    mode = mode.lower()
+    if mode == 'prod':
+        return DynamoStorage(table_name, AWS_REGION, TABLE_WCU)
+    if mode == 'memory':
+        return MemoryStorage()
+    return SQLiteStorage(os.path.join(MOCK_DB_DIR, f'{table_name}.sqlite3'))
+
+
+__all__ = [
+    'ConditionFailedError',
+    'DynamoStorage',
+    'MemoryStorage',
+    'Record',
+    'SQLiteStorage',
+    'Storage',
+    'decode_json',
+    'encode_json',
+    'get_storage',
+    'write_units',
+]
@@ -0,0 +1,96 @@
+import gzip
+import json
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class ConditionFailedError(Exception):
+    pass
+
+
+class Record(NamedTuple):
+    data: bytes
+    version: Optional[str] = None
+
+
+class Storage(ABC):
+    """
+    Key-value storage of binary payloads. Each record carries an optional
+    version string that conditional writes are checked against.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Record]:
+        pass
+
+    @abstractmethod
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        version: Optional[str] = None,
+        if_version: Optional[str] = None,
+        if_absent: bool = False,
+    ) -> float:
+        """
+        Writes `data` under `key` and returns the write capacity units
+        consumed. With `if_version` the write only succeeds if the stored
+        version matches and with `if_absent` only if no record exists.
+        Otherwise ConditionFailedError is raised.
+        """
+        pass
+
+    def batch_get(self, keys: List[str]) -> Dict[str, Record]:
+        """
+        Returns the records found for `keys`, missing keys are omitted
+        """
+        records = {key: self.get(key) for key in keys}
+        return {k: r for k, r in records.items() if r is not None}
+
+    def versions(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Returns the stored version of each of `keys` that exists, so
+        unchanged items can be skipped before writing them
+        """
+        return {k: r.version for k, r in self.batch_get(keys).items()}
+
+    def batch_put(
+        self,
+        items: Dict[str, bytes],
+        versions: Optional[Dict[str, str]] = None,
+    ) -> float:
+        versions = versions or {}
+        return sum(
+            self.put(key, data, versions.get(key))
+            for key, data in items.items()
+        )
+
+
+def write_units(size: int) -> float:
+    """
+    DynamoDB write capacity units of an item of `size` bytes, one per
+    started KB
+    """
+    return float(max(1, math.ceil(size / 1024)))
+
+
+def check_condition(
+    current: Optional[Record],
+    if_version: Optional[str],
+    if_absent: bool,
+) -> None:
+    if if_absent and current is not None:
+        raise ConditionFailedError('record already exists')
+    if if_version is not None and (
+        current is None or current.version != if_version
+    ):
+        raise ConditionFailedError(f'version mismatch: expected {if_version}')
+
+
+def encode_json(data: Any) -> bytes:
+    return gzip.compress(json.dumps(data).encode('utf-8'))
+
+
+def decode_json(data: bytes) -> Any:
+    return json.loads(gzip.decompress(data).decode('utf-8'))
@@ -0,0 +1,238 @@
+import base64
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from .base import ConditionFailedError, Record, Storage, write_units
+
+THROTTLE_CODES = (
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'ThrottlingException',
+)
+MAX_ATTEMPTS = 8
+BATCH_WRITE_SIZE = 25
+
+
+class CapacityPacer:
+    """
+    Token bucket of write capacity units refilled at `rate` units per
+    second, holding up to `burst_seconds` of unused capacity like
+    DynamoDB burst capacity. `acquire` sleeps until enough units are
+    available, so writes stay within the table's provisioned capacity
+    instead of being throttled.
+    """
+
+    def __init__(self, rate: float, burst_seconds: float = 300.0):
+        self.rate = rate
+        self.capacity = rate * burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, units: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate,
+            )
+            self.updated = now
+            self.tokens -= units
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            self.waited += wait
+            time.sleep(wait)
+
+
+class DynamoStorage(Storage):
+    """
+    With `write_capacity` (units per second) writes are paced by a
+    `CapacityPacer`. Throttled reads and writes are retried with
+    exponential backoff either way, as are unprocessed batch items.
+    `read_units` counts the read capacity units consumed.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        region: str,
+        write_capacity: Optional[float] = None,
+    ):
+        self.table_name = table_name
+        self.dynamo = boto3.resource('dynamodb', region_name=region)
+        self.table = self.dynamo.Table(table_name)
+        self.pacer = CapacityPacer(write_capacity) if write_capacity else None
+        self.throttled = 0
+        self.read_units = 0.0
+
+    def get(self, key: str) -> Optional[Record]:
+        resp = self._retry(lambda: self.table.get_item(
+            Key={'key': key}, ReturnConsumedCapacity='TOTAL',
+        ))
+        self.read_units += consumed_units(resp)
+        if 'data' not in resp.get('Item', {}):
+            return None
+        return to_record(resp['Item'])
+
+    def batch_get(self, keys: List[str]) -> Dict[str, Record]:
+        return {
+            item['key']: to_record(item) for item in self._batch_get(keys)
+        }
+
+    def versions(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Reads only the keys and versions, the items are still charged
+        read units by their full size
+        """
+        items = self._batch_get(
+            keys,
+            ProjectionExpression='#k, #v',
+            ExpressionAttributeNames={'#k': 'key', '#v': 'version'},
+        )
+        return {item['key']: item.get('version') for item in items}
+
+    def _batch_get(self, keys: List[str], **kwargs: Any) -> List[dict]:
+        items: List[dict] = []
+        for i in range(0, len(keys), 100):
+            request: Dict[str, Any] = {
+                self.table_name: {
+                    'Keys': [{'key': key} for key in keys[i:i + 100]],
+                    **kwargs,
+                },
+            }
+            for attempt in range(MAX_ATTEMPTS):
+                resp = self._retry(
+                    lambda: self.dynamo.batch_get_item(
+                        RequestItems=request,
+                        ReturnConsumedCapacity='TOTAL',
+                    )
+                )
+                self.read_units += consumed_units(resp)
+                items += resp['Responses'].get(self.table_name, [])
+                request = resp.get('UnprocessedKeys') or {}
+                if not request:
+                    break
+                self.throttled += 1
+                backoff(attempt)
+            else:
+                raise RuntimeError(
+                    f'unprocessed keys after {MAX_ATTEMPTS} attempts'
+                )
+        return items
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        version: Optional[str] = None,
+        if_version: Optional[str] = None,
+        if_absent: bool = False,
+    ) -> float:
+        item: Dict[str, Any] = {'key': key, 'data': data}
+        if version is not None:
+            item['version'] = version
+
+        kwargs: Dict[str, Any] = {'ReturnConsumedCapacity': 'TOTAL'}
+        if if_absent:
+            kwargs['ConditionExpression'] = Attr('key').not_exists()
+        elif if_version is not None:
+            kwargs['ConditionExpression'] = Attr('version').eq(if_version)
+
+        if self.pacer:
+            self.pacer.acquire(write_units(len(key) + len(data)))
+        try:
+            resp = self._retry(
+                lambda: self.table.put_item(Item=item, **kwargs)
+            )
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code == 'ConditionalCheckFailedException':
+                raise ConditionFailedError(str(e)) from e
+            raise
+        return consumed_units(resp)
+
+    def batch_put(
+        self,
+        items: Dict[str, bytes],
+        versions: Optional[Dict[str, str]] = None,
+    ) -> float:
+        """
+        Writes in batches of `BATCH_WRITE_SIZE`, each paced as a whole,
+        retrying unprocessed items with backoff
+        """
+        versions = versions or {}
+        keys = list(items)
+        units = 0.0
+        for i in range(0, len(keys), BATCH_WRITE_SIZE):
+            chunk = keys[i:i + BATCH_WRITE_SIZE]
+            requests = []
+            for key in chunk:
+                item: Dict[str, Any] = {'key': key, 'data': items[key]}
+                if key in versions:
+                    item['version'] = versions[key]
+                requests.append({'PutRequest': {'Item': item}})
+            if self.pacer:
+                self.pacer.acquire(sum(
+                    write_units(len(k) + len(items[k])) for k in chunk
+                ))
+
+            request: Dict[str, Any] = {self.table_name: requests}
+            for attempt in range(MAX_ATTEMPTS):
+                resp = self._retry(
+                    lambda: self.dynamo.batch_write_item(
+                        RequestItems=request,
+                        ReturnConsumedCapacity='TOTAL',
+                    )
+                )
+                units += consumed_units(resp)
+                request = resp.get('UnprocessedItems') or {}
+                if not request:
+                    break
+                self.throttled += 1
+                backoff(attempt)
+            else:
+                raise RuntimeError(
+                    f'unprocessed items after {MAX_ATTEMPTS} attempts'
+                )
+        return units
+
+    def _retry(self, request: Callable[[], Any]) -> Any:
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                return request()
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code not in THROTTLE_CODES or attempt == MAX_ATTEMPTS - 1:
+                    raise
+                self.throttled += 1
+                backoff(attempt)
+
+
+def backoff(attempt: int, base: float = 0.1, cap: float = 10.0) -> None:
+    """
+    Sleeps for an exponentially growing, fully jittered delay
+    """
+    time.sleep(random.uniform(0, min(cap, base * 2 ** attempt)))
+
+
+def consumed_units(resp: Dict[str, Any]) -> float:
+    consumed = resp.get('ConsumedCapacity', [])
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return float(sum(c.get('CapacityUnits', 0.0) for c in consumed))
+
+
+def to_record(item: Dict[str, Any]) -> Record:
+    data = item['data']
+    if isinstance(data, str):
+        # items written before binary payloads hold base64 strings
+        data = base64.b64decode(data)
+    elif not isinstance(data, bytes):
+        data = data.value
+    return Record(data, item.get('version'))
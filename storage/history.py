@@ -0,0 +1,61 @@
+from typing import Any, Dict, List
+
+# every this many runs of a matchup period history holds the full state
+# instead of a delta, so a reader replays at most this many runs
+CHECKPOINT_INTERVAL = 16
+
+
+def checkpoint_run(n: int) -> int:
+    """
+    The number of the checkpoint run that run `n` is replayed from
+    """
+    return n // CHECKPOINT_INTERVAL * CHECKPOINT_INTERVAL
+
+
+def diff_state(prev: Dict[str, Any], curr: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recursive diff of two nested dicts. Only changed values are kept and
+    removed keys are marked with None.
+    """
+    delta: Dict[str, Any] = {}
+    for k, v in curr.items():
+        prev_v = prev.get(k)
+        if isinstance(v, dict) and isinstance(prev_v, dict):
+            sub_delta = diff_state(prev_v, v)
+            if sub_delta:
+                delta[k] = sub_delta
+        elif v != prev_v:
+            delta[k] = v
+    for k in prev:
+        if k not in curr:
+            delta[k] = None
+    return delta
+
+
+def apply_delta(state: Any, delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Inverse of `diff_state`: returns a copy of `state` with the changed
+    values applied and None-marked keys removed
+    """
+    new_state = dict(state) if isinstance(state, dict) else {}
+    for k, v in delta.items():
+        if v is None:
+            new_state.pop(k, None)
+        elif isinstance(v, dict):
+            new_state[k] = apply_delta(new_state.get(k), v)
+        else:
+            new_state[k] = v
+    return new_state
+
+
+def replay_state(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The state after a checkpoint run and the delta runs following it
+    """
+    state: Dict[str, Any] = {}
+    for run in runs:
+        if 'state' in run:
+            state = run['state']
+        else:
+            state = apply_delta(state, run['delta'])
+    return state
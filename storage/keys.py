@@ -0,0 +1,30 @@
+def matchup_key(key: str, i: int) -> str:
+    return f'{key}#matchups#{i}'
+
+
+def history_key(key: str, period: int) -> str:
+    return f'{key}#history#{period}'
+
+
+def history_run_key(key: str, period: int, n: int) -> str:
+    return f'{key}#history#{period}#{n}'
+
+
+def league_key(key: str) -> str:
+    return f'{key}#league'
+
+
+def summary_key(key: str) -> str:
+    return f'{key}#summary'
+
+
+def profile_key(key: str) -> str:
+    return f'{key}#profile'
+
+
+def projections_key(year: int) -> str:
+    """
+    Player projections are the same in every league, so they are shared
+    by all tags of a season
+    """
+    return f'projections#{year}'
@@ -0,0 +1,26 @@
+import threading
+from typing import Dict, Optional
+
+from .base import Record, Storage, check_condition, write_units
+
+
+class MemoryStorage(Storage):
+    def __init__(self) -> None:
+        self.records: Dict[str, Record] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Record]:
+        return self.records.get(key)
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        version: Optional[str] = None,
+        if_version: Optional[str] = None,
+        if_absent: bool = False,
+    ) -> float:
+        with self._lock:
+            check_condition(self.records.get(key), if_version, if_absent)
+            self.records[key] = Record(bytes(data), version)
+        return write_units(len(key) + len(data))
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from .base import Record, Storage, check_condition, write_units
+
+
+class SQLiteStorage(Storage):
+    """
+    Local stand-in for DynamoDB. Records are stored as compressed blobs
+    in a single table and every write is committed to disk, so local
+    runs pay comparable serialization and I/O costs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False,
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            'key TEXT PRIMARY KEY, data BLOB NOT NULL, version TEXT)'
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Record]:
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT data, version FROM items WHERE key = ?', (key,),
+            ).fetchone()
+        return Record(row[0], row[1]) if row else None
+
+    def batch_get(self, keys: List[str]) -> Dict[str, Record]:
+        records: Dict[str, Record] = {}
+        with self._lock:
+            for i in range(0, len(keys), 100):
+                chunk = keys[i:i + 100]
+                rows = self.conn.execute(
+                    f'SELECT key, data, version FROM items WHERE key IN '
+                    f'({",".join("?" * len(chunk))})',
+                    chunk,
+                ).fetchall()
+                records.update({k: Record(d, v) for k, d, v in rows})
+        return records
+
+    def versions(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        versions: Dict[str, Optional[str]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 100):
+                chunk = keys[i:i + 100]
+                rows = self.conn.execute(
+                    f'SELECT key, version FROM items WHERE key IN '
+                    f'({",".join("?" * len(chunk))})',
+                    chunk,
+                ).fetchall()
+                versions.update(dict(rows))
+        return versions
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        version: Optional[str] = None,
+        if_version: Optional[str] = None,
+        if_absent: bool = False,
+    ) -> float:
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                if if_version is not None or if_absent:
+                    row = self.conn.execute(
+                        'SELECT data, version FROM items WHERE key = ?',
+                        (key,),
+                    ).fetchone()
+                    current = Record(row[0], row[1]) if row else None
+                    check_condition(current, if_version, if_absent)
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO items VALUES (?, ?, ?)',
+                    (key, data, version),
+                )
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+        return write_units(len(key) + len(data))
+
+    def batch_put(
+        self,
+        items: Dict[str, bytes],
+        versions: Optional[Dict[str, str]] = None,
+    ) -> float:
+        versions = versions or {}
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO items VALUES (?, ?, ?)',
+                [(k, d, versions.get(k)) for k, d in items.items()],
+            )
+            self.conn.execute('COMMIT')
+        return sum(write_units(len(k) + len(d)) for k, d in items.items())
@@ -0,0 +1,43 @@
+import pickle
+from collections import Counter
+from datetime import datetime
+from typing import List
+
+from espn_api.basketball import League
+from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
+
+from cat5.config import starts_per_gameday
+from cat5.start import EmptyStart, PlayerStart
+
+SNAPSHOT_DATE = datetime(2025, 1, 9)
+LEAGUE_PATH = 'tests/pickles/league_20250109.pkl'
+BOX_SCORES_PATH = 'tests/pickles/box_scores_20250109.pkl'
+
+
+def read_league() -> League:
+    """
+    A fresh copy of the snapshot league, tests may change it
+    """
+    with open(LEAGUE_PATH, 'rb') as file:
+        return pickle.load(file)
+
+
+def read_box_scores() -> List[BoxScore]:
+    """
+    A fresh copy of the snapshot box scores, tests may change them
+    """
+    with open(BOX_SCORES_PATH, 'rb') as file:
+        return pickle.load(file)
+
+
+def is_feasible(starts: List[PlayerStart], remaining_gp: int) -> bool:
+    """
+    Whether a lineup could be set: at most `remaining_gp` starts and at
+    most `starts_per_gameday` starts on any game day
+    """
+    day_counts = Counter(
+        s.game_day_id for s in starts if not isinstance(s, EmptyStart)
+    )
+    return len(starts) <= remaining_gp and all(
+        n <= starts_per_gameday for n in day_counts.values()
+    )
@@ -0,0 +1,429 @@
+import json
+import os
+import tempfile
+import unittest
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from api import handler
+from api.cache import ResponseCache
+from api.columnar import (COLUMNAR_MEDIA_TYPE, decode_columnar,
+                          encode_columnar)
+from api.db import DBReader, NotFoundError
+from api.history import matchup_series
+from processor.db import DBWriter
+from storage import MemoryStorage
+from storage.history import CHECKPOINT_INTERVAL
+from storage.keys import history_key
+
+
+def api_event(tag: str, headers: Optional[dict] = None) -> dict:
+    return {
+        'path': f'/cat5/data/{tag}',
+        'httpMethod': 'GET',
+        'headers': headers or {},
+        'pathParameters': {'tag': tag},
+    }
+
+
+class TestApi(unittest.TestCase):
+    def setUp(self):
+        print('--> running')
+        self.data = {'updateTimestamp': 1736400000, 'matchups': []}
+        self.db = MagicMock()
+        self.db.read.return_value = self.data
+
+    def test_cache_lru_eviction(self):
+        cache = ResponseCache(ttl=60, stale_ttl=60, max_bytes=100)
+        cache.put('a', {'x': 'a' * 30})
+        cache.put('b', {'x': 'b' * 30})
+        cache.get('a')
+        cache.put('c', {'x': 'c' * 30})
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertLessEqual(cache.size, 100)
+
+    def test_cache_stale(self):
+        cache = ResponseCache(ttl=0, stale_ttl=60)
+        cache.put('a', self.data)
+        item, fresh = cache.get('a')
+        self.assertIsNotNone(item)
+        self.assertFalse(fresh)
+
+        # expired items are refetched, and served if that fails
+        assert item is not None
+        fetched = cache.fetch(
+            'a', lambda: {**self.data, 'updateTimestamp': 1}, item,
+        )
+        self.assertEqual(fetched.data['updateTimestamp'], 1)
+
+        def fail():
+            raise RuntimeError('read failed')
+        self.assertIs(cache.fetch('a', fail, fetched), fetched)
+        self.assertRaises(RuntimeError, cache.fetch, 'a', fail)
+
+        def missing():
+            raise KeyError('a')
+        self.assertRaises(KeyError, cache.fetch, 'b', missing, fetched)
+        self.assertEqual(cache.stats.reads, 1)
+
+    def test_stale_while_revalidate(self):
+        with patch.object(handler, 'db', self.db), \
+                patch.object(handler, 'cache', ResponseCache(ttl=0)):
+            for _ in range(3):
+                resp = handler.lambda_handler(api_event('t'), LambdaContext())
+                self.assertEqual(resp['statusCode'], 200)
+
+            # the expired item is served once, the next request refetches
+            self.assertEqual(self.db.read.call_count, 2)
+            stats = handler.cache.stats.as_dict()
+            self.assertEqual(stats['lookups'], {'miss': 2, 'stale': 1})
+
+    def test_prefetch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.json')
+            with open(path, 'w') as f:
+                json.dump({'leagues': {'t': {'name': 'T', 'year': 2025}}}, f)
+            self.assertEqual(handler.prefetch_tags(path), ['t'])
+        self.assertEqual(handler.prefetch_tags(path), [])
+
+        with patch.object(handler, 'db', self.db), \
+                patch.object(handler, 'cache', ResponseCache()):
+            handler.prefetch(['t'])
+            resp = handler.lambda_handler(api_event('t'), LambdaContext())
+            self.assertEqual(resp['statusCode'], 200)
+            self.assertEqual(self.db.read.call_count, 1)
+            stats = handler.cache.stats.as_dict()
+            self.assertEqual(stats['lookups'], {'hit': 1})
+            self.assertEqual(stats['hitRate'], 1.0)
+
+    def test_etag_not_modified(self):
+        with patch.object(handler, 'db', self.db), \
+                patch.object(handler, 'cache', ResponseCache()):
+            resp = handler.lambda_handler(api_event('t'), LambdaContext())
+            self.assertEqual(resp['statusCode'], 200)
+            self.assertEqual(json.loads(resp['body']), self.data)
+            etag = resp['multiValueHeaders']['ETag'][0]
+
+            resp = handler.lambda_handler(
+                api_event('t', {'If-None-Match': etag}), LambdaContext(),
+            )
+            self.assertEqual(resp['statusCode'], 304)
+            self.assertEqual(self.db.read.call_count, 1)
+
+    def test_sharded_read(self):
+        data = {
+            'updateTimestamp': 1736400000,
+            'matchups': [{'desc': 'a'}, {'desc': 'b'}],
+            'teams': {},
+        }
+        writer, reader = DBWriter(), DBReader()
+        writer.storage = reader.storage = MemoryStorage()
+        writer.write_instance('t', data)
+
+        self.assertEqual(reader.read('t'), {**data, 'complete': True})
+        self.assertEqual(reader.read_matchup('t', 1), {'desc': 'b'})
+        self.assertEqual(reader.read_index('t')['matchupCount'], 2)
+        with self.assertRaises(NotFoundError):
+            reader.read_matchup('t', 2)
+
+    def test_progressive_read(self):
+        writer, reader = DBWriter(), DBReader()
+        writer.storage = reader.storage = MemoryStorage()
+        writer.write_instance('t', {
+            'updateTimestamp': 1,
+            'matchups': [{'desc': 'a', 'updateTimestamp': 1}],
+            'playoffOdds': {'1': 0.5},
+        })
+
+        # a new run with more matchups, part way through
+        writer.start_instance('t', {'updateTimestamp': 2}, matchup_count=3)
+        writer.write_matchup('t', 1, {'desc': 'b', 'updateTimestamp': 2})
+        data = reader.read('t')
+        self.assertFalse(data['complete'])
+        self.assertEqual(data['updateTimestamp'], 2)
+        self.assertEqual(data['playoffOdds'], {'1': 0.5})
+        self.assertEqual(
+            [(m['desc'], m['updateTimestamp']) for m in data['matchups']],
+            [('a', 1), ('b', 2)],
+        )
+
+        writer.write_matchup('t', 0, {'desc': 'a', 'updateTimestamp': 2})
+        writer.write_matchup('t', 2, {'desc': 'c', 'updateTimestamp': 2})
+        writer.write_index('t', {
+            'updateTimestamp': 2,
+            'matchups': [{}, {}, {}],
+            'playoffOdds': {'1': 0.6},
+        })
+        data = reader.read('t')
+        self.assertTrue(data['complete'])
+        self.assertEqual(data['playoffOdds'], {'1': 0.6})
+        self.assertEqual(
+            [m['desc'] for m in data['matchups']], ['a', 'b', 'c'],
+        )
+
+    def test_skip_unchanged_writes(self):
+        data = {
+            'updateTimestamp': 1,
+            'matchups': [
+                {'desc': 'a', 'updateTimestamp': 1},
+                {'desc': 'b', 'updateTimestamp': 1},
+            ],
+        }
+        storage = MemoryStorage()
+        writer = DBWriter()
+        writer.storage = storage
+        writer.write_instance('t', data)
+        self.assertEqual(writer.metrics['items'], 3)
+
+        # a later run that only changed timestamps and one matchup skips
+        # the items whose stored version matches
+        writer = DBWriter()
+        writer.storage = storage
+        writer.write_instance('t', {
+            'updateTimestamp': 2,
+            'matchups': [
+                {'desc': 'a', 'updateTimestamp': 2},
+                {'desc': 'c', 'updateTimestamp': 2},
+            ],
+        })
+        self.assertEqual(writer.metrics['items'], 1)
+        self.assertEqual(writer.metrics['skipped'], 2)
+        self.assertGreater(writer.metrics['bytes'], 0)
+        self.assertEqual(writer.metrics['units'], 1)
+
+        reader = DBReader()
+        reader.storage = storage
+        self.assertEqual(
+            [m['desc'] for m in reader.read('t')['matchups']], ['a', 'c'],
+        )
+
+        # the complete index already covers an unchanged header
+        writer.start_instance('t', {'updateTimestamp': 3}, matchup_count=2)
+        self.assertEqual(writer.metrics['items'], 1)
+        self.assertTrue(reader.read('t')['complete'])
+
+    def test_summaries(self):
+        def instance(ts: int) -> dict:
+            return {
+                'leagueId': '1',
+                'matchupPeriod': 12,
+                'updateTimestamp': ts,
+                'matchups': [{
+                    'desc': 'a vs b',
+                    'homeTeam': 'a',
+                    'awayTeam': 'b',
+                    'forecasts': {'default': {'win': 0.6, 'catWin': {}}},
+                    'updateTimestamp': ts,
+                }],
+            }
+
+        writer, reader = DBWriter(), DBReader()
+        writer.storage = reader.storage = MemoryStorage()
+        writer.write_summary('t1', instance(1))
+        writer.write_summary('t2', instance(2))
+
+        event = {
+            'path': '/cat5/summaries',
+            'httpMethod': 'GET',
+            'headers': {},
+            'queryStringParameters': {'tags': 't2,t1,t3'},
+        }
+        with patch.object(handler, 'db', reader), \
+                patch.object(handler, 'cache', ResponseCache()), \
+                patch.object(reader.storage, 'batch_get',
+                             wraps=reader.storage.batch_get) as batch_get:
+            resp = handler.lambda_handler(event, LambdaContext())
+            # the summaries are read in one batch
+            batch_get.assert_called_once_with(
+                ['t1#summary', 't2#summary', 't3#summary'],
+            )
+        self.assertEqual(resp['statusCode'], 200)
+        body = json.loads(resp['body'])
+        self.assertEqual(body['missing'], ['t3'])
+        self.assertEqual(body['summaries']['t2']['updateTimestamp'], 2)
+        self.assertEqual(body['summaries']['t1']['matchups'], [{
+            'desc': 'a vs b',
+            'homeTeam': 'a',
+            'awayTeam': 'b',
+            'win': 0.6,
+            'updateTimestamp': 1,
+        }])
+
+        event['queryStringParameters'] = {'tags': ''}
+        resp = handler.lambda_handler(event, LambdaContext())
+        self.assertEqual(resp['statusCode'], 400)
+
+    def test_columnar(self):
+        forecast = {'win': 0.6, 'catWin': {'PTS': 0.7, 'REB': 0.4}}
+        plan = {
+            'win': 0.65,
+            'days': [{'date': '2025-01-09', 'starts': ['10', '11'],
+                      'add': '12', 'drop': None}],
+        }
+        data = {
+            'leagueId': '1',
+            'matchupPeriod': 12,
+            'updateTimestamp': 1736400000,
+            'maxGP': 35,
+            'matchups': [{
+                'desc': 'a vs b',
+                'homeTeam': '1',
+                'awayTeam': '2',
+                'forecasts': {
+                    'default': forecast,
+                    'homeOptimized': {**forecast, 'win': 0.7},
+                    'awayOptimized': forecast,
+                    'bothOptimized': forecast,
+                },
+                'homePlayerValue': [{'player': '10', 'value': 0.2}],
+                'awayPlayerValue': [],
+                'homeWaiverMoves': [
+                    {'add': '12', 'drop': '11', 'win': 0.62, 'gain': 0.02},
+                ],
+                'awayWaiverMoves': [],
+                'homeStreamingPlan': plan,
+                'awayStreamingPlan': {'win': 0.4, 'days': []},
+                'homeOptimizedLineup': [
+                    {'player': '10', 'gameDay': '80'},
+                    {'player': '0', 'gameDay': ''},
+                ],
+                'awayOptimizedLineup': [],
+                'homeGP': 2,
+                'awayGP': 0,
+                'optimizedHomeGP': 1,
+                'optimizedAwayGP': 0,
+                'updateTimestamp': 1736400000,
+            }],
+            'teams': {'1': {'abbrev': 'A', 'name': 'a', 'manager': 'A A',
+                            'logoUrl': '', 'record': '1-0-0', 'seed': 1}},
+            'players': {'10': {'name': 'x', 'pos': 'PG', 'proTeam': 'LAL'}},
+            'playoffOdds': {'1': {'playoff': 0.5, 'seed': [0.5],
+                                  'champion': 0.1}},
+        }
+        encoded = encode_columnar(data)
+        self.assertEqual(encoded['cats'], ['PTS', 'REB'])
+        self.assertEqual(encoded['players']['ids'], [10])
+        self.assertEqual(
+            encoded['matchups'][0]['forecasts']['default']['catWin'],
+            [0.7, 0.4],
+        )
+        self.assertEqual(decode_columnar(json.loads(json.dumps(encoded))),
+                         data)
+        with self.assertRaises(ValueError):
+            decode_columnar({**encoded, 'version': 0})
+
+        # instances written before the later fields still encode
+        legacy = {k: v for k, v in data.items() if k != 'playoffOdds'}
+        legacy['matchups'] = [{
+            k: v for k, v in data['matchups'][0].items()
+            if k in ('desc', 'homeTeam', 'awayTeam', 'forecasts',
+                     'homePlayerValue', 'awayPlayerValue', 'homeGP', 'awayGP')
+        }]
+        m = decode_columnar(encode_columnar(legacy))['matchups'][0]
+        self.assertEqual(m['homeWaiverMoves'], [])
+        self.assertEqual(m['homeStreamingPlan'], {'win': None, 'days': []})
+        self.assertEqual(m['optimizedHomeGP'], 2)
+        self.assertEqual(m['updateTimestamp'], data['updateTimestamp'])
+
+        # selected by query parameter or Accept header, legacy by default
+        self.db.read.return_value = data
+        with patch.object(handler, 'db', self.db), \
+                patch.object(handler, 'cache', ResponseCache()):
+            resp = handler.lambda_handler(api_event('t'), LambdaContext())
+            self.assertEqual(json.loads(resp['body']), data)
+            event = api_event('t', {'Accept': COLUMNAR_MEDIA_TYPE})
+            resp = handler.lambda_handler(event, LambdaContext())
+            self.assertEqual(json.loads(resp['body']), encoded)
+            self.assertEqual(
+                resp['multiValueHeaders']['Content-Type'],
+                [COLUMNAR_MEDIA_TYPE],
+            )
+            event = {**api_event('t'),
+                     'queryStringParameters': {'format': 'columnar'}}
+            resp = handler.lambda_handler(event, LambdaContext())
+            self.assertEqual(json.loads(resp['body']), encoded)
+            event['queryStringParameters'] = {'format': 'xml'}
+            resp = handler.lambda_handler(event, LambdaContext())
+            self.assertEqual(resp['statusCode'], 400)
+
+            # only a missing item is not found
+            self.db.read.return_value = legacy
+            event = api_event('u', {'Accept': COLUMNAR_MEDIA_TYPE})
+            resp = handler.lambda_handler(event, LambdaContext())
+            self.assertEqual(resp['statusCode'], 200)
+            self.db.read.side_effect = NotFoundError('v')
+            resp = handler.lambda_handler(api_event('v'), LambdaContext())
+            self.assertEqual(resp['statusCode'], 404)
+
+    def test_history_series(self):
+        def instance(ts: int, win: float, value: float) -> dict:
+            return {
+                'matchupPeriod': 12,
+                'updateTimestamp': ts,
+                'matchups': [{
+                    'forecasts': {'default': {'win': win, 'catWin': {}}},
+                    'homePlayerValue': [{'player': '1', 'value': value}],
+                    'awayPlayerValue': [],
+                }],
+            }
+
+        writer, reader = DBWriter(), DBReader()
+        writer.storage = reader.storage = MemoryStorage()
+        writer.write_history('t', instance(1, 0.5, 0.2))
+        writer.write_history('t', instance(2, 0.5, 0.3))
+        writer.write_history('t', instance(3, 0.6, 0.3))
+        # a run that changed nothing is not recorded
+        writer.write_history('t', instance(4, 0.6, 0.3))
+        runs = reader.read_history('t', 12, limit=10)
+
+        self.assertEqual(runs[1]['delta'], {
+            '0': {'homePlayerValue': {'1': 0.3}},
+        })
+        series = matchup_series(runs, 0)
+        self.assertEqual(
+            [(s['updateTimestamp'], s['forecasts']['default']['win'])
+             for s in series],
+            [(1, 0.5), (2, 0.5), (3, 0.6)],
+        )
+
+        # the head only counts the runs, every CHECKPOINT_INTERVAL runs
+        # hold the full state and reads start at the checkpoint before
+        # the last `limit` runs
+        for ts in range(5, 5 + CHECKPOINT_INTERVAL):
+            writer.write_history('t', instance(ts, ts / 100, 0.3))
+        head = reader.read(history_key('t', 12))
+        self.assertEqual(head, {
+            'matchupPeriod': 12, 'runCount': CHECKPOINT_INTERVAL + 3,
+        })
+        runs = reader.read_history('t', 12, limit=2)
+        self.assertEqual(len(runs), 3)
+        self.assertIn('state', runs[0])
+        series = matchup_series(runs, 0)
+        self.assertEqual(
+            [s['forecasts']['default']['win'] for s in series[-2:]],
+            [(3 + CHECKPOINT_INTERVAL) / 100, (4 + CHECKPOINT_INTERVAL) / 100],
+        )
+
+        # the route serves the last `limit` runs
+        event = {
+            'path': '/cat5/data/t/matchups/0/history',
+            'httpMethod': 'GET',
+            'headers': {},
+            'pathParameters': {'tag': 't', 'i': '0'},
+            'queryStringParameters': {'period': '12', 'limit': '2'},
+        }
+        with patch.object(handler, 'db', reader), \
+                patch.object(handler, 'cache', ResponseCache()):
+            resp = handler.lambda_handler(event, LambdaContext())
+            self.assertEqual(json.loads(resp['body'])['series'], series[-2:])
+            event['queryStringParameters'] = {'limit': '0'}
+            resp = handler.lambda_handler(event, LambdaContext())
+            self.assertEqual(resp['statusCode'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,68 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from cat5.backtest import Backtest, box_outcome, score
+from cat5.model import scored_cats
+from tests.fixtures import read_box_scores
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self) -> None:
+        print('--> running')
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.snapshot_dir, 'cache')
+        for name in ('league_20250109.pkl', 'box_scores_20250109.pkl'):
+            shutil.copy(f'tests/pickles/{name}', self.snapshot_dir)
+
+        # the snapshot's own box scores stand in for the final results
+        self.box_scores = read_box_scores()
+        for box in self.box_scores:
+            box.winner = 'HOME' if box.home_wins > box.away_wins else 'AWAY'
+        path = os.path.join(self.snapshot_dir, 'final_box_scores_12.pkl')
+        with open(path, 'wb') as file:
+            pickle.dump(self.box_scores, file)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.snapshot_dir)
+
+    def test_score(self):
+        metrics = score(np.array([0.9, 0.8, 0.2]), np.array([1.0, 0.0, 0.0]))
+        self.assertEqual(metrics.n, 3)
+        self.assertAlmostEqual(metrics.brier, (0.01 + 0.64 + 0.04) / 3)
+        self.assertAlmostEqual(
+            metrics.log_loss, -(np.log(0.9) + np.log(0.2) + np.log(0.8)) / 3,
+        )
+        self.assertEqual([b.n for b in metrics.reliability], [1, 1, 1])
+        self.assertEqual(metrics.reliability[-1].freq, 1.0)
+
+    def test_box_outcome(self):
+        box = self.box_scores[0]
+        cats, win = box_outcome(box)
+        self.assertEqual(len(cats), len(scored_cats))
+        self.assertEqual(sum(c == 1.0 for c in cats), box.home_wins)
+        self.assertEqual(win, float(box.home_wins >= 5))
+
+    def test_backtest(self):
+        backtest = Backtest(self.snapshot_dir, self.cache_dir, workers=1)
+        report = backtest.run()
+        self.assertEqual(report.n_snapshots, 1)
+        self.assertEqual(report.n_evaluations, len(self.box_scores))
+        for metrics in report.metrics.values():
+            self.assertEqual(metrics.n, len(self.box_scores))
+            self.assertTrue(0 <= metrics.brier <= 1)
+            self.assertEqual(
+                sum(b.n for b in metrics.reliability), metrics.n,
+            )
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # a second run reads the cache
+        self.assertEqual(backtest.run(), report)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,74 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from processor.export import RETIRED_TAG, StaticExporter
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        print('--> running')
+        self.data = {
+            'updateTimestamp': 1736400000,
+            'matchups': [{'desc': 'a'}, {'desc': 'b'}],
+            'teams': {},
+        }
+
+    def test_local_export(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            exporter = StaticExporter(mode='local', out_dir=tmp)
+            self.assertTrue(exporter.enabled)
+            manifest = exporter.export('t', self.data)
+
+            with open(os.path.join(tmp, 't', 'manifest.json')) as f:
+                self.assertEqual(json.load(f), manifest)
+
+            def load(path: str) -> dict:
+                with gzip.open(os.path.join(tmp, f'{path}.gz')) as f:
+                    return json.load(f)
+
+            self.assertEqual(load(manifest['full']), self.data)
+            self.assertEqual(load(manifest['matchups'][1]), {'desc': 'b'})
+            self.assertEqual(load(manifest['index'])['matchupCount'], 2)
+
+            # unchanged content keeps its name
+            self.assertEqual(exporter.export('t', self.data), manifest)
+
+    def test_retire_replaced(self):
+        exporter = StaticExporter(mode='s3', bucket='b')
+        exporter.s3 = MagicMock()
+        exporter.s3.get_object.side_effect = Exception('no manifest')
+        exporter.s3.exceptions.NoSuchKey = Exception
+        first = exporter.export('t', self.data)
+        exporter.s3.put_object_tagging.assert_not_called()
+
+        exporter.s3.get_object.side_effect = None
+        exporter.s3.get_object.return_value = {
+            'Body': MagicMock(read=lambda: json.dumps(first).encode()),
+        }
+        data = {**self.data, 'matchups': [{'desc': 'a'}, {'desc': 'c'}]}
+        second = exporter.export('t', data)
+
+        # only the documents the new manifest replaced are retired
+        retired = sorted(
+            c.kwargs['Key']
+            for c in exporter.s3.put_object_tagging.call_args_list
+        )
+        self.assertEqual(
+            retired,
+            sorted([first['full'], first['matchups'][1]]),
+        )
+        self.assertEqual(second['index'], first['index'])
+        self.assertEqual(second['matchups'][0], first['matchups'][0])
+        for c in exporter.s3.put_object_tagging.call_args_list:
+            self.assertEqual(c.kwargs['Tagging'], {'TagSet': [RETIRED_TAG]})
+
+    def test_disabled(self):
+        self.assertFalse(StaticExporter(mode='').enabled)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,18 +1,177 @@
 import unittest
+from collections import Counter
+from typing import List
 
-from cat5.matchup import random_draw
+import numpy as np
+from espn_api.basketball import League
+from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
+
+from cat5 import Matchup, MatchupPeriod
+from cat5.config import starts_per_gameday
+from cat5.matchup import Lineup, random_order_index
+from cat5.model import scored_cats, stat_columns
+from tests.fixtures import (SNAPSHOT_DATE, is_feasible, read_box_scores,
+                            read_league)
 
 
 class TestModel(unittest.TestCase):
+    league: League
+    box_scores: List[BoxScore]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # the matchup tests only read the snapshot
+        cls.league = read_league()
+        cls.box_scores = read_box_scores()
+
     def setUp(self):
         print('--> running')
 
-    def test_random_draw(self):
-        arr = ['a', 'b', 'c', 'd']
-        n = 2
-        w_arr = [0.0, 0.7, 0.6, 0.9]
-        result = random_draw(arr, n, w_arr)
-        self.assertEqual(len(result), n)
+    def test_random_order(self):
+        w_arr = np.array([0.0, 0.7, 0.6, 0.9])
+        order = random_order_index(w_arr)
+        self.assertEqual(sorted(order), [0, 1, 2, 3])
+        self.assertEqual(order[-1], 0)
+
+    def test_lineup_slots(self) -> None:
+        matchup = Matchup(
+            self.box_scores[0], MatchupPeriod(self.league), SNAPSHOT_DATE,
+        )
+        lineup = matchup.home_lineup
+        gp = lineup.remaining_gp
+        for _ in range(100):
+            lineup.set_randomly(min_w=10, max_w=95)
+            self.assertTrue(is_feasible(lineup.lineup, gp))
+        lineup.set_probable()
+        self.assertTrue(is_feasible(lineup.lineup, gp))
+        self.assertFalse(is_feasible(
+            [es.player_start for es in lineup.eligible_starts], gp,
+        ))
+
+    def test_lineup_fill(self) -> None:
+        matchup = Matchup(
+            self.box_scores[0], MatchupPeriod(self.league), SNAPSHOT_DATE,
+        )
+        lineup = matchup.home_lineup
+        starts = [es.player_start for es in lineup.eligible_starts]
+        for _ in range(20):
+            order = list(np.random.permutation(len(starts)))
+            selected = list(lineup.fill(np.array(order)))
+            expected = [starts[i] for i in selected]
+            self.assertTrue(is_feasible(expected, lineup.remaining_gp))
+
+            # starts are taken in order, skipping only those of full days
+            last = order.index(selected[-1])
+            self.assertEqual(
+                selected, [i for i in order[:last + 1] if i in selected],
+            )
+            day_counts = Counter(lineup.start_day[selected])
+            for i in order[:last + 1]:
+                if i not in selected:
+                    self.assertEqual(
+                        day_counts[lineup.start_day[i]], starts_per_gameday,
+                    )
+            lineup.selected = np.array(selected)
+            self.assertEqual(lineup.lineup, expected)
+
+        # starts are materialized once and map back to their index
+        lineup.lineup = expected
+        self.assertEqual(lineup.lineup, expected)
+        total = lineup.totals([lineup.selected])[0]
+
+        # warm starts keep the still eligible starts of a lineup
+        lineup.set_probable()
+        ids = lineup.start_ids()
+        lineup.set_default()
+        self.assertEqual(len(ids), lineup.set_warm(ids + [(-1, '1')]))
+        self.assertEqual(lineup.start_ids(), ids)
+        self.assertAlmostEqual(
+            total[stat_columns.index('PTS')],
+            sum(s.projection('PTS') for s in expected),
+        )
+
+    def test_availability_scenarios(self) -> None:
+        availability = {'DAY_TO_DAY': 0.6}
+        matchup = Matchup(
+            self.box_scores[2], MatchupPeriod(self.league), SNAPSHOT_DATE,
+            availability,
+        )
+        home, away = matchup.home_lineup, matchup.away_lineup
+        home.set_probable()
+        away.set_probable()
+        k = len(home.uncertain) + len(away.uncertain)
+        self.assertGreater(k, 0)
+        self.assertEqual(len(matchup.scenario_weights), 2 ** k)
+        self.assertAlmostEqual(matchup.scenario_weights.sum(), 1.0)
+
+        # the mixture is the weighted win probability of the scenario
+        # lineups without the starts of the players who sit out
+        def scenario_total(lineup: Lineup, plays: np.ndarray) -> np.ndarray:
+            sits = lineup.uncertain[plays == 0]
+            starts = [i for i in lineup.selected
+                      if lineup.start_player[i] not in sits]
+            return lineup.player_rows[lineup.start_player[starts]].sum(axis=0)
+
+        expected = sum(
+            w * float(matchup.win_p(
+                scenario_total(home, home_plays),
+                scenario_total(away, away_plays),
+            ))
+            for w, home_plays, away_plays in zip(
+                matchup.scenario_weights, matchup.home_plays,
+                matchup.away_plays,
+            )
+        )
+        win, cat_win = matchup.forecast()
+        self.assertAlmostEqual(win, expected)
+        self.assertEqual(list(cat_win), scored_cats)
+
+        # expected totals weight uncertain players by their availability
+        i = home.uncertain[0]
+        self.assertEqual(home.players[i].injuryStatus, 'DAY_TO_DAY')
+        start = int(np.flatnonzero(home.start_player == i)[0])
+        np.testing.assert_allclose(
+            home.start_rows[start], 0.6 * home.player_rows[i],
+        )
+        # and so do the start stats of the waiver and streaming evaluations
+        np.testing.assert_allclose(
+            matchup.expected_stats(home.start(start)), home.start_rows[start],
+        )
+
+        # sampled when there are more combinations than scenarios
+        matchup.set_scenarios(4)
+        self.assertEqual(len(matchup.scenario_weights), 4)
+        self.assertAlmostEqual(matchup.scenario_weights.sum(), 1.0)
+
+        # with every player certain the mixture is the analytic model
+        certain = Matchup(
+            self.box_scores[2], MatchupPeriod(self.league), SNAPSHOT_DATE, {},
+        )
+        self.assertFalse(certain.is_uncertain)
+        win, cat_win = certain.forecast()
+        model = certain.get_model()
+        self.assertAlmostEqual(win, model.predict_win())
+        for cat, p in model.predict_cats().items():
+            self.assertAlmostEqual(cat_win[cat], p)
+
+    def test_optimize_both_lineups(self) -> None:
+        # every player certain to play, so the model matches the totals
+        matchup = Matchup(
+            self.box_scores[0], MatchupPeriod(self.league), SNAPSHOT_DATE, {},
+        )
+        win = matchup.optimize_both_lineups(n=200)
+        self.assertAlmostEqual(win, matchup.get_model().predict_win())
+        for lineup in (matchup.home_lineup, matchup.away_lineup):
+            self.assertTrue(is_feasible(lineup.lineup, lineup.remaining_gp))
+
+        # neither probable lineup beats the equilibrium lineups
+        home, away = matchup.home_lineup.lineup, matchup.away_lineup.lineup
+        matchup.home_lineup.set_probable()
+        self.assertLessEqual(matchup.get_model().predict_win(), win + 1e-9)
+        matchup.home_lineup.lineup = home
+        matchup.away_lineup.set_probable()
+        self.assertGreaterEqual(matchup.get_model().predict_win(), win - 1e-9)
+        matchup.away_lineup.lineup = away
 
 
 if __name__ == '__main__':
@@ -1,68 +1,12 @@
 import unittest
-from typing import List, Tuple
 from unittest.mock import MagicMock
 
-import numpy as np
 from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
 
-from cat5 import Model, PlayerStart
+from cat5 import Model, PlayerStart, Simulator
 from cat5.model import skellam_cdf_approx, skellam_cdf_continuous
 
 
-def sim_count_cat(
-    home_curr: int,
-    away_curr: int,
-    home_proj: List[int],
-    away_proj: List[int],
-):
-    res = []
-    n = 50_000
-    for _ in range(n):
-        h = home_curr + sum(
-            [np.random.poisson(x) for x in home_proj]
-        )
-        a = away_curr + sum(
-            [np.random.poisson(x) for x in away_proj]
-        )
-        if h > a:
-            res.append(1)
-        elif h < a:
-            res.append(0)
-        else:
-            res.append(np.random.choice([0, 1]))
-    return np.mean(res)
-
-
-def sim_ratio_cat(
-    home_curr: Tuple[int, int],
-    away_curr: Tuple[int, int],
-    home_proj: List[Tuple[int, float]],
-    away_proj: List[Tuple[int, float]],
-):
-    res = []
-    n = 50_000
-    for _ in range(n):
-        h_make, h_att = home_curr
-        for proj_att, proj_ratio in home_proj:
-            att = np.random.poisson(proj_att)
-            h_att += att
-            h_make += np.random.binomial(att, proj_ratio)
-
-        a_make, a_att = away_curr
-        for proj_att, proj_ratio in away_proj:
-            att = np.random.poisson(proj_att)
-            a_att += att
-            a_make += np.random.binomial(att, proj_ratio)
-
-        if h_make / h_att > a_make / a_att:
-            res.append(1)
-        elif h_make / h_att < a_make / a_att:
-            res.append(0)
-        else:
-            res.append(np.random.choice([0, 1]))
-    return np.mean(res)
-
-
 class TestModel(unittest.TestCase):
     def setUp(self):
         print('--> running')
@@ -95,7 +39,7 @@ class TestModel(unittest.TestCase):
         result = cat_predict._predict_count_cat('PTS')
 
         # sim expected
-        exp_sim = sim_count_cat(home_curr, away_curr, home_proj, away_proj)
+        exp_sim = Simulator(box, home_starts, away_starts).predict_cat('PTS')
 
         # compare
         print(f'expected: {exp_sim:.2f}, got: {result:.2f}')
@@ -139,7 +83,7 @@ class TestModel(unittest.TestCase):
         result = cat_predict._predict_ratio_cat('FG%')
 
         # sim expected
-        exp_sim = sim_ratio_cat(home_curr, away_curr, home_proj, away_proj)
+        exp_sim = Simulator(box, home_starts, away_starts).predict_cat('FG%')
 
         # compare
         print(f'expected: {exp_sim:.2f}, got: {result:.2f}')
@@ -159,6 +103,41 @@ class TestModel(unittest.TestCase):
         print(f'expected: {expected_value:.2f}, got: {result:.2f}')
         self.assertAlmostEqual(result, expected_value, delta=0.01)
 
+    def test_simulated_win(self):
+        # set up mocks
+        stats = {
+            'FGM': 30, 'FGA': 65, 'FTM': 12, 'FTA': 16, '3PM': 10,
+            'REB': 40, 'AST': 22, 'STL': 6, 'BLK': 4, 'TO': 12, 'PTS': 110,
+        }
+        proj = {
+            'FGA': 15.0, 'FG%': 0.47, 'FTA': 4.0, 'FT%': 0.78, '3PM': 1.8,
+            'REB': 6.0, 'AST': 4.0, 'STL': 1.0, 'BLK': 0.6, 'TO': 2.0,
+            'PTS': 19.0,
+        }
+        box = MagicMock(spec=BoxScore)
+        box.home_stats = {cat: {'value': v} for cat, v in stats.items()}
+        box.away_stats = {cat: {'value': v * 0.9} for cat, v in stats.items()}
+
+        def mock_start(scale):
+            player_start = MagicMock(spec=PlayerStart)
+            player_start.projection.side_effect = (
+                lambda cat: proj[cat] if '%' in cat else proj[cat] * scale
+            )
+            return player_start
+
+        home_starts = [mock_start(1.0) for _ in range(8)]
+        away_starts = [mock_start(1.2) for _ in range(9)]
+
+        # test implementation
+        result = Model(box, home_starts, away_starts).predict_win()
+
+        # sim expected
+        exp_sim = Simulator(box, home_starts, away_starts).predict_win()
+
+        # compare
+        print(f'expected: {exp_sim:.2f}, got: {result:.2f}')
+        self.assertAlmostEqual(result, exp_sim, delta=0.02)
+
     def test_skellam_cdf_approx(self):
         k = 3
         mu1 = 10
@@ -0,0 +1,83 @@
+import unittest
+from datetime import datetime
+
+from cat5 import DailyPlanner, Matchup, MatchupPeriod
+from cat5.config import starts_per_gameday
+from cat5.matchup import is_droppable
+from tests.fixtures import is_feasible, read_box_scores, read_league
+
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self) -> None:
+        print('--> running')
+
+        self.league = read_league()
+        self.box_scores = read_box_scores()
+
+        self.box = self.box_scores[0]
+        self.matchup = Matchup(
+            self.box, MatchupPeriod(self.league), datetime(2025, 1, 9),
+        )
+        # players of the other matchups stand in for the free agent pool
+        in_box = {self.box.home_team.team_id, self.box.away_team.team_id}
+        self.pool = [
+            player
+            for team in self.league.teams if team.team_id not in in_box
+            for player in team.roster
+        ]
+
+    def test_plan(self):
+        self.matchup.home_lineup.set_probable()
+        self.matchup.away_lineup.set_probable()
+        probable_win = float(self.matchup.win_p(
+            self.matchup.expected_total(self.matchup.home_lineup.lineup),
+            self.matchup.expected_total(self.matchup.away_lineup.lineup),
+        ))
+
+        plan = DailyPlanner(self.matchup, use_home=True).plan()
+        starts = [s for day in plan.days for s in day.starts]
+        dates = [day.game_date for day in plan.days]
+        self.assertEqual(dates, sorted(dates))
+        for day in plan.days:
+            self.assertLessEqual(len(day.starts), starts_per_gameday)
+            self.assertTrue(
+                all(s.game_day_id == day.game_day_id for s in day.starts)
+            )
+            self.assertIsNone(day.add)
+        self.assertTrue(
+            is_feasible(starts, self.matchup.home_lineup.remaining_gp)
+        )
+        self.assertGreaterEqual(plan.win, probable_win)
+
+        # the plan's win probability is the matchup's of expected totals
+        self.matchup.away_lineup.set_probable()
+        self.assertAlmostEqual(plan.win, float(self.matchup.win_p(
+            self.matchup.expected_total(starts),
+            self.matchup.expected_total(self.matchup.away_lineup.lineup),
+        )))
+
+    def test_streaming(self):
+        selected = list(self.matchup.away_lineup.selected)
+        plan = DailyPlanner(self.matchup, use_home=True).plan()
+        streaming_plan = DailyPlanner(
+            self.matchup, use_home=True, free_agents=self.pool,
+        ).plan()
+        self.assertGreaterEqual(streaming_plan.win, plan.win)
+        # planning leaves the matchup's lineups as they were
+        self.assertEqual(list(self.matchup.away_lineup.selected), selected)
+
+        moves = [day for day in streaming_plan.days if day.add]
+        self.assertLessEqual(len(moves), 1)
+        for day in moves:
+            assert day.drop is not None
+            self.assertTrue(is_droppable(day.drop))
+            for later in streaming_plan.days:
+                if later.game_date >= day.game_date:
+                    self.assertNotIn(
+                        day.drop.playerId,
+                        [s.player.playerId for s in later.starts],
+                    )
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,46 @@
+import unittest
+
+from cat5 import PlayoffOdds, ScheduleIndex
+from cat5.playoffs import bracket_order
+from tests.fixtures import read_league
+
+
+class TestPlayoffs(unittest.TestCase):
+    def setUp(self) -> None:
+        print('--> running')
+        self.league = read_league()
+
+    def test_bracket_order(self):
+        self.assertEqual(bracket_order(4), [1, 4, 2, 3])
+        self.assertEqual(bracket_order(8), [1, 8, 4, 5, 2, 7, 3, 6])
+
+    def test_playoff_odds(self):
+        playoff_odds = PlayoffOdds(
+            self.league, ScheduleIndex(self.league), n=5000, seed=0,
+        )
+        odds = playoff_odds.simulate()
+        n_playoff = self.league.settings.playoff_team_count
+        self.assertEqual(len(odds), len(self.league.teams))
+        for team_odds in odds.values():
+            self.assertEqual(len(team_odds.seed), n_playoff)
+            self.assertTrue(0 <= team_odds.champion <= team_odds.playoff <= 1)
+        for s in range(n_playoff):
+            self.assertAlmostEqual(sum(o.seed[s] for o in odds.values()), 1)
+
+        # a known result for every current matchup shifts the odds
+        win_p = playoff_odds.win_matrix(playoff_odds.period)
+        self.assertTrue((abs(win_p + win_p.T - 1) < 1e-9).all())
+        home, away = playoff_odds.pairings(playoff_odds.period)[0]
+        home_id = playoff_odds.team_ids[home]
+        away_id = playoff_odds.team_ids[away]
+        sure_win = PlayoffOdds(
+            self.league, ScheduleIndex(self.league),
+            current_win_p={(home_id, away_id): 1.0}, n=5000, seed=0,
+        ).simulate()
+        self.assertGreaterEqual(
+            sure_win[home_id].playoff, odds[home_id].playoff,
+        )
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
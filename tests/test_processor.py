@@ -1,25 +1,25 @@
 import json
-import pickle
 import unittest
+from copy import copy
 from dataclasses import asdict
 from datetime import datetime
-from typing import List
-
-from espn_api.basketball import League
-from espn_api.basketball.box_score import H2HCategoryBoxScore as BoxScore
 
+from cat5 import Matchup
+from cat5.start import (PlayerStart, ProjectionStore, project,
+                        stats_fingerprint)
 from processor import Processor
+from processor.db import DBWriter
+from processor.snapshot import league_snapshot, load_league
+from storage import MemoryStorage
+from tests.fixtures import read_box_scores, read_league
 
 
 class TestModel(unittest.TestCase):
     def setUp(self) -> None:
         print('--> running')
 
-        with open('tests/pickles/league_20250109.pkl', 'rb') as file:
-            self.league: League = pickle.load(file)
-
-        with open('tests/pickles/box_scores_20250109.pkl', 'rb') as file:
-            self.box_scores: List[BoxScore] = pickle.load(file)
+        self.league = read_league()
+        self.box_scores = read_box_scores()
 
     def test_processor(self):
         processor = Processor(self.league, self.box_scores)
@@ -39,6 +39,9 @@ class TestModel(unittest.TestCase):
         self.assertEqual(round(ex_float, 4), ex_float)
 
         for matchup in cat5_instance.matchups:
+            self.assertEqual(
+                matchup.updateTimestamp, cat5_instance.updateTimestamp,
+            )
             self.assertEqual(9, len(matchup.forecasts.default.catWin))
             self.assertTrue(0 <= matchup.forecasts.default.win <= 1)
             for p in matchup.forecasts.default.catWin.values():
@@ -53,11 +56,157 @@ class TestModel(unittest.TestCase):
                 matchup.forecasts.default.win,
             )
 
+        self.assertEqual(
+            set(cat5_instance.playoffOdds), set(cat5_instance.teams),
+        )
+        self.assertAlmostEqual(
+            sum(o.playoff for o in cat5_instance.playoffOdds.values()),
+            self.league.settings.playoff_team_count,
+            delta=0.01,
+        )
+        self.assertAlmostEqual(
+            sum(o.champion for o in cat5_instance.playoffOdds.values()),
+            1.0,
+            delta=0.01,
+        )
+
         # test json serialization
         cat5_instance_dict = asdict(cat5_instance)
         cat5_instance_json = json.dumps(cat5_instance_dict, indent=2)
         self.assertTrue(len(cat5_instance_json) > 0)
 
+    def test_warm_start(self) -> None:
+        processor = Processor(self.league, self.box_scores)
+        processor.now = datetime(2025, 1, 9)
+        processor.n_iter = 100
+        processor.n_seasons = 1000
+        cold = processor.build()
+
+        self.assertEqual(
+            len(cold.matchups), processor.warm_start(asdict(cold)),
+        )
+        warm = processor.build()
+        for c, w in zip(cold.matchups, warm.matchups):
+            # the previous best lineups are candidates, so a warm start
+            # does at least as well with a quarter of the samples
+            self.assertGreaterEqual(
+                w.forecasts.homeOptimized.win,
+                c.forecasts.homeOptimized.win - 1e-4,
+            )
+            self.assertLessEqual(
+                w.forecasts.awayOptimized.win,
+                c.forecasts.awayOptimized.win + 1e-4,
+            )
+
+        # lineups of another period are ignored
+        self.assertEqual(
+            0, processor.warm_start({**asdict(cold), 'matchupPeriod': 1}),
+        )
+
+    def test_live_refresh(self) -> None:
+        db = DBWriter()
+        db.storage = MemoryStorage()
+        processor = Processor(self.league, self.box_scores)
+        processor.now = datetime(2025, 1, 9)
+        processor.n_iter = 100
+        processor.n_seasons = 1000
+        db.write_instance('t', asdict(processor.build()))
+        db.write('t#league', league_snapshot(self.league))
+        data = db.read('t#league')
+        assert data is not None
+        league = load_league(data)
+        assert league is not None
+        self.assertIsNone(load_league({**data, 'version': 0}))
+
+        # a live update of the same box scores from the cached league,
+        # whose teams replace the fetched ones like in `box_scores`
+        teams = {team.team_id: team for team in league.teams}
+        box_scores = [copy(box) for box in self.box_scores]
+        for box in box_scores:
+            box.home_team = teams[box.home_team.team_id]
+            if box.away_team:
+                box.away_team = teams[box.away_team.team_id]
+        previous = db.read_instance('t')
+        assert previous is not None
+        live = Processor(league, box_scores)
+        live.now = datetime(2025, 1, 9)
+        live.n_iter = 100
+        live.n_seasons = 1000
+        live.live = True
+        live.warm_start(previous)
+        refreshed = live.build()
+        self.assertEqual(asdict(refreshed)['teams'], previous['teams'])
+        self.assertEqual(asdict(refreshed)['players'], previous['players'])
+        for prev, m in zip(previous['matchups'], refreshed.matchups):
+            self.assertEqual(m.updateTimestamp, refreshed.updateTimestamp)
+            self.assertEqual(asdict(m)['homePlayerValue'],
+                             prev['homePlayerValue'])
+            self.assertEqual(asdict(m)['awayStreamingPlan'],
+                             prev['awayStreamingPlan'])
+            self.assertEqual(m.optimizedHomeGP, prev['optimizedHomeGP'])
+            for name in ('default', 'homeOptimized', 'awayOptimized'):
+                self.assertAlmostEqual(
+                    getattr(m.forecasts, name).win,
+                    prev['forecasts'][name]['win'],
+                    delta=1e-4,
+                )
+
+        # the tolerance counts from the last full optimization, so
+        # successive refreshes cannot drift past it
+        box = box_scores[0]
+        matchup = Matchup(box, live.matchup_period, live.now)
+        prev = next(
+            m for m in previous['matchups']
+            if m['homeTeam'] == str(box.home_team.team_id)
+        )
+        self.assertTrue(live.is_refreshable(matchup, prev))
+        drifted = {
+            **prev,
+            'optimizedHomeGP': prev['homeGP'] - live.live_gp_tolerance - 1,
+        }
+        self.assertFalse(live.is_refreshable(matchup, drifted))
+
+        # matchups whose games played moved too much are reoptimized
+        live.live_gp_tolerance = -1
+        self.assertNotEqual(
+            [asdict(m)['homePlayerValue'] for m in live.build().matchups],
+            [m['homePlayerValue'] for m in previous['matchups']],
+        )
+
+    def test_projection_store(self) -> None:
+        processor = Processor(self.league, self.box_scores)
+        players = processor.projected_players()
+        processor.update_projections()
+        self.assertEqual(0, processor.update_projections())
+
+        # a stored dump is reused until a player's stats change
+        store = ProjectionStore()
+        store.load(json.loads(json.dumps(processor.projections.dump(players))))
+        self.assertEqual(0, store.update(players))
+        player = players[0]
+        self.assertEqual(
+            store.projections(player)['PTS'], project(player, 'PTS'),
+        )
+        start = PlayerStart(player, next(iter(player.schedule)), store)
+        self.assertEqual(start.projection('FG%'), project(player, 'FG%'))
+
+        stale = store.entries[player.playerId]
+        store.entries[player.playerId] = stale._replace(fingerprint='old')
+        self.assertEqual(1, store.update(players))
+
+        # revised preseason projections change the fingerprint
+        fingerprint = stats_fingerprint(player)
+        projected = player.stats[f'{player.year}_projected']['avg']
+        projected['PTS'] = projected.get('PTS', 0) + 1
+        self.assertNotEqual(stats_fingerprint(player), fingerprint)
+
+        # the least recently used players are evicted
+        small = ProjectionStore(max_players=2)
+        small.update(players[:3])
+        self.assertEqual(
+            list(small.entries), [p.playerId for p in players[1:3]],
+        )
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
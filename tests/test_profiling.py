@@ -0,0 +1,47 @@
+import unittest
+from contextlib import nullcontext
+from datetime import datetime
+
+from processor import Processor
+from processor.profiling import Profiler, profile_stage
+from tests.fixtures import read_box_scores, read_league
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self) -> None:
+        print('--> running')
+
+    def test_stage(self):
+        profiler = Profiler(top_n=5)
+        with profiler.stage('squares'):
+            squares = [[i * i for i in range(1000)] for _ in range(100)]
+        self.assertEqual(len(squares), 100)
+
+        report = profiler.report()
+        stage = report['stages'][0]
+        self.assertEqual(stage['stage'], 'squares')
+        self.assertGreater(stage['seconds'], 0)
+        self.assertLessEqual(len(stage['hot']), 5)
+        self.assertTrue(any(a['sizeKB'] > 0 for a in stage['allocations']))
+        self.assertIsInstance(profile_stage(None, 'off'), nullcontext)
+
+    def test_processor_stages(self) -> None:
+        box_scores = read_box_scores()
+        processor = Processor(read_league(), box_scores)
+        processor.now = datetime(2025, 1, 9)
+        processor.n_iter = 20
+        processor.n_seasons = 1000
+        processor.profiler = Profiler()
+        processor.build()
+
+        stages = [s['stage'] for s in processor.profiler.report()['stages']]
+        self.assertEqual(
+            stages,
+            ['projections'] +
+            [f'matchup {i}' for i in range(len(box_scores))] +
+            ['teams', 'players', 'playoff odds'],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
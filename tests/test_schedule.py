@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime
+
+from cat5 import MatchupPeriod, ScheduleIndex
+from cat5.schedule import derive_period_dates
+from tests.fixtures import read_league
+
+# hand-maintained 2025 period start dates, previously in cat5.config
+period_start_dates_2025 = [
+    '2024-10-21', '2024-10-28', '2024-11-04', '2024-11-11', '2024-11-18',
+    '2024-11-25', '2024-12-02', '2024-12-09', '2024-12-16', '2024-12-23',
+    '2024-12-30', '2025-01-06', '2025-01-13', '2025-01-20', '2025-01-27',
+    '2025-02-03', '2025-02-10', '2025-02-24', '2025-03-03', '2025-03-10',
+    '2025-03-17', '2025-03-24', '2025-03-31', '2025-04-07',
+]
+
+
+class TestSchedule(unittest.TestCase):
+    def setUp(self) -> None:
+        print('--> running')
+        self.league = read_league()
+
+    def test_period_dates(self):
+        schedule = ScheduleIndex(self.league)
+        expected = [
+            datetime.strptime(d, '%Y-%m-%d') for d in period_start_dates_2025
+        ]
+        self.assertEqual(
+            schedule.period_dates,
+            {
+                i + 1: (start, end)
+                for i, (start, end) in enumerate(zip(expected, expected[1:]))
+            },
+        )
+
+    def test_combined_periods(self):
+        schedule = ScheduleIndex(self.league)
+        weeks = schedule.period_dates
+        # the last four weeks as two two-week playoff rounds
+        matchup_periods = {
+            **{str(n): [n] for n in range(1, 20)},
+            '20': [20, 21],
+            '21': [22, 23],
+        }
+        season_days = [
+            d for gid, d in schedule.game_days.items()
+            if int(gid) <= self.league.finalScoringPeriod
+        ]
+        dates = derive_period_dates(season_days, matchup_periods)
+        self.assertEqual(len(dates), 21)
+        self.assertEqual(dates[19], weeks[19])
+        self.assertEqual(dates[20], (weeks[20][0], weeks[21][1]))
+        self.assertEqual(dates[21], (weeks[22][0], weeks[23][1]))
+
+    def test_matchup_period(self):
+        matchup_period = MatchupPeriod(self.league)
+        expected = set()
+        for team in self.league.teams:
+            for player in team.roster:
+                for gid, game in player.schedule.items():
+                    if matchup_period.start_date <= game['date'] \
+                            < matchup_period.end_date:
+                        expected.add(gid)
+        self.assertEqual(matchup_period.game_day_ids, expected)
+        self.assertEqual(matchup_period.max_gp, len(expected) * 4)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
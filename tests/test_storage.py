@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+from storage import (ConditionFailedError, MemoryStorage, SQLiteStorage,
+                     Storage, decode_json, encode_json, write_units)
+from storage.dynamo import CapacityPacer, consumed_units
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self) -> None:
+        print('--> running')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backends: list[Storage] = [
+            MemoryStorage(),
+            SQLiteStorage(os.path.join(self.tmp.name, 'test.sqlite3')),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_put(self):
+        for storage in self.backends:
+            self.assertIsNone(storage.get('a'))
+            storage.put('a', encode_json({'x': 1}), version='v1')
+            record = storage.get('a')
+            assert record is not None
+            self.assertEqual(decode_json(record.data), {'x': 1})
+            self.assertEqual(record.version, 'v1')
+
+    def test_batch(self):
+        for storage in self.backends:
+            units = storage.batch_put(
+                {'a': b'\x00\x01', 'b': b'\x02'}, versions={'a': 'v1'},
+            )
+            self.assertEqual(units, 2)
+            records = storage.batch_get(['a', 'b', 'c'])
+            self.assertEqual(
+                {k: r.data for k, r in records.items()},
+                {'a': b'\x00\x01', 'b': b'\x02'},
+            )
+            self.assertEqual(records['a'].version, 'v1')
+            self.assertIsNone(records['b'].version)
+
+    def test_write_capacity(self):
+        self.assertEqual(write_units(1), 1)
+        self.assertEqual(write_units(1025), 2)
+        self.assertEqual(consumed_units({}), 0)
+        resp = {'ConsumedCapacity': [
+            {'CapacityUnits': 2.0}, {'CapacityUnits': 1.0},
+        ]}
+        self.assertEqual(consumed_units(resp), 3)
+
+        # one unit of burst, so the second write waits for two more
+        pacer = CapacityPacer(rate=100, burst_seconds=0.01)
+        pacer.acquire(1)
+        self.assertEqual(pacer.waited, 0)
+        pacer.acquire(2)
+        self.assertAlmostEqual(pacer.waited, 0.02, delta=0.005)
+
+    def test_conditional_put(self):
+        for storage in self.backends:
+            storage.put('a', b'1', version='v1', if_absent=True)
+            with self.assertRaises(ConditionFailedError):
+                storage.put('a', b'2', if_absent=True)
+            with self.assertRaises(ConditionFailedError):
+                storage.put('a', b'2', if_version='v0')
+            storage.put('a', b'2', version='v2', if_version='v1')
+            record = storage.get('a')
+            assert record is not None
+            self.assertEqual(record, (b'2', 'v2'))
+
+    def test_versions(self):
+        for storage in self.backends:
+            storage.batch_put({'a': b'1', 'b': b'2'}, versions={'a': 'v1'})
+            self.assertEqual(
+                storage.versions(['a', 'b', 'c']), {'a': 'v1', 'b': None},
+            )
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
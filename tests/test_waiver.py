@@ -0,0 +1,90 @@
+import unittest
+from datetime import datetime
+
+from cat5 import Matchup, MatchupPeriod, WaiverEvaluator
+from cat5.matchup import is_droppable
+from tests.fixtures import is_feasible, read_box_scores, read_league
+
+
+class TestWaiver(unittest.TestCase):
+    def setUp(self) -> None:
+        print('--> running')
+
+        self.league = read_league()
+        self.box_scores = read_box_scores()
+
+        self.box = self.box_scores[0]
+        self.matchup = Matchup(
+            self.box, MatchupPeriod(self.league), datetime(2025, 1, 9),
+        )
+        # players of the other matchups stand in for the free agent pool
+        in_box = {self.box.home_team.team_id, self.box.away_team.team_id}
+        self.pool = [
+            player
+            for team in self.league.teams if team.team_id not in in_box
+            for player in team.roster
+        ]
+
+    def test_evaluate(self):
+        evaluator = WaiverEvaluator(self.matchup, self.pool)
+        self.assertTrue(len(evaluator.free_agents) > 0)
+
+        for use_home in (True, False):
+            lineup = (
+                self.matchup.home_lineup if use_home
+                else self.matchup.away_lineup
+            )
+            opp_lineup = (
+                self.matchup.away_lineup if use_home
+                else self.matchup.home_lineup
+            )
+            selected = list(opp_lineup.selected)
+            moves = evaluator.evaluate(use_home, top_n=5)
+            # evaluating leaves the matchup's lineups as they were
+            self.assertEqual(list(opp_lineup.selected), selected)
+
+            self.assertEqual(len(moves), 5)
+            gains = [m.gain for m in moves]
+            self.assertEqual(gains, sorted(gains, reverse=True))
+            for move in moves:
+                self.assertTrue(0 <= move.win <= 1)
+                self.assertTrue(is_droppable(move.drop))
+            # each added player keeps their best drop
+            adds = [m.add.playerId for m in moves]
+            self.assertEqual(len(adds), len(set(adds)))
+
+            # added players start, so moves differ by who is added
+            for move in moves:
+                variant = evaluator.variant_lineup(lineup, move.add, move.drop)
+                self.assertIn(
+                    move.add.playerId, [s.player.playerId for s in variant],
+                )
+
+            # the batched evaluation agrees with the matchup's win
+            # probability of expected totals
+            opp_starts = [opp_lineup.start(i) for i in opp_lineup.probable()]
+            best = moves[0]
+            variant = evaluator.variant_lineup(lineup, best.add, best.drop)
+            baseline = evaluator.variant_lineup(lineup, None, None)
+            self.assertTrue(is_feasible(variant, lineup.remaining_gp))
+            self.assertNotIn(
+                best.drop.playerId,
+                [s.player.playerId for s in variant],
+            )
+
+            total = self.matchup.expected_total
+            wins = []
+            for starts in (variant, baseline):
+                if use_home:
+                    win = self.matchup.win_p(total(starts), total(opp_starts))
+                else:
+                    win = 1 - self.matchup.win_p(
+                        total(opp_starts), total(starts),
+                    )
+                wins.append(float(win))
+            self.assertAlmostEqual(best.win, wins[0])
+            self.assertAlmostEqual(best.gain, wins[0] - wins[1])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
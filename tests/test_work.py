@@ -0,0 +1,73 @@
+import unittest
+from dataclasses import asdict
+from datetime import datetime
+
+from processor import Processor
+from processor.processor import run_work_unit
+from processor.work import (LocalQueue, ProcessQueue, decode,
+                            decode_unit_event, decode_unit_result, encode,
+                            encode_unit_event, encode_unit_result)
+from tests.fixtures import read_box_scores, read_league
+
+
+class TestWork(unittest.TestCase):
+    def setUp(self) -> None:
+        print('--> running')
+
+        self.league = read_league()
+        self.box_scores = read_box_scores()
+
+    def build(self, processor: Processor) -> dict:
+        processor.now = datetime(2025, 1, 9)
+        processor.n_iter = 50
+        processor.simulate = True
+        processor.n_sim = 2000
+        processor.n_seasons = 1000
+        processor.seed = 7
+        return asdict(processor.build())
+
+    def test_unit_event(self):
+        processor = Processor(self.league, self.box_scores)
+        unit = processor.scatter()[0]
+        event = encode_unit_event(unit, key='k')
+        self.assertEqual(decode_unit_event(event, key='k'), unit)
+        result = encode_unit_result(b'result', key='k')
+        self.assertEqual(decode_unit_result(result, key='k'), b'result')
+
+        # events not signed with the key are rejected
+        with self.assertRaises(ValueError):
+            decode_unit_event(event, key='other')
+        with self.assertRaises(ValueError):
+            decode_unit_event(event, key='')
+        event['workUnit']['seed'] += 1
+        with self.assertRaises(ValueError):
+            decode_unit_event(event, key='k')
+        with self.assertRaises(ValueError):
+            decode_unit_result({**result, 'signature': ''}, key='k')
+
+        # a unit only carries its own matchup's teams
+        box = self.box_scores[unit.box_index]
+        inputs = decode(unit.payload)
+        self.assertEqual(
+            [t.team_id for t in inputs['league'].teams],
+            [box.home_team.team_id, box.away_team.team_id],
+        )
+        self.assertLess(len(unit.payload), len(encode(self.league)) / 2)
+
+    def test_queues_match_single_process(self):
+        expected = self.build(Processor(self.league, self.box_scores))
+        self.assertEqual(
+            self.build(Processor(self.league, self.box_scores)), expected,
+        )
+
+        for queue in (
+            LocalQueue(run_work_unit),
+            ProcessQueue(run_work_unit, workers=2),
+        ):
+            processor = Processor(self.league, self.box_scores)
+            processor.queue = queue
+            self.assertEqual(self.build(processor), expected)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)